@@ -83,6 +83,29 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+#
+# The 'default' cache stores the compiled search page schemas and the search menu under the version of the search
+# configuration, which is kept in the database, so every worker rebuilds them once the configuration changes.
+# The 'search' cache stores search result pages and totals from the GLEAM-X database. Entries are invalidated when the
+# GLEAM-X database changes. The local memory backend is per process; to share the caches between the workers use
+# 'django.core.cache.backends.filebased.FileBasedCache' with a directory as the LOCATION.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'search': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'search',
+        'TIMEOUT': 24 * 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    },
+}
+
 # Customised user model
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -200,3 +223,56 @@ TESTING = False
 
 # Update it if you have a different name or want to store the database in some other directory.
 GLEAM_DATABASE_PATH = os.path.join(BASE_DIR, '..', 'GLEAM-X.sqlite')
+
+# Spatial index of the observation positions used by the cone searches, built by the build_spatial_index command.
+GLEAM_SPATIAL_INDEX_PATH = os.path.join(BASE_DIR, '..', 'GLEAM-X.spatial.sqlite')
+
+# Full-text index of the text fields used by the full-text searches, built by the update_text_index command.
+GLEAM_TEXT_INDEX_PATH = os.path.join(BASE_DIR, '..', 'GLEAM-X.text.sqlite')
+
+# Number of idle read-only connections to the GLEAM-X database kept by each thread for reuse.
+GLEAM_DATABASE_POOL_SIZE = 4
+
+# Pragmas applied to each connection to the GLEAM-X database when it is opened.
+GLEAM_DATABASE_PRAGMAS = {
+    'query_only': 1,
+    'mmap_size': 268435456,  # 256 MB of the database file is memory mapped
+    'cache_size': -65536,  # negative value means size in KB, i.e. 64 MB of page cache per connection
+}
+
+# Directory of the plot images of the observations, with a directory for each observation id. It is served as the
+# images/plots directory of the static files.
+PLOTS_PATH = os.path.join(BASE_DIR, '..', 'static', 'images', 'plots')
+
+# Directory of the thumbnails of the plot images, with a directory for each observation id. It is served as the
+# images/thumbnails directory of the static files.
+THUMBNAILS_PATH = os.path.join(BASE_DIR, '..', 'static', 'images', 'thumbnails')
+
+# Widths in pixels of the thumbnails of the plot images, no thumbnail is made as wide as the image or wider.
+THUMBNAIL_WIDTHS = (320, 640, 960)
+
+# Number of rows fetched from the GLEAM-X database at a time when the search results are exported.
+GLEAM_EXPORT_BATCH_SIZE = 1000
+
+# Number of processing jobs shown at a time on the observation page, the next ones are loaded on request.
+PROCESSING_HISTORY_PER_PAGE = 20
+
+# Largest number of observations whose summaries can be requested at once from the observation summaries endpoint.
+OBSERVATION_SUMMARY_MAX_IDS = 1000
+
+# Number of days a search state (the query behind a ?q= link of the search pages) is kept after it was last used,
+# removed by the clear_search_states command.
+SEARCH_STATE_EXPIRY_DAYS = 90
+
+# Number of seconds a browser may show a page of search results again without asking whether it has changed.
+SEARCH_RESULTS_MAX_AGE = 60
+
+# How the observations are drawn on the sky plots of the landing page, both by the browser from the sky coverage and
+# in the images shown when the browser can not draw it:
+# 'markers': a marker for each observation pointing.
+# 'density': the number of observations in the cells of an equal-area grid, the time to render does not depend on the
+# number of observations.
+SKY_PLOTS_MODE = 'markers'
+
+# Number of cells of the equal-area grid in ra and dec for the 'density' mode of the sky plots.
+SKY_PLOTS_DENSITY_BINS = (120, 60)
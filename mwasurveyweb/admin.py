@@ -14,6 +14,9 @@ from .models import (
     Colour,
     SkyPlotsConfiguration,
     SkyPlot,
+    SearchState,
+    PlotManifest,
+    SearchConfigurationVersion,
 )
 
 
@@ -106,3 +109,29 @@ class SkyPlot(admin.ModelAdmin):
         'generation_time',
         'is_default',
     )
+
+
+@admin.register(SearchState)
+class SearchState(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'version',
+        'last_used_time',
+    )
+
+
+@admin.register(PlotManifest)
+class PlotManifest(admin.ModelAdmin):
+    list_display = (
+        'observation_id',
+        'modified_time',
+        'update_time',
+    )
+
+
+@admin.register(SearchConfigurationVersion)
+class SearchConfigurationVersion(admin.ModelAdmin):
+    list_display = (
+        'version',
+        'update_time',
+    )
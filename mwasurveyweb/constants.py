@@ -5,6 +5,8 @@ Distributed under the MIT License. See LICENSE.txt for more info.
 # type of fields
 TEXT = 'text'
 TEXT_DISPLAY = 'Text'
+FULL_TEXT = 'full_text'
+FULL_TEXT_DISPLAY = 'Full Text (Words, Prefixes*, "Phrases")'
 NUMBER = 'number'
 NUMBER_DISPLAY = 'Number (Int)'
 MIN_NUMBER = 'min_number'
@@ -17,6 +19,8 @@ CHECKBOX = 'checkbox'
 CHECKBOX_DISPLAY = 'Checkbox'
 RADIUS = 'radius'
 RADIUS_DISPLAY = 'RADIUS (Point, +/-)'
+CONE = 'cone'
+CONE_DISPLAY = 'Cone (RA, Dec, Radius)'
 RANGE = 'range'
 RANGE_DISPLAY = 'Range (Min, Max)'
 RANGE_INT = 'range_integer'
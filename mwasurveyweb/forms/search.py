@@ -21,7 +21,14 @@ class SearchForm(DynamicForm):
 
     def __init__(self, *args, **kwargs):
         group_name = kwargs.get('name', None)
-        fieldsets, field_properties = get_field_properties(group_name)
+
+        # fieldsets and field properties can be passed from the compiled search page schema, otherwise they are
+        # generated from the database
+        fieldsets = kwargs.pop('fieldsets', None)
+        field_properties = kwargs.pop('field_properties', None)
+
+        if fieldsets is None or field_properties is None:
+            fieldsets, field_properties = get_field_properties(group_name)
 
         self.fieldsets = fieldsets
         kwargs['field_properties'] = field_properties
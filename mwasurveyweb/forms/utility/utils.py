@@ -7,10 +7,7 @@ from collections import OrderedDict
 from ... import constants
 from ..dynamic import field as dynamic_field
 
-from ...models import (
-    SearchInput,
-    SearchInputOption,
-)
+from ...models import SearchInput
 
 
 def get_choices_for_input(search_input):
@@ -29,8 +26,8 @@ def get_choices_for_input(search_input):
             ['', 'None'],
         )
 
-    # finding the options for the search input
-    options = SearchInputOption.objects.filter(search_input=search_input)
+    # finding the options for the search input, these may have been prefetched along with the search input
+    options = search_input.searchinputoption_set.all()
 
     # appending the options to the list
     for option in options:
@@ -50,7 +47,7 @@ def get_fields(search_input):
     """
     fields = []
 
-    if search_input.input_type == constants.TEXT:
+    if search_input.input_type in [constants.TEXT, constants.FULL_TEXT, ]:
         input_properties = dict()
         input_properties.update({
             'label': '',
@@ -213,6 +210,40 @@ def get_fields(search_input):
         })
         fields.append(input_properties_plus_minus)
 
+    elif search_input.input_type == constants.CONE:
+        input_properties_ra = dict()
+        input_properties_ra.update({
+            'label': 'RA',
+            'type': dynamic_field.FLOAT,
+            'required': search_input.required,
+            'placeholder': search_input.placeholder,
+            'initial': search_input.initial_value_adjusted[0],
+            'help_text': search_input.help_text_adjusted[0],
+        })
+        fields.append(input_properties_ra)
+
+        input_properties_dec = dict()
+        input_properties_dec.update({
+            'label': 'Dec',
+            'type': dynamic_field.FLOAT,
+            'required': search_input.required,
+            'placeholder': search_input.placeholder,
+            'initial': search_input.initial_value_adjusted[1],
+            'help_text': search_input.help_text_adjusted[1],
+        })
+        fields.append(input_properties_dec)
+
+        input_properties_radius = dict()
+        input_properties_radius.update({
+            'label': 'Radius',
+            'type': dynamic_field.POSITIVE_FLOAT,
+            'required': search_input.required,
+            'placeholder': search_input.placeholder,
+            'initial': search_input.initial_value_adjusted[2],
+            'help_text': search_input.help_text_adjusted[2],
+        })
+        fields.append(input_properties_radius)
+
     elif search_input.input_type in [constants.DATE_GPS, constants.DATE_UNIX, ]:
         input_properties = dict()
         input_properties.update({
@@ -251,17 +282,21 @@ def get_fields(search_input):
     return fields
 
 
-def get_field_properties(group_name):
+def get_field_properties(group_name, search_inputs=None):
     """
     Creates a Ordered Dictionary of field properties
+    :param group_name: name of the search input group
+    :param search_inputs: active search inputs of the group in display order, if already loaded. Otherwise, they are
+    queried from the database.
     :return: Ordered Dictionary for fieldsets, Ordered Dictionary for field properties
     """
     field_properties = OrderedDict()
     fieldsets = OrderedDict()
 
     # finds the search inputs that belong to the group and are currently active.
-    search_inputs = SearchInput.objects.filter(active=True, search_input_group__name=group_name) \
-        .order_by('display_order')
+    if search_inputs is None:
+        search_inputs = SearchInput.objects.filter(active=True, search_input_group__name=group_name) \
+            .order_by('display_order')
 
     for search_input in search_inputs:
 
@@ -0,0 +1,158 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import os
+import sqlite3
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from ...models import SearchPage
+from ...utility.database import (
+    acquire_connection,
+    release_connection,
+)
+from ...utility.index_advisor import (
+    get_representative_queries,
+    analyse_queries,
+    propose_indexes,
+    get_existing_indexes,
+    copy_database,
+    open_database_copy,
+    create_indexes,
+)
+
+
+class Command(BaseCommand):
+    """
+    Django management command class to find the indexes the search queries need in the GLEAM-X database. The GLEAM-X
+    database itself is never modified, the indexes are only created on a copy of it.
+    """
+
+    help = 'Explains the query plans of representative queries of the active search pages, proposes the indexes for ' \
+           'the queries that scan the GLEAM-X tables and optionally creates them on a copy of the database to ' \
+           'compare the times'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--create',
+            action='store_true',
+            help='Creates the proposed indexes on a copy of the GLEAM-X database and reports the times before and '
+                 'after',
+        )
+        parser.add_argument(
+            '--copy',
+            help='Path of the copy of the GLEAM-X database, defaults to the database path with the .indexed suffix',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Number of runs to time each query, the fastest run is reported',
+        )
+        parser.add_argument(
+            '--sql',
+            help='Writes the statements creating the proposed indexes to this file, to be applied to the GLEAM-X '
+                 'database',
+        )
+
+    def _write_analysis(self, analysed_queries):
+        """
+        Writes the plans and the times of the queries.
+        :param analysed_queries: list of dictionaries of the queries with their plans and times
+        """
+        for analysed_query in analysed_queries:
+            self.stdout.write('{name}: {time:.2f} ms'.format(
+                name=analysed_query.get('name'),
+                time=analysed_query.get('time') * 1000,
+            ))
+
+            for detail in analysed_query.get('plan'):
+                self.stdout.write('    {}'.format(detail))
+
+    def _write_comparison(self, analysed_queries, analysed_queries_after):
+        """
+        Writes the times of the queries before and after creating the indexes.
+        :param analysed_queries: list of dictionaries of the queries with their plans and times before
+        :param analysed_queries_after: list of dictionaries of the queries with their plans and times after
+        """
+        self.stdout.write('{:<60} {:>12} {:>12} {:>9}'.format('query', 'before (ms)', 'after (ms)', 'speed-up'))
+
+        for before, after in zip(analysed_queries, analysed_queries_after):
+            self.stdout.write('{name:<60} {before:>12.2f} {after:>12.2f} {speed_up:>8.1f}x'.format(
+                name=before.get('name'),
+                before=before.get('time') * 1000,
+                after=after.get('time') * 1000,
+                speed_up=before.get('time') / max(after.get('time'), 1e-9),
+            ))
+
+            if before.get('plan') != after.get('plan'):
+                for detail in after.get('plan'):
+                    self.stdout.write('    {}'.format(detail))
+
+    def handle(self, *args, **options):
+
+        form_types = SearchPage.objects.filter(active=True).order_by('display_order').values_list('name', flat=True)
+
+        database_path = settings.GLEAM_DATABASE_PATH
+        copy_path = options.get('copy') or '{}.indexed'.format(database_path)
+
+        conn = None
+        discard = False
+
+        try:
+
+            # the indexes are created on a copy, the times before and after are measured on the same file
+            if options.get('create'):
+                self.stdout.write('Copying {} to {}'.format(database_path, copy_path))
+                copy_database(database_path, copy_path)
+                conn = open_database_copy(copy_path)
+            else:
+                conn = acquire_connection()
+
+            cursor = conn.cursor()
+
+            representative_queries = []
+            for form_type in form_types:
+                representative_queries.extend(get_representative_queries(cursor, form_type))
+
+            analysed_queries = analyse_queries(cursor, representative_queries, repeat=options.get('repeat'))
+            self._write_analysis(analysed_queries)
+
+            proposals = propose_indexes(analysed_queries, existing_indexes=get_existing_indexes(cursor))
+
+            if not proposals:
+                self.stdout.write('No index is proposed, none of the queries scans its table')
+                return
+
+            self.stdout.write('Proposed indexes:')
+            for proposal in proposals:
+                self.stdout.write('    {}; -- {}'.format(proposal.get('sql'), proposal.get('reason')))
+
+            if options.get('sql'):
+                with open(options.get('sql'), 'w') as sql_file:
+                    sql_file.write(''.join('{};\n'.format(proposal.get('sql')) for proposal in proposals))
+                    sql_file.write('ANALYZE;\n')
+
+                self.stdout.write('Statements written to {}'.format(options.get('sql')))
+
+            if options.get('create'):
+                create_indexes(conn, proposals)
+
+                analysed_queries_after = analyse_queries(cursor, representative_queries, repeat=options.get('repeat'))
+                self._write_comparison(analysed_queries, analysed_queries_after)
+
+        except sqlite3.Error as e:
+            discard = True
+            self.stderr.write('{} in {}'.format(
+                e,
+                os.path.normpath(copy_path if options.get('create') else database_path),
+            ))
+
+        finally:
+            if conn is not None:
+                if options.get('create'):
+                    conn.close()
+                else:
+                    release_connection(conn, discard=discard)
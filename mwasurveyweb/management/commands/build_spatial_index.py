@@ -0,0 +1,38 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import os
+import sqlite3
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from ...utility.spatial import build_spatial_index
+
+
+class Command(BaseCommand):
+    """
+    Django management command class to build the spatial index of the observation positions used by the cone searches.
+    Each time observations are added to the GLEAM-X database it is required to build the index again, until then the
+    cone searches do not use it.
+    """
+
+    help = 'Builds the R*Tree index of the observation pointings in a file next to the GLEAM-X database, used by the ' \
+           'cone searches'
+
+    def add_arguments(self, parser):
+        pass
+
+    def handle(self, *args, **options):
+
+        index_path = settings.GLEAM_SPATIAL_INDEX_PATH
+
+        try:
+            count = build_spatial_index(index_path)
+
+        except (OSError, sqlite3.Error) as e:
+            self.stderr.write('{} while building {}'.format(e, os.path.normpath(index_path)))
+
+        else:
+            self.stdout.write('{} observation positions indexed in {}'.format(count, os.path.normpath(index_path)))
@@ -0,0 +1,20 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+from django.core.management import BaseCommand
+
+from ...utility.search_state import clear_expired_search_states
+
+
+class Command(BaseCommand):
+    """
+    Django management command class to remove the search states that have expired, it is meant to be run regularly
+    the same way as clearsessions.
+    """
+
+    help = 'Removes the search states not used for SEARCH_STATE_EXPIRY_DAYS days'
+
+    def handle(self, *args, **options):
+
+        self.stdout.write('{} search states removed'.format(clear_expired_search_states()))
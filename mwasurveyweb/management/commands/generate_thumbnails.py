@@ -0,0 +1,52 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+from django.core.management import BaseCommand
+
+from ...utility.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    """
+    Django management command class to generate the thumbnails of the plot images of the observations. The observation
+    pages show the thumbnails of the images that have them and the full images for the rest.
+    """
+
+    help = 'Renders the WebP and PNG thumbnails of the plot images of the observations added or modified since the ' \
+           'last run and removes the thumbnails of the images that have been removed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'observation_ids',
+            nargs='*',
+            help='Observation ids to generate the thumbnails for, all the observations with plot images if not given',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Renders the thumbnails of all the images, including the ones that have not changed',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes rendering the thumbnails',
+        )
+
+    def handle(self, *args, **options):
+
+        rendered, unchanged, removed, skipped = generate_thumbnails(
+            observation_ids=options.get('observation_ids') or None,
+            force=options.get('force'),
+            workers=options.get('workers'),
+        )
+
+        self.stdout.write(
+            '{rendered} images rendered, {unchanged} unchanged, {removed} removed, {skipped} skipped'.format(
+                rendered=rendered,
+                unchanged=unchanged,
+                removed=removed,
+                skipped=skipped,
+            )
+        )
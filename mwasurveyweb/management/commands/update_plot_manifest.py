@@ -0,0 +1,35 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+from django.core.management import BaseCommand
+
+from ...utility.plots import update_plot_manifests
+
+
+class Command(BaseCommand):
+    """
+    Django management command class to update the manifests of the plot images of the observations. The observation
+    pages update an outdated manifest themselves, running this command after new plots are copied saves the listing of
+    the directories to the first views.
+    """
+
+    help = 'Lists the directories of the plot images of the observations that have changed since the last run and ' \
+           'stores the images found in the manifests read by the observation pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Lists all the directories, including the ones that have not changed',
+        )
+
+    def handle(self, *args, **options):
+
+        updated, unchanged, removed = update_plot_manifests(force=options.get('force'))
+
+        self.stdout.write('{updated} manifests updated, {unchanged} unchanged, {removed} removed'.format(
+            updated=updated,
+            unchanged=unchanged,
+            removed=removed,
+        ))
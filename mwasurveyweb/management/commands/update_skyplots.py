@@ -4,7 +4,11 @@ Distributed under the MIT License. See LICENSE.txt for more info.
 
 from django.core.management import BaseCommand
 
-from ...utility.skyplots import generate_sky_plots
+from ...utility.skyplots import (
+    generate_sky_plots,
+    MARKERS,
+    DENSITY,
+)
 
 
 class Command(BaseCommand):
@@ -15,8 +19,24 @@ class Command(BaseCommand):
     help = 'Generates sky plots based on the current configuration and removes any obsolete ones before finishes'
 
     def add_arguments(self, parser):
-        pass
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Generates the sky plots even if the observations and the configuration have not changed',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes rendering the sky plots',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=[MARKERS, DENSITY],
+            help='Draws a marker for each observation or the density of the observations, overrides SKY_PLOTS_MODE '
+                 'of the settings',
+        )
 
     def handle(self, *args, **options):
 
-        generate_sky_plots()
+        generate_sky_plots(force=options.get('force'), workers=options.get('workers'), mode=options.get('mode'))
@@ -0,0 +1,63 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import os
+import sqlite3
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from ... import constants
+from ...models import SearchInput
+from ...utility.search import get_search_keys
+from ...utility.text_index import update_text_index
+
+
+class Command(BaseCommand):
+    """
+    Django management command class to build and update the full-text index of the fields of the full-text search
+    inputs. Each time the GLEAM-X database is updated it is required to update the index, until then the index of a
+    table whose text has changed is not used and its rows are searched without it.
+    """
+
+    help = 'Builds or updates the FTS5 index of the fields of the full-text search inputs in a file next to the ' \
+           'GLEAM-X database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Builds the index from scratch instead of updating the rows added, changed or removed',
+        )
+
+    def handle(self, *args, **options):
+
+        # the fields of the full-text search inputs, grouped by table
+        sources = dict()
+
+        for table_name, field_name in SearchInput.objects.filter(input_type=constants.FULL_TEXT, active=True) \
+                .values_list('table_name', 'field_name'):
+
+            order_by, tie_breaker, key_fields = get_search_keys(table_name)
+
+            source = sources.setdefault(table_name, dict(key=tie_breaker, fields=[]))
+
+            # sorted, so that the fields are in the same order each time and the index is not made again
+            source.update(fields=sorted(set(source.get('fields') + [field.strip() for field in field_name.split(',')])))
+
+        index_path = settings.GLEAM_TEXT_INDEX_PATH
+
+        try:
+            results = update_text_index(index_path, sources, rebuild=options.get('rebuild'))
+
+        except (OSError, sqlite3.Error) as e:
+            self.stderr.write('{} while updating {}'.format(e, os.path.normpath(index_path)))
+
+        else:
+            for table, (indexed, removed) in sorted(results.items()):
+                self.stdout.write('{table}: {indexed} rows indexed, {removed} rows removed'.format(
+                    table=table,
+                    indexed=indexed,
+                    removed=removed,
+                ))
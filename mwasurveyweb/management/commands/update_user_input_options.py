@@ -8,6 +8,10 @@ import os
 from django.conf import settings
 from django.core.management import BaseCommand
 
+from ...utility.database import (
+    acquire_connection,
+    release_connection,
+)
 from ...models import (
     SearchInputOption,
     SearchInputGroup,
@@ -33,7 +37,7 @@ class Command(BaseCommand):
 
         try:
 
-            conn = sqlite3.connect(settings.GLEAM_DATABASE_PATH)
+            conn = acquire_connection()
 
             cursor = conn.cursor()
 
@@ -81,7 +85,4 @@ class Command(BaseCommand):
                 except (SearchInputGroup.DoesNotExist, SearchInput.DoesNotExist):
                     continue
 
-            try:
-                conn.close()
-            except sqlite3.Error:
-                pass
+            release_connection(conn)
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.4 on 2019-09-02 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mwasurveyweb', '0013_add_observation_id_to_search_observation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchState',
+            fields=[
+                ('id', models.CharField(max_length=16, primary_key=True, serialize=False)),
+                ('version', models.PositiveSmallIntegerField()),
+                ('state', models.TextField()),
+                ('creation_time', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,90 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+from django.db import migrations, models
+
+from mwasurveyweb import constants
+from mwasurveyweb.models import SearchInput as SInput
+
+
+def update(apps, schema_editor):
+    SearchInput = apps.get_model('mwasurveyweb', 'SearchInput')
+    SearchInputGroup = apps.get_model('mwasurveyweb', 'SearchInputGroup')
+
+    try:
+        info_group = SearchInputGroup.objects.get(name='observation_pointing')
+
+    except SearchInputGroup.DoesNotExist:
+        pass
+
+    else:
+
+        # increase the order of the inputs after dec to create space for the cone input
+        search_inputs = SearchInput.objects.filter(search_input_group=info_group, display_order__gte=2) \
+            .order_by('-display_order')
+
+        for search_input in search_inputs:
+            display_order = search_input.display_order + 1
+            search_input.display_order = display_order
+            search_input.save()
+
+        SearchInput.objects.create(
+            search_input_group=info_group,
+            name='cone',
+            display_name='Cone in deg',
+            table_name='observation',
+            field_name='ra_pointing,dec_pointing',
+            field_type=SInput.FLOAT,
+            input_type=constants.CONE,
+            initial_value=None,
+            placeholder=None,
+            required=False,
+            input_info='RA of the centre#$#Dec of the centre#$#Angular distance from the centre',
+            display_order=2,
+        )
+
+
+def revert(apps, schema_editor):
+    SearchInput = apps.get_model('mwasurveyweb', 'SearchInput')
+    SearchInputGroup = apps.get_model('mwasurveyweb', 'SearchInputGroup')
+
+    try:
+        info_group = SearchInputGroup.objects.get(name='observation_pointing')
+
+    except SearchInputGroup.DoesNotExist:
+        pass
+
+    else:
+
+        SearchInput.objects.filter(
+            search_input_group=info_group,
+            name='cone',
+            table_name='observation',
+            field_name='ra_pointing,dec_pointing',
+        ).delete()
+
+        # decrease the order of the inputs after the cone input
+        search_inputs = SearchInput.objects.filter(search_input_group=info_group, display_order__gt=2) \
+            .order_by('display_order')
+
+        for search_input in search_inputs:
+            display_order = search_input.display_order - 1
+            search_input.display_order = display_order
+            search_input.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mwasurveyweb', '0014_searchstate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchinput',
+            name='input_type',
+            field=models.CharField(choices=[('text', 'Text'), ('number', 'Number (Int)'), ('min_number', 'Min Number (Int)'), ('max_number', 'Max Number (Int)'), ('max_absolute_number', 'Max Absolute Number (Int)'), ('checkbox', 'Checkbox'), ('radius', 'RADIUS (Point, +/-)'), ('cone', 'Cone (RA, Dec, Radius)'), ('range', 'Range (Min, Max)'), ('range_integer', 'Range Integer (Min, Max)'), ('range_non_negative_int', 'Range Non-negative Integer (Min, Max)'), ('select', 'Select'), ('gps_datetime', 'GPS Date Time'), ('gps_datetime_range', 'GPS Date Range (Start, End)'), ('unix_datetime', 'UNIX Date Time'), ('unix_datetime_range', 'UNIX Date Range (Start, End)')], default='Text', max_length=50),
+        ),
+        migrations.RunPython(code=update, reverse_code=revert),
+    ]
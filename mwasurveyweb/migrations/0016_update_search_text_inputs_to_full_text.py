@@ -0,0 +1,97 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+from django.db import migrations, models
+from django.db.models import Max
+
+from mwasurveyweb import constants
+from mwasurveyweb.models import SearchInput as SInput
+
+FULL_TEXT_INFO = 'Words, word* to match the words starting with it, or "quoted phrases"'
+
+# search inputs changed from text to full text, grouped by their search input group
+FULL_TEXT_INPUTS = [
+    ('observation_observation_info', 'observation_name'),
+    ('observation_observation_info', 'calibrators'),
+    ('observation_observation_info', 'peelsrcs'),
+]
+
+
+def update(apps, schema_editor):
+    SearchInput = apps.get_model('mwasurveyweb', 'SearchInput')
+    SearchInputGroup = apps.get_model('mwasurveyweb', 'SearchInputGroup')
+
+    for group_name, input_name in FULL_TEXT_INPUTS:
+        search_input = SearchInput.objects.filter(search_input_group__name=group_name, name=input_name).first()
+
+        if search_input is None:
+            continue
+
+        search_input.input_type = constants.FULL_TEXT
+        search_input.input_info = FULL_TEXT_INFO
+        search_input.save()
+
+    # inserting the input to search the logs of the processing jobs
+    try:
+        info_group = SearchInputGroup.objects.get(name='processing_processing_info')
+
+    except SearchInputGroup.DoesNotExist:
+        pass
+
+    else:
+
+        display_order = SearchInput.objects.filter(search_input_group=info_group) \
+            .aggregate(Max('display_order')).get('display_order__max')
+
+        SearchInput.objects.create(
+            search_input_group=info_group,
+            name='log',
+            display_name='Log',
+            table_name='processing',
+            field_name='stderr,stdout',
+            field_type=SInput.TEXT,
+            input_type=constants.FULL_TEXT,
+            initial_value=None,
+            placeholder=None,
+            required=False,
+            input_info=FULL_TEXT_INFO,
+            display_order=0 if display_order is None else display_order + 1,
+        )
+
+
+def revert(apps, schema_editor):
+    SearchInput = apps.get_model('mwasurveyweb', 'SearchInput')
+
+    for group_name, input_name in FULL_TEXT_INPUTS:
+        search_input = SearchInput.objects.filter(search_input_group__name=group_name, name=input_name).first()
+
+        if search_input is None:
+            continue
+
+        search_input.input_type = constants.TEXT
+        search_input.input_info = ''
+        search_input.save()
+
+    SearchInput.objects.filter(
+        search_input_group__name='processing_processing_info',
+        name='log',
+        table_name='processing',
+        field_name='stderr,stdout',
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mwasurveyweb', '0015_add_cone_search_to_search_observation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchinput',
+            name='input_type',
+            field=models.CharField(choices=[('text', 'Text'), ('full_text', 'Full Text (Words, Prefixes*, "Phrases")'), ('number', 'Number (Int)'), ('min_number', 'Min Number (Int)'), ('max_number', 'Max Number (Int)'), ('max_absolute_number', 'Max Absolute Number (Int)'), ('checkbox', 'Checkbox'), ('radius', 'RADIUS (Point, +/-)'), ('cone', 'Cone (RA, Dec, Radius)'), ('range', 'Range (Min, Max)'), ('range_integer', 'Range Integer (Min, Max)'), ('range_non_negative_int', 'Range Non-negative Integer (Min, Max)'), ('select', 'Select'), ('gps_datetime', 'GPS Date Time'), ('gps_datetime_range', 'GPS Date Range (Start, End)'), ('unix_datetime', 'UNIX Date Time'), ('unix_datetime_range', 'UNIX Date Range (Start, End)')], default='Text', max_length=50),
+        ),
+        migrations.RunPython(code=update, reverse_code=revert),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.4 on 2019-09-04 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mwasurveyweb', '0016_update_search_text_inputs_to_full_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlotManifest',
+            fields=[
+                ('observation_id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('modified_time', models.BigIntegerField(blank=True, null=True)),
+                ('file_names', models.TextField(blank=True)),
+                ('update_time', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.4 on 2019-09-06 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mwasurveyweb', '0017_plotmanifest'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchstate',
+            name='creation_time',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
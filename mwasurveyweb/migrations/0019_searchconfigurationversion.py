@@ -0,0 +1,21 @@
+# Generated by Django 2.2.4 on 2019-09-09 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mwasurveyweb', '0018_index_searchstate_creation_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchConfigurationVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('update_time', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.4 on 2019-09-10 09:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mwasurveyweb', '0019_searchconfigurationversion'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='searchstate',
+            old_name='creation_time',
+            new_name='last_used_time',
+        ),
+    ]
@@ -109,12 +109,14 @@ class SearchInput(models.Model):
     # input type choices
     INPUT_TYPE_CHOICES = [
         (constants.TEXT, constants.TEXT_DISPLAY),
+        (constants.FULL_TEXT, constants.FULL_TEXT_DISPLAY),
         (constants.NUMBER, constants.NUMBER_DISPLAY),
         (constants.MIN_NUMBER, constants.MIN_NUMBER_DISPLAY),
         (constants.MAX_NUMBER, constants.MAX_NUMBER_DISPLAY),
         (constants.MAX_ABSOLUTE_NUMBER, constants.MAX_ABSOLUTE_NUMBER_DISPLAY),
         (constants.CHECKBOX, constants.CHECKBOX_DISPLAY),
         (constants.RADIUS, constants.RADIUS_DISPLAY),
+        (constants.CONE, constants.CONE_DISPLAY),
         (constants.RANGE, constants.RANGE_DISPLAY),
         (constants.RANGE_INT, constants.RANGE_INT_DISPLAY),
         (constants.RANGE_NON_NEG_INT, constants.RANGE_NON_NEG_INT_DISPLAY),
@@ -196,6 +198,18 @@ class SearchInput(models.Model):
 
             return initial_values
 
+        elif self.input_type == constants.CONE:
+            initial_values = ['', '', '']
+            try:
+                parts = self.initial_value.split(',')
+            except AttributeError:
+                return initial_values
+
+            for index, part in enumerate(parts):
+                initial_values.insert(index, part.strip())
+
+            return initial_values
+
         elif self.input_type in [constants.DATE_GPS_RANGE, constants.DATE_UNIX_RANGE]:
             initial_values = ['', '']
             try:
@@ -230,9 +244,10 @@ class SearchInput(models.Model):
             constants.RADIUS,
             constants.DATE_GPS_RANGE,
             constants.DATE_UNIX_RANGE,
+            constants.CONE,
         ]:
 
-            help_texts = ['', '']
+            help_texts = ['', '', ''] if self.input_type == constants.CONE else ['', '']
 
             try:
                 parts = self.input_info.split('#$#')
@@ -397,3 +412,65 @@ class SkyPlot(models.Model):
 
     def __str__(self):
         return '{} ({})'.format(self.name, self.generation_time) + ' :: default' if self.is_default else ''
+
+
+class SearchState(models.Model):
+    """
+    Storage for the state of a search (query, values, display headers, order and limit). The state is stored once under
+    a short hash of its content, so that pagination and sorting only need to refer to the hash.
+    """
+
+    # hash of the content of the state
+    id = models.CharField(max_length=16, primary_key=True)
+
+    # version of the format of the state, states of other versions are not used
+    version = models.PositiveSmallIntegerField(null=False, blank=False)
+
+    # JSON serialisation of the state
+    state = models.TextField(null=False, blank=False)
+
+    # last time the state was used, set when it is created and moved forward when it is used again, so that the states
+    # in use do not expire
+    last_used_time = models.DateTimeField(null=False, blank=False, auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return '{} (v{})'.format(self.id, self.version)
+
+
+class PlotManifest(models.Model):
+    """
+    Index of the plot images of an observation, so that the directory of the plots is not listed on every view of the
+    observation. The modification time of the directory tells whether the index is still valid.
+    """
+
+    # observation id, which is the name of the directory of the plots as well
+    observation_id = models.CharField(max_length=255, primary_key=True)
+
+    # modification time of the directory in nanoseconds when it was listed, null if the directory did not exist
+    modified_time = models.BigIntegerField(null=True, blank=True)
+
+    # JSON list of the names of the plot images in the directory
+    file_names = models.TextField(null=False, blank=True)
+
+    # last time the directory was listed
+    update_time = models.DateTimeField(null=False, blank=False, auto_now=True)
+
+    def __str__(self):
+        return '{} ({})'.format(self.observation_id, self.update_time)
+
+
+class SearchConfigurationVersion(models.Model):
+    """
+    Version of the search configuration (search pages, input groups, inputs, options and display columns). The compiled
+    search page schemas and the search menu are cached under the version, keeping it in the database lets every worker
+    notice a change of the configuration. A single row is kept.
+    """
+
+    # version, moved forward whenever the search configuration changes
+    version = models.PositiveIntegerField(null=False, blank=False, default=0)
+
+    # last time the search configuration changed
+    update_time = models.DateTimeField(null=False, blank=False, auto_now=True)
+
+    def __str__(self):
+        return '{} ({})'.format(self.version, self.update_time)
@@ -4,11 +4,20 @@ Distributed under the MIT License. See LICENSE.txt for more info.
 
 import os
 
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.conf import settings
 
-from .models import SkyPlot
+from .models import (
+    SkyPlot,
+    SearchPage,
+    SearchInput,
+    SearchInputGroup,
+    SearchInputOption,
+    SearchPageInputGroup,
+    SearchPageDisplayColumn,
+)
+from .utility.schema import invalidate_search_page_schemas
 
 
 @receiver(post_delete, sender=SkyPlot, dispatch_uid='delete_image_file')
@@ -28,3 +37,18 @@ def delete_image_file(instance, **kwargs):
                   )
     except FileNotFoundError:
         pass
+
+
+@receiver([post_save, post_delete], sender=SearchPage, dispatch_uid='invalidate_search_page_schema')
+@receiver([post_save, post_delete], sender=SearchInput, dispatch_uid='invalidate_search_page_schema')
+@receiver([post_save, post_delete], sender=SearchInputGroup, dispatch_uid='invalidate_search_page_schema')
+@receiver([post_save, post_delete], sender=SearchInputOption, dispatch_uid='invalidate_search_page_schema')
+@receiver([post_save, post_delete], sender=SearchPageInputGroup, dispatch_uid='invalidate_search_page_schema')
+@receiver([post_save, post_delete], sender=SearchPageDisplayColumn, dispatch_uid='invalidate_search_page_schema')
+def invalidate_search_page_schema(**kwargs):
+    """
+    Signal to invalidate the compiled search page schemas and the search menu if the search configuration is changed
+    :param kwargs: keyword arguments.
+    :return: Nothing
+    """
+    invalidate_search_page_schemas()
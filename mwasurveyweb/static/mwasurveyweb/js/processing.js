@@ -0,0 +1,89 @@
+// the slim build of jQuery has no ajax, the json is fetched by the browser
+function fetch_json(url) {
+  return fetch(url, {credentials: 'same-origin'})
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.statusText)
+      }
+
+      return response.json()
+    })
+}
+
+// appends a row for a job to the processing history, the cells in the order of the fields
+function append_job(table, fields, job) {
+  var row = $('<tr></tr>')
+
+  $.each(fields, function (index, field) {
+    row.append($('<td></td>').text(job[field] === null ? 'None' : job[field]))
+  })
+
+  row.append($('<td></td>').append(
+    $('<a class="processing-logs">Show</a>').attr('href', job.view_url).attr('data-url', job.logs_url)
+  ))
+
+  table.children('tbody').append(row)
+}
+
+// loads the next page of the processing history
+function load_more(button) {
+  var table = $('#processing-history')
+  var page = table.data('page') + 1
+
+  button.prop('disabled', true)
+
+  fetch_json(table.data('url') + '?page=' + page)
+    .then(function (history) {
+      $.each(history.jobs, function (index, job) {
+        append_job(table, history.fields, job)
+      })
+
+      table.data('page', page)
+      button.prop('hidden', !history.has_next)
+    })
+    .catch(function () {
+    })
+    .then(function () {
+      button.prop('disabled', false)
+    })
+}
+
+// shows the logs of a job in a row below it, or hides them if they are shown
+function toggle_logs(link) {
+  var row = link.closest('tr')
+  var logs_row = row.next('tr.processing-logs-row')
+
+  if (logs_row.length) {
+    logs_row.remove()
+    link.text('Show')
+    return
+  }
+
+  fetch_json(link.data('url'))
+    .then(function (logs) {
+      var cell = $('<td></td>').attr('colspan', row.children('td').length)
+
+      $.each(['stderr', 'stdout'], function (index, field) {
+        cell.append($('<div class="key"></div>').text(field))
+        cell.append($('<pre></pre>').text(logs[field] || ''))
+      })
+
+      row.after($('<tr class="processing-logs-row"></tr>').append(cell))
+      link.text('Hide')
+    })
+    .catch(function () {
+      // the page of the job shows the logs as well
+      window.location.href = link.attr('href')
+    })
+}
+
+$(document).ready(function () {
+  $('#processing-history-more').on('click', function () {
+    load_more($(this))
+  })
+
+  $('#processing-history').on('click', 'a.processing-logs', function (event) {
+    event.preventDefault()
+    toggle_logs($(this))
+  })
+})
@@ -14,42 +14,177 @@ function check_inputs() {
   return colours
 }
 
-function is_colours_there(colours, name) {
-  var success = true
-  for (var count = 0; count < colours.length; count++) {
-    if (!name.includes(colours[count])) {
-      success = false
-      break
-    }
-  }
-  return success
+function get_image_name(image) {
+  var name = ($(image).attr('src') || $(image).attr('data-src')).split('/')
+  return name[name.length - 1].split('?')[0].replace('.png', '')
 }
 
-function only_these_colours(colours, name) {
-  return name.replace('.png', '').length === colours.join('_').length
+function show_image(colours) {
+
+  // the base image (_base) is always shown, the layers of the selected colours are shown on top of it
+  $('#sky-plots > img').each(function () {
+
+    var name = get_image_name(this)
+
+    $(this).attr('hidden', name !== '_base' && colours.indexOf(name) === -1)
+  })
+
+  $('#sky-plots > canvas').each(function () {
+    $(this).attr('hidden', colours.indexOf($(this).data('colour')) === -1)
+  })
 }
 
-function show_image(colours) {
+// projects ra (wrapped in [-pi, pi]) and dec in radian to the aitoff projection, as matplotlib does
+function aitoff(ra, dec) {
+  var half_ra = ra / 2
+  var cos_dec = Math.cos(dec)
+  var alpha = Math.acos(cos_dec * Math.cos(half_ra))
+  var sinc_alpha = alpha === 0 ? 1 : Math.sin(alpha) / alpha
 
-  if (!colours.length) {
-    colours = ['blank']
-  }
+  return [cos_dec * Math.sin(half_ra) / sinc_alpha, Math.sin(dec) / sinc_alpha]
+}
 
-  $('#sky-plots > img').each(function () {
+// finds the pixel of a point in the sky plot images, matplotlib maps the projection to the axes as 0.5 + x / pi
+function to_pixel(figure, ra, dec) {
+  var point = aitoff(ra, dec)
+  var x = figure.axes[0] + (0.5 + point[0] / Math.PI) * figure.axes[2]
+  var y = figure.axes[1] + (0.5 + point[1] / Math.PI) * figure.axes[3]
+
+  return [x * figure.size[0], (1 - y) * figure.size[1]]
+}
+
+function get_layer_colour(layer) {
+  return [
+    parseInt(layer.code.substr(0, 2), 16),
+    parseInt(layer.code.substr(2, 2), 16),
+    parseInt(layer.code.substr(4, 2), 16)
+  ]
+}
+
+// draws a marker for each position of the observations of a layer, as the markers sky plots do
+function draw_marker_layer(canvas, coverage, layer) {
+  var context = canvas.getContext('2d')
+  var colour = get_layer_colour(layer)
+  var radius = coverage.markers.size / 2
+
+  $.each(layer.statuses, function (index, status) {
+    var positions = (coverage.statuses[status] || {positions: []}).positions
+
+    for (var position = 0; position < positions.length; position += 3) {
+      var pixel = to_pixel(coverage.figure, positions[position], positions[position + 1])
+
+      // the observations at the same position are drawn at once, with the opacity of their markers stacked
+      var alpha = 1 - Math.pow(1 - coverage.markers.alpha, positions[position + 2])
+
+      context.fillStyle = 'rgba(' + colour.join(',') + ',' + alpha.toFixed(3) + ')'
+      context.beginPath()
+      context.arc(pixel[0], pixel[1], radius, 0, 2 * Math.PI)
+      context.fill()
+    }
+  })
+}
 
-    $(this).attr('hidden', true)
+// draws the cells of the equal-area grid, equal steps in ra and in sin(dec), covered by the observations of a layer
+function draw_density_layer(canvas, coverage, layer) {
+  var ra_bins = coverage.grid.ra_bins
+  var dec_bins = coverage.grid.dec_bins
+  var counts = {}
+  var max_count = 0
 
-    var name = $(this).attr('src').split('/')
-    name = name[name.length - 1].split('?')[0]
+  $.each(layer.statuses, function (index, status) {
+    var cells = (coverage.statuses[status] || {cells: []}).cells
 
-    if (is_colours_there(colours, name) && only_these_colours(colours, name)) {
-      $(this).attr('hidden', false)
+    for (var count = 0; count < cells.length; count += 2) {
+      counts[cells[count]] = (counts[cells[count]] || 0) + cells[count + 1]
+      max_count = Math.max(max_count, counts[cells[count]])
     }
   })
+
+  var context = canvas.getContext('2d')
+  var colour = get_layer_colour(layer)
+
+  $.each(counts, function (cell, count) {
+    var ra_index = cell % ra_bins
+    var dec_index = Math.floor(cell / ra_bins)
+
+    var ra_start = -Math.PI + 2 * Math.PI * ra_index / ra_bins
+    var ra_end = -Math.PI + 2 * Math.PI * (ra_index + 1) / ra_bins
+    var dec_start = Math.asin(-1 + 2 * dec_index / dec_bins)
+    var dec_end = Math.asin(-1 + 2 * (dec_index + 1) / dec_bins)
+
+    // the opacity grows with the logarithm of the number of observations, as in the density sky plots
+    var alpha = 0.15 + 0.75 * Math.log(1 + count) / Math.log(1 + max_count)
+
+    context.fillStyle = 'rgba(' + colour.join(',') + ',' + alpha.toFixed(3) + ')'
+    context.beginPath()
+
+    $.each([
+      [ra_start, dec_start], [ra_end, dec_start], [ra_end, dec_end], [ra_start, dec_end]
+    ], function (index, corner) {
+      var pixel = to_pixel(coverage.figure, corner[0], corner[1])
+
+      if (index === 0) {
+        context.moveTo(pixel[0], pixel[1])
+      } else {
+        context.lineTo(pixel[0], pixel[1])
+      }
+    })
+
+    context.closePath()
+    context.fill()
+  })
+}
+
+function draw_coverage(coverage) {
+  var sky_plots = $('#sky-plots')
+
+  $.each(coverage.layers, function (index, layer) {
+    var canvas = $('<canvas></canvas>')
+      .attr('width', coverage.figure.size[0])
+      .attr('height', coverage.figure.size[1])
+      .data('colour', layer.name)
+
+    sky_plots.append(canvas)
+
+    if (coverage.mode === 'density') {
+      draw_density_layer(canvas[0], coverage, layer)
+    } else {
+      draw_marker_layer(canvas[0], coverage, layer)
+    }
+  })
+
+  // the layer images are not needed anymore
+  sky_plots.children('img[data-src]').remove()
+}
+
+// falls back to the sky plot images of the layers
+function load_images() {
+  $('#sky-plots > img[data-src]').each(function () {
+    $(this).attr('src', $(this).attr('data-src')).removeAttr('data-src')
+  })
 }
 
 $(document).ready(function () {
   $('.custom-switch-input').on('click', function () {
     show_image(check_inputs())
   })
+
+  // the slim build of jQuery has no ajax, the coverage is fetched by the browser
+  fetch($('#sky-plots').data('coverage-url'), {credentials: 'same-origin'})
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.statusText)
+      }
+
+      return response.json()
+    })
+    .then(function (coverage) {
+      draw_coverage(coverage)
+    })
+    .catch(function () {
+      load_images()
+    })
+    .then(function () {
+      show_image(check_inputs())
+    })
 })
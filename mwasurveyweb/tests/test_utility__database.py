@@ -0,0 +1,108 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import os
+import sqlite3
+
+from django.test import override_settings
+
+from ..utility.database import (
+    acquire_connection,
+    release_connection,
+    gleam_cursor,
+    get_health_metrics,
+    get_database_version,
+)
+from .utils import (
+    GleamDatabaseTestCase,
+    create_gleam_database,
+)
+
+
+class TestDatabase(GleamDatabaseTestCase):
+    """
+    Class to test the pooled read-only connections to the GLEAM-X database
+    """
+
+    def test_database_version(self):
+        """
+        Testing whether the version stamp only depends on the database file, so that every process finds the same one,
+        and changes once for a change of the database however many pooled connections notice it
+        :return: None
+        """
+        connections = [acquire_connection(), acquire_connection()]
+
+        for conn in connections:
+            conn.execute('SELECT count(*) FROM observation').fetchone()
+            release_connection(conn)
+
+        stat = os.stat(self.database_path)
+        version = get_database_version()
+        self.assertEqual(version, '-'.join(str(part) for part in [stat.st_ino, stat.st_size, stat.st_mtime_ns]))
+
+        conn = sqlite3.connect(self.database_path)
+        conn.execute("UPDATE observation SET status = 'archived'")
+        conn.commit()
+        conn.close()
+        os.utime(self.database_path, ns=(stat.st_mtime_ns + 10 ** 9, stat.st_mtime_ns + 10 ** 9))
+
+        new_version = get_database_version()
+        self.assertNotEqual(new_version, version)
+
+        # the other pooled connection noticing the same change does not change the stamp again
+        for conn in [acquire_connection(), acquire_connection()]:
+            release_connection(conn)
+            self.assertEqual(get_database_version(), new_version)
+
+    def test_connection_is_reused(self):
+        """
+        Testing whether a released connection is handed out again
+        :return: None
+        """
+        conn = acquire_connection()
+        release_connection(conn)
+
+        self.assertIs(acquire_connection(), conn)
+
+    def test_connection_is_read_only(self):
+        """
+        Testing whether the connection refuses to modify the database and has the pragmas applied
+        :return: None
+        """
+        with gleam_cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA query_only').fetchone()[0], 1)
+            self.assertEqual(cursor.execute('SELECT count(*) FROM observation').fetchone()[0], 30)
+
+        with self.assertRaises(sqlite3.Error):
+            with gleam_cursor() as cursor:
+                cursor.execute('DELETE FROM observation')
+
+    def test_missing_database_is_not_created(self):
+        """
+        Testing whether a missing database raises an error instead of creating an empty database
+        :return: None
+        """
+        missing_path = os.path.join(self.temp_dir, 'missing.sqlite')
+
+        with override_settings(GLEAM_DATABASE_PATH=missing_path):
+            with self.assertRaises(sqlite3.Error):
+                acquire_connection()
+
+            self.assertFalse(get_health_metrics().get('healthy'))
+
+        self.assertFalse(os.path.exists(missing_path))
+
+    def test_replaced_database_is_reopened(self):
+        """
+        Testing whether idle connections are discarded once the database file is replaced
+        :return: None
+        """
+        conn = acquire_connection()
+        release_connection(conn)
+
+        new_database_path = os.path.join(self.temp_dir, 'GLEAM-X-new.sqlite')
+        create_gleam_database(new_database_path)
+        os.replace(new_database_path, self.database_path)
+
+        self.assertIsNot(acquire_connection(), conn)
@@ -0,0 +1,122 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import csv
+import io
+import sqlite3
+from xml.etree import ElementTree
+
+from ..utility.export import (
+    CSV,
+    VOTABLE,
+    get_export_batches,
+    stream_search_results,
+)
+from .utils import GleamDatabaseTestCase
+
+
+class TestExport(GleamDatabaseTestCase):
+    """
+    Class to test the export of the search results
+    """
+
+    def get_settings(self):
+        return dict(GLEAM_EXPORT_BATCH_SIZE=4)
+
+    def setUp(self):
+        super().setUp()
+
+        self.query = 'SELECT obs_id, status, ra_pointing FROM observation WHERE status = ?'
+        self.query_values = ['imaged']
+        self.order_by = ' ORDER BY ra_pointing DESC'
+        self.display_headers = [
+            dict(table_name='observation', field_name='obs_id', display='Observation ID', gps_time=True),
+            dict(table_name='observation', field_name='status', display='Status', gps_time=False),
+            dict(table_name='observation', field_name='ra_pointing', display='RA', gps_time=False),
+        ]
+
+    def test_batches(self):
+        """
+        Testing whether all the rows are fetched in batches, in order, with the UTC date after the gps time
+        :return: None
+        """
+        batches = list(get_export_batches(self.query, self.query_values, self.order_by, 'obs_id', self.display_headers))
+
+        self.assertEqual([len(rows) for rows in batches], [4, 4, 2])
+
+        rows = [row for rows in batches for row in rows]
+        self.assertEqual(rows[0], (1000000028, '2011-09-14 01:46:53', 'imaged', 336.0))
+        self.assertEqual([row[3] for row in rows], sorted([row[3] for row in rows], reverse=True))
+
+    def test_csv(self):
+        """
+        Testing whether the CSV export has a header and a line per result
+        :return: None
+        """
+        content = ''.join(stream_search_results(
+            CSV, self.query, self.query_values, self.order_by, 'obs_id', self.display_headers, 'observation',
+        ))
+
+        lines = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(lines[0], ['obs_id', 'obs_id_utc', 'status', 'ra_pointing'])
+        self.assertEqual(len(lines), 11)
+        self.assertEqual(lines[1], ['1000000028', '2011-09-14 01:46:53', 'imaged', '336.0'])
+
+    def test_votable(self):
+        """
+        Testing whether the VOTable export is well formed with the data types of the columns
+        :return: None
+        """
+        content = ''.join(stream_search_results(
+            VOTABLE, self.query, self.query_values, self.order_by, 'obs_id', self.display_headers, 'observation',
+        ))
+
+        namespace = {'v': 'http://www.ivoa.net/xml/VOTable/v1.3'}
+        table = ElementTree.fromstring(content).find('v:RESOURCE/v:TABLE', namespace)
+
+        self.assertEqual(
+            [(field.get('name'), field.get('datatype')) for field in table.findall('v:FIELD', namespace)],
+            [('obs_id', 'long'), ('obs_id_utc', 'char'), ('status', 'char'), ('ra_pointing', 'double')],
+        )
+
+        rows = table.findall('v:DATA/v:TABLEDATA/v:TR', namespace)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual([cell.text for cell in rows[0]], ['1000000028', '2011-09-14 01:46:53', 'imaged', '336.0'])
+
+    def test_votable_datatypes(self):
+        """
+        Testing whether the data types of the VOTable hold for all the rows, not only for the first batch
+        :return: None
+        """
+        conn = sqlite3.connect(self.database_path)
+        conn.execute('ALTER TABLE observation ADD COLUMN duration_sec INTEGER')
+        conn.execute('UPDATE observation SET duration_sec = 120 WHERE ra_pointing < 100')
+        conn.commit()
+        conn.close()
+
+        # the fields of the first batch have no value, the starttime header has no table name (ex: an older state)
+        content = ''.join(stream_search_results(
+            VOTABLE,
+            'SELECT duration_sec, starttime, ra_pointing, obs_id FROM observation WHERE status = ?',
+            self.query_values,
+            self.order_by,
+            'obs_id',
+            [
+                dict(table_name='observation', field_name='duration_sec', display='Duration', gps_time=False),
+                dict(field_name='starttime', display='Start Time', gps_time=False),
+            ],
+            'observation',
+        ))
+
+        namespace = {'v': 'http://www.ivoa.net/xml/VOTable/v1.3'}
+        table = ElementTree.fromstring(content).find('v:RESOURCE/v:TABLE', namespace)
+
+        self.assertEqual(
+            [(field.get('name'), field.get('datatype')) for field in table.findall('v:FIELD', namespace)],
+            [('duration_sec', 'long'), ('starttime', 'double')],
+        )
+        self.assertEqual(
+            [row[0].text for row in table.findall('v:DATA/v:TABLEDATA/v:TR', namespace)][-4:],
+            [None, '120', '120', '120'],
+        )
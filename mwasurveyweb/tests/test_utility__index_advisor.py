@@ -0,0 +1,95 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import io
+import os
+import sqlite3
+
+from django.core.cache import cache
+from django.core.management import call_command
+
+from ..models import SearchPage
+from ..utility.index_advisor import propose_indexes
+from .utils import (
+    GleamDatabaseTestCase,
+    create_gleam_search_database,
+)
+
+
+class TestIndexAdvisor(GleamDatabaseTestCase):
+    """
+    Class to test the proposal and the creation of the indexes of the GLEAM-X tables
+    """
+
+    def create_database(self, database_path):
+        create_gleam_search_database(database_path)
+
+    def setUp(self):
+        cache.clear()
+
+        super().setUp()
+
+        # the test database only has the observation table
+        SearchPage.objects.filter(name='processing').update(active=False)
+
+    def test_propose_indexes(self):
+        """
+        Testing whether expression, collation and covering indexes are proposed and redundant ones are left out
+        :return: None
+        """
+        scan = ['SCAN observation']
+
+        analysed_queries = [
+            dict(name='observation page', table='observation', search_filter=None,
+                 plan=scan + ['USE TEMP B-TREE FOR ORDER BY']),
+            dict(name='ion count', table='observation', plan=scan, search_filter=dict(
+                table='observation', field='ion_phs_peak', field_operator='ABS', operator='<=')),
+            dict(name='name count', table='observation', plan=scan, search_filter=dict(
+                table='observation', field='obsname', field_operator=None, operator='LIKE')),
+            dict(name='status count', table='observation', plan=scan, search_filter=dict(
+                table='observation', field='status', field_operator=None, operator='=')),
+            dict(name='time count', table='observation', plan=scan, search_filter=dict(
+                table='observation', field='starttime', field_operator=None, operator='>=')),
+            dict(name='status page', table='observation', plan=scan, search_filter=dict(
+                table='observation', field='status', field_operator=None, operator='=')),
+        ]
+
+        self.assertEqual(
+            [proposal.get('sql') for proposal in propose_indexes(analysed_queries, existing_indexes=[
+                'ix_observation_obsname_collate_nocase',
+            ])],
+            [
+                'CREATE INDEX IF NOT EXISTS ix_observation_starttime_obs_id ON observation (starttime, obs_id)',
+                'CREATE INDEX IF NOT EXISTS ix_observation_abs_ion_phs_peak ON observation (ABS(ion_phs_peak))',
+                'CREATE INDEX IF NOT EXISTS ix_observation_status_starttime_obs_id ON observation '
+                '(status, starttime, obs_id)',
+            ],
+        )
+
+    def test_indexes_are_created_on_a_copy(self):
+        """
+        Testing whether the proposed indexes are created on a copy of the database and used by the search queries
+        :return: None
+        """
+        copy_path = os.path.join(self.temp_dir, 'GLEAM-X.indexed.sqlite')
+        sql_path = os.path.join(self.temp_dir, 'indexes.sql')
+        output = io.StringIO()
+
+        call_command('advise_gleam_indexes', create=True, copy=copy_path, sql=sql_path, repeat=1, stdout=output)
+
+        self.assertIn('speed-up', output.getvalue())
+        self.assertIn('ix_observation_status_starttime_obs_id', open(sql_path).read())
+
+        # the GLEAM-X database is left as it is
+        conn = sqlite3.connect(self.database_path)
+        self.assertEqual(conn.execute("SELECT count(*) FROM sqlite_master WHERE type = 'index'").fetchone()[0], 0)
+        conn.close()
+
+        conn = sqlite3.connect(copy_path)
+        plan = conn.execute(
+            'EXPLAIN QUERY PLAN SELECT count(*) total FROM observation WHERE (observation.status = ?)', ['imaged'],
+        ).fetchall()
+        conn.close()
+
+        self.assertIn('ix_observation_status_starttime_obs_id', plan[0][3])
@@ -0,0 +1,45 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+from django.test import TestCase
+
+from ..utility.paginator import get_page_plan
+
+
+class TestPagePlan(TestCase):
+    """
+    Class to test the choice of the seek position for keyset pagination
+    """
+
+    def test_page_plan(self):
+        """
+        Testing whether pages are reached from the nearest known row
+        :return: None
+        """
+        page_keys = {
+            '1': [[1, 1], [10, 10]],
+            '2': [[11, 11], [20, 20]],
+            '9': [[81, 81], [90, 90]],
+        }
+
+        # first page, nothing is known
+        self.assertEqual(get_page_plan(1, 10), dict(key=None, reverse=False, offset=0, limit=10))
+
+        # next page, seeking forward from the last row of the page before
+        self.assertEqual(
+            get_page_plan(3, 10, total=95, page_keys=page_keys),
+            dict(key=[20, 20], reverse=False, offset=0, limit=10),
+        )
+
+        # previous page, seeking backward from the first row of the page after
+        self.assertEqual(
+            get_page_plan(8, 10, total=95, page_keys=page_keys),
+            dict(key=[81, 81], reverse=True, offset=0, limit=10),
+        )
+
+        # last page, starting from the end of the results
+        self.assertEqual(
+            get_page_plan(10, 10, total=95, page_keys=page_keys),
+            dict(key=None, reverse=True, offset=0, limit=5),
+        )
@@ -0,0 +1,105 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import PlotManifest
+from ..utility.plots import (
+    classify_plot_files,
+    get_plot_file_names,
+)
+
+
+class TestPlots(TestCase):
+    """
+    Class to test the manifests of the plot images of the observations
+    """
+
+    def setUp(self):
+        self.plots_path = tempfile.mkdtemp()
+
+        self.settings_override = override_settings(PLOTS_PATH=self.plots_path)
+        self.settings_override.enable()
+
+        for observation_id, file_names in [
+            ('1200000000', ['b_amp.png', 'a_amp.png', 'a_phase.png', 'a_histogram.png', 'a_phasemap.png', 'notes.txt']),
+            ('1200000120', ['a_amp.png']),
+        ]:
+            os.mkdir(os.path.join(self.plots_path, observation_id))
+
+            for file_name in file_names:
+                open(os.path.join(self.plots_path, observation_id, file_name), 'w').close()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.plots_path)
+
+    def _add_file(self, observation_id, file_name):
+        """
+        Adds a file to the directory of an observation and makes sure the modification time of the directory changes
+        """
+        directory = os.path.join(self.plots_path, observation_id)
+        modified_time = os.stat(directory).st_mtime_ns
+
+        open(os.path.join(directory, file_name), 'w').close()
+        os.utime(directory, ns=(modified_time + 10 ** 9, modified_time + 10 ** 9))
+
+    def test_plot_file_names(self):
+        """
+        Testing whether the plot images are read from the manifest until the directory changes
+        :return: None
+        """
+        self.assertEqual(
+            classify_plot_files('1200000000', get_plot_file_names('1200000000')),
+            (
+                ['images/plots/1200000000/a_amp.png', 'images/plots/1200000000/b_amp.png'],
+                ['images/plots/1200000000/a_phase.png'],
+                'images/plots/1200000000/a_histogram.png',
+                'images/plots/1200000000/a_phasemap.png',
+            ),
+        )
+
+        # the directory is not listed while it has not changed
+        PlotManifest.objects.filter(observation_id='1200000000').update(file_names=json.dumps(['c_amp.png']))
+        self.assertEqual(get_plot_file_names('1200000000'), ['c_amp.png'])
+
+        self._add_file('1200000000', 'd_amp.png')
+        self.assertIn('d_amp.png', get_plot_file_names('1200000000'))
+
+        # an observation without plots
+        self.assertEqual(get_plot_file_names('1200000240'), [])
+        self.assertTrue(PlotManifest.objects.filter(observation_id='1200000240', modified_time=None).exists())
+
+    def test_update_plot_manifest(self):
+        """
+        Testing whether the command only lists the directories that have changed and removes the manifests of the
+        removed ones
+        :return: None
+        """
+        output = io.StringIO()
+        call_command('update_plot_manifest', stdout=output)
+        self.assertIn('2 manifests updated, 0 unchanged, 0 removed', output.getvalue())
+
+        self._add_file('1200000120', 'a_phase.png')
+        shutil.rmtree(os.path.join(self.plots_path, '1200000000'))
+
+        output = io.StringIO()
+        call_command('update_plot_manifest', stdout=output)
+        self.assertIn('1 manifests updated, 0 unchanged, 1 removed', output.getvalue())
+
+        self.assertEqual(
+            json.loads(PlotManifest.objects.get(observation_id='1200000120').file_names),
+            ['a_amp.png', 'a_phase.png'],
+        )
+
+        output = io.StringIO()
+        call_command('update_plot_manifest', force=True, stdout=output)
+        self.assertIn('1 manifests updated, 0 unchanged, 0 removed', output.getvalue())
@@ -0,0 +1,113 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..models import (
+    SearchPage,
+    SearchInput,
+    SearchPageDisplayColumn,
+    SearchConfigurationVersion,
+)
+from ..utility.schema import (
+    SEARCH_CONFIGURATION_VERSION_ID,
+    get_search_page_schema,
+    get_search_menu,
+    invalidate_search_page_schemas,
+)
+
+
+class TestSearchPageSchema(TestCase):
+    """
+    Class to test the compiled search page schema
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_schema_is_cached(self):
+        """
+        Testing whether the schema is built with a fixed number of queries and then served from the cache, only the
+        version of the search configuration is read
+        :return: None
+        """
+        with self.assertNumQueries(5):
+            schema = get_search_page_schema('observation')
+
+        self.assertTrue(schema.get('groups'))
+        self.assertTrue(schema.get('display_columns'))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_search_page_schema('observation'), schema)
+
+    def test_schema_is_invalidated(self):
+        """
+        Testing whether changing the search configuration rebuilds the schema
+        :return: None
+        """
+        schema = get_search_page_schema('observation')
+
+        search_input = SearchInput.objects.get(search_input_group__name='observation_observation_info', name='status')
+        search_input.display_name = 'Observation Status'
+        search_input.save()
+
+        fieldsets = [group.get('fieldsets') for group in get_search_page_schema('observation').get('groups')]
+        self.assertIn('Observation Status', [fieldset.get('status', dict()).get('title') for fieldset in fieldsets])
+
+        SearchPageDisplayColumn.objects.filter(search_page__name='observation', field_name='status').delete()
+
+        self.assertEqual(
+            len(get_search_page_schema('observation').get('display_columns')),
+            len(schema.get('display_columns')) - 1,
+        )
+
+    def test_search_menu_is_cached(self):
+        """
+        Testing whether the search menu is built with a single query, served from the cache and rebuilt once the search
+        pages change
+        :return: None
+        """
+        with self.assertNumQueries(2):
+            menu = get_search_menu()
+
+        self.assertEqual([item.get('display') for item in menu], ['Search Observation', 'Search Processing'])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_search_menu(), menu)
+
+        search_page = SearchPage.objects.get(name='processing')
+        search_page.display_name = 'Jobs'
+        search_page.save()
+
+        self.assertEqual([item.get('display') for item in get_search_menu()], ['Search Observation', 'Search Jobs'])
+
+    def test_schema_is_invalidated_in_every_worker(self):
+        """
+        Testing whether a change of the search configuration made through another worker, whose cache is not shared,
+        rebuilds the schema and the search menu
+        :return: None
+        """
+        schema = get_search_page_schema('observation')
+        menu = get_search_menu()
+
+        # the other worker changes the configuration and moves the version forward, the cache of this worker keeps
+        # the old entries
+        with patch('mwasurveyweb.signals.invalidate_search_page_schemas'):
+            SearchPage.objects.filter(name='processing').update(display_name='Jobs')
+            SearchPageDisplayColumn.objects.filter(search_page__name='observation', field_name='status').delete()
+
+        SearchConfigurationVersion.objects.create(pk=SEARCH_CONFIGURATION_VERSION_ID, version=1)
+
+        self.assertEqual(
+            len(get_search_page_schema('observation').get('display_columns')),
+            len(schema.get('display_columns')) - 1,
+        )
+        self.assertNotEqual(get_search_menu(), menu)
+
+        # the version is moved forward in the database
+        invalidate_search_page_schemas()
+        self.assertEqual(SearchConfigurationVersion.objects.get().version, 2)
@@ -0,0 +1,40 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory
+
+from ..utility.search import SearchQuery
+from ..views.search.search import build_search_forms
+
+
+class TestSearchQuery(TestCase):
+    """
+    Class to test the generation of the search query from the search forms
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_query_is_generated_from_compiled_schema(self):
+        """
+        Testing whether the search inputs are resolved from the compiled schema instead of the database, only the
+        version of the search configuration is read
+        :return: None
+        """
+        request = RequestFactory().post('/search_observation/', {
+            'results_per_page': 50,
+            'observation_observation_info__status__0': 'imaged',
+            'observation_observation_info__observation_id__0': '1000000000',
+        })
+
+        search_forms = build_search_forms(request, 'observation')
+
+        with self.assertNumQueries(1):
+            query, query_count, query_values = SearchQuery(search_forms, 'observation').get_query()[:3]
+
+        self.assertIn('(observation.status = ?)', query)
+        self.assertIn('(observation.obs_id = ?)', query_count)
+        self.assertIn('imaged', query_values)
+        self.assertIn(1000000000, query_values)
@@ -0,0 +1,112 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import io
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import SearchState
+from ..utility.search_state import (
+    SEARCH_STATE_VERSION,
+    save_search_state,
+    get_search_state,
+)
+
+
+class TestSearchState(TestCase):
+    """
+    Class to test the storage of the search states
+    """
+
+    def setUp(self):
+        cache.clear()
+
+        self.state = dict(
+            form_type='observation',
+            query='SELECT observation.starttime FROM observation WHERE (observation.status = ?)',
+            query_count='SELECT count(*) total FROM observation WHERE (observation.status = ?)',
+            query_values=['imaged'],
+            filter_signature='0123456789abcdef',
+            display_headers=[dict(display='GPS ID', field_name='starttime', sort_order='', gps_time=True)],
+            order_by=' ORDER BY starttime ASC',
+            limit=100,
+            tie_breaker='starttime',
+        )
+
+    def test_search_state(self):
+        """
+        Testing whether a search state is stored once under a short hash and read back as it was stored
+        :return: None
+        """
+        state_id = save_search_state(**self.state)
+
+        self.assertEqual(len(state_id), 16)
+        self.assertEqual(save_search_state(**self.state), state_id)
+        self.assertEqual(SearchState.objects.count(), 1)
+
+        # the state is read from the database and refreshed once, then read from the cache
+        cache.clear()
+        with self.assertNumQueries(2):
+            self.assertEqual(get_search_state(state_id, 'observation'), self.state)
+            self.assertEqual(get_search_state(state_id, 'observation'), self.state)
+
+        # a different order is a different state
+        self.state.update(order_by=' ORDER BY starttime DESC')
+        self.assertNotEqual(save_search_state(**self.state), state_id)
+
+    def test_unknown_search_state(self):
+        """
+        Testing whether unknown states, states of another search page and states of another version are not used
+        :return: None
+        """
+        state_id = save_search_state(**self.state)
+
+        self.assertIsNone(get_search_state(None, 'observation'))
+        self.assertIsNone(get_search_state('0000000000000000', 'observation'))
+        self.assertIsNone(get_search_state(state_id, 'processing'))
+
+        cache.clear()
+        SearchState.objects.filter(id=state_id).update(version=0)
+        self.assertIsNone(get_search_state(state_id, 'observation'))
+
+    @override_settings(SEARCH_STATE_EXPIRY_DAYS=30)
+    def test_search_state_expiry(self):
+        """
+        Testing whether the states not used for SEARCH_STATE_EXPIRY_DAYS are removed, and the states in use are kept
+        and stored again if they were removed
+        :return: None
+        """
+        state_id = save_search_state(**self.state)
+
+        self.state.update(order_by=' ORDER BY starttime DESC')
+        unused_state_id = save_search_state(**self.state)
+
+        SearchState.objects.update(last_used_time=timezone.now() - timedelta(days=31))
+
+        # looking up a state moves its last used time forward
+        cache.clear()
+        self.assertIsNotNone(get_search_state(state_id, 'observation'))
+
+        output = io.StringIO()
+        call_command('clear_search_states', stdout=output)
+
+        self.assertIn('1 search states removed', output.getvalue())
+        self.assertEqual(list(SearchState.objects.values_list('id', flat=True)), [state_id])
+
+        # a state removed while its cached copy is in use is stored again once refreshed
+        SearchState.objects.all().delete()
+        self.assertEqual(get_search_state(state_id, 'observation').get('order_by'), ' ORDER BY starttime ASC')
+        self.assertFalse(SearchState.objects.exists())
+
+        cache.delete('search_state_refreshed:{}:{}'.format(SEARCH_STATE_VERSION, state_id))
+        self.assertIsNotNone(get_search_state(state_id, 'observation'))
+        self.assertTrue(SearchState.objects.filter(id=state_id).exists())
+
+        # searching again for a removed state stores it again
+        self.assertEqual(save_search_state(**self.state), unused_state_id)
+        self.assertTrue(SearchState.objects.filter(id=unused_state_id).exists())
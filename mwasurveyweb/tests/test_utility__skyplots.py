@@ -0,0 +1,151 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import os
+import sqlite3
+from unittest import mock
+
+import numpy as np
+
+from ..models import (
+    Colour,
+    SkyPlot,
+)
+from ..utility import skyplots
+from .utils import GleamDatabaseTestCase
+
+
+class TestSkyPlots(GleamDatabaseTestCase):
+    """
+    Class to test the generation of the sky plots
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.directory_patch = mock.patch.object(skyplots, 'get_sky_plots_directory', return_value=self.temp_dir)
+        self.directory_patch.start()
+
+    def tearDown(self):
+        self.directory_patch.stop()
+        super().tearDown()
+
+    def test_layers_are_generated_once(self):
+        """
+        Testing whether a layer per colour is generated and nothing is generated again until a status changes
+        :return: None
+        """
+        skyplots.generate_sky_plots()
+
+        self.assertEqual(
+            sorted(SkyPlot.objects.values_list('name', flat=True)),
+            ['/images/skyplots/{}.png'.format(name) for name in ['_base', 'blue', 'light-grey', 'yellow']],
+        )
+
+        for name in ['_base', 'blue', 'light-grey', 'yellow']:
+            self.assertTrue(os.path.exists(os.path.join(self.temp_dir, '{}.png'.format(name))))
+
+        with mock.patch.object(
+                skyplots,
+                'generate_sky_plot_by_colour',
+                wraps=skyplots.generate_sky_plot_by_colour,
+        ) as mock_generate:
+            skyplots.generate_sky_plots()
+            self.assertFalse(mock_generate.called)
+
+            conn = sqlite3.connect(self.database_path)
+            conn.execute("UPDATE observation SET status = 'archived' WHERE obs_id = 1000000000")
+            conn.commit()
+            conn.close()
+
+            skyplots.generate_sky_plots()
+            self.assertEqual(mock_generate.call_count, 3)
+
+    def test_base_image_name_is_reserved(self):
+        """
+        Testing whether a colour named like the earlier base image gets a layer of its own
+        :return: None
+        """
+        Colour.objects.filter(name='blue').update(name='blank')
+
+        skyplots.generate_sky_plots()
+
+        self.assertEqual(
+            sorted(SkyPlot.objects.values_list('name', flat=True)),
+            ['/images/skyplots/{}.png'.format(name) for name in ['_base', 'blank', 'light-grey', 'yellow']],
+        )
+
+        with open(os.path.join(self.temp_dir, '_base.png'), 'rb') as base_file, \
+                open(os.path.join(self.temp_dir, 'blank.png'), 'rb') as layer_file:
+            self.assertNotEqual(base_file.read(), layer_file.read())
+
+    def test_layers_are_rendered_in_worker_processes(self):
+        """
+        Testing whether the worker processes render the same images as the current process
+        :return: None
+        """
+        skyplots.generate_sky_plots()
+
+        images = dict()
+        for name in ['_base', 'blue', 'light-grey', 'yellow']:
+            with open(os.path.join(self.temp_dir, '{}.png'.format(name)), 'rb') as image_file:
+                images.update({name: image_file.read()})
+
+        skyplots.generate_sky_plots(force=True, workers=2)
+
+        for name in ['_base', 'blue', 'light-grey', 'yellow']:
+            with open(os.path.join(self.temp_dir, '{}.png'.format(name)), 'rb') as image_file:
+                self.assertEqual(image_file.read(), images.get(name))
+
+        self.assertEqual(SkyPlot.objects.count(), 4)
+        self.assertEqual(
+            sorted(os.listdir(self.temp_dir)),
+            ['GLEAM-X.sqlite', '_base.png', 'blue.png', 'light-grey.png', 'signature.txt', 'yellow.png'],
+        )
+
+    def test_plot_coordinates_match_astropy(self):
+        """
+        Testing whether the coordinates of the projection are the same as the ones computed by astropy
+        :return: None
+        """
+        import astropy.units as u
+        from astropy.coordinates import SkyCoord
+
+        random_state = np.random.RandomState(0)
+
+        ra = np.concatenate([
+            random_state.uniform(-720, 720, 10000),
+            [0, 180, -180, 360, 540, 179.99999999999997, 180.00000000000003, -0.0, 359.99999999999994],
+        ])
+        dec = random_state.uniform(-90, 90, len(ra))
+
+        c = SkyCoord(ra=ra, dec=dec, frame='icrs', unit=(u.degree, u.degree))
+        ra_rad, dec_rad = skyplots.get_plot_coordinates(ra, dec)
+
+        np.testing.assert_allclose(ra_rad, c.ra.wrap_at(180 * u.deg).radian, rtol=0, atol=1e-12)
+        np.testing.assert_allclose(dec_rad, c.dec.radian, rtol=0, atol=1e-12)
+
+        self.assertTrue(np.all((ra_rad >= -np.pi) & (ra_rad < np.pi)))
+
+    def test_density_of_observations(self):
+        """
+        Testing whether the observations are counted in cells of equal area and drawn in the density mode
+        :return: None
+        """
+        ra_edges, dec_edges = skyplots.get_density_grid((12, 6))
+
+        # area of the cells, which is proportional to the difference of ra and of sin(dec) between the edges
+        areas = np.outer(np.diff(np.sin(dec_edges)), np.diff(ra_edges))
+        np.testing.assert_allclose(areas, 4 * np.pi / 72)
+
+        counts = skyplots.get_density(np.array([0.0, 10.0, 359.0, 180.0]), np.array([-89.0, 0.0, 0.0, 89.0]), (12, 6))
+        self.assertEqual(counts.shape, (6, 12))
+        self.assertEqual(counts.sum(), 4)
+        self.assertEqual(counts[0, 6], 1)
+        self.assertEqual(counts[5, 0], 1)
+
+        skyplots.generate_sky_plots(mode=skyplots.DENSITY)
+
+        self.assertEqual(SkyPlot.objects.count(), 4)
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, 'yellow.png')))
@@ -0,0 +1,250 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import io
+import math
+import os
+import sqlite3
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.urls import reverse
+
+from accounts.models import User
+from ..utility.database import gleam_cursor
+from ..utility.search import compile_search_query
+from ..utility.search_state import get_search_state
+from ..utility.spatial import get_cone_condition, is_spatial_index_current
+from .utils import (
+    GleamDatabaseTestCase,
+    create_gleam_search_database,
+)
+
+
+def get_angular_distance(ra_1, dec_1, ra_2, dec_2):
+    """
+    Finds the angular distance between two positions using the spherical law of cosines
+    :return: angular distance in degrees
+    """
+    ra_1, dec_1, ra_2, dec_2 = [math.radians(value) for value in [ra_1, dec_1, ra_2, dec_2]]
+
+    cosine = math.sin(dec_1) * math.sin(dec_2) + math.cos(dec_1) * math.cos(dec_2) * math.cos(ra_1 - ra_2)
+
+    return math.degrees(math.acos(min(max(cosine, -1), 1)))
+
+
+class TestSpatial(GleamDatabaseTestCase):
+    """
+    Class to test the cone searches with and without the spatial index
+    """
+
+    # centres and radii of the cones, around the wrap-around of the RA, a pole and elsewhere
+    cones = [
+        (359.0, -30.0, 5.0),
+        (1.0, 10.0, 12.5),
+        (180.0, -87.0, 6.0),
+        (90.0, 45.0, 20.0),
+        (123.0, 4.0, 0.5),
+    ]
+
+    def create_database(self, database_path):
+        create_gleam_search_database(database_path)
+
+        # a grid of positions over the whole sky
+        conn = sqlite3.connect(database_path)
+        conn.executemany(
+            'INSERT INTO observation (obs_id, starttime, calibration, archived, status, ra_pointing, dec_pointing) '
+            'VALUES (?, ?, 0, 0, ?, ?, ?)',
+            [
+                (1300000000 + index * 120, 1300000000 + index * 120, 'imaged', ra, dec)
+                for index, (ra, dec) in enumerate(
+                    (ra + 0.5, dec) for ra in range(0, 360, 3) for dec in range(-89, 90, 4)
+                )
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+    def get_settings(self):
+        return dict(GLEAM_SPATIAL_INDEX_PATH=os.path.join(self.temp_dir, 'GLEAM-X.spatial.sqlite'))
+
+    def setUp(self):
+        cache.clear()
+        caches['search'].clear()
+
+        super().setUp()
+
+        conn = sqlite3.connect(self.database_path)
+        self.positions = conn.execute('SELECT obs_id, ra_pointing, dec_pointing FROM observation').fetchall()
+        conn.close()
+
+    def _search_cone(self, ra, dec, radius):
+        """
+        Finds the observations in a cone using the cone condition
+        :return: condition string and the set of the observation ids
+        """
+        condition, values = get_cone_condition('observation', 'ra_pointing', 'dec_pointing', ra, dec, radius)
+
+        with gleam_cursor() as cursor:
+            rows = cursor.execute('SELECT obs_id FROM observation WHERE {}'.format(condition), values).fetchall()
+
+        return condition, set(row[0] for row in rows)
+
+    def _get_expected(self, ra, dec, radius):
+        """
+        Finds the observations in a cone by comparing the distance of every position
+        :return: set of the observation ids
+        """
+        return set(
+            obs_id for obs_id, obs_ra, obs_dec in self.positions
+            if get_angular_distance(ra, dec, obs_ra, obs_dec) <= radius
+        )
+
+    def test_cone_without_index(self):
+        """
+        Testing whether the cones are found by their angular distances when the spatial index is not built
+        :return: None
+        """
+        self.assertFalse(is_spatial_index_current())
+
+        for ra, dec, radius in self.cones:
+            condition, obs_ids = self._search_cone(ra, dec, radius)
+
+            self.assertNotIn('spatial.', condition)
+            self.assertEqual(obs_ids, self._get_expected(ra, dec, radius))
+
+        # the RA of the box wraps around at 0/360
+        self.assertIn('OR', self._search_cone(359.0, -30.0, 5.0)[0])
+
+    def test_cone_with_index(self):
+        """
+        Testing whether the cones are found using the spatial index once it is built, until the positions change
+        :return: None
+        """
+        output = io.StringIO()
+        call_command('build_spatial_index', stdout=output)
+        self.assertIn('{} observation positions indexed'.format(len(self.positions)), output.getvalue())
+
+        self.assertTrue(is_spatial_index_current())
+
+        for ra, dec, radius in self.cones:
+            condition, obs_ids = self._search_cone(ra, dec, radius)
+
+            self.assertIn('spatial.observation_rtree', condition)
+            self.assertEqual(obs_ids, self._get_expected(ra, dec, radius))
+
+        # the status of an observation does not change the positions
+        conn = sqlite3.connect(self.database_path)
+        conn.execute("UPDATE observation SET status = 'archived' WHERE obs_id = 1200000000")
+        conn.commit()
+        self.assertTrue(is_spatial_index_current())
+
+        # swapping the positions of two observations keeps the sums of the positions, but not the index
+        conn.execute('UPDATE observation SET ra_pointing = CASE obs_id WHEN 1200000000 THEN 3.0 ELSE 0.0 END '
+                     'WHERE obs_id IN (1200000000, 1200000120)')
+        conn.commit()
+        self.assertFalse(is_spatial_index_current())
+
+        conn.execute('UPDATE observation SET ra_pointing = CASE obs_id WHEN 1200000000 THEN 0.0 ELSE 3.0 END '
+                     'WHERE obs_id IN (1200000000, 1200000120)')
+        conn.commit()
+        self.assertTrue(is_spatial_index_current())
+
+        # a new observation makes the index outdated
+        conn.execute('INSERT INTO observation (obs_id, calibration, archived, ra_pointing, dec_pointing) '
+                     'VALUES (1400000000, 0, 0, 359.9, -30.0)')
+        conn.commit()
+        conn.close()
+
+        self.positions.append((1400000000, 359.9, -30.0))
+
+        self.assertFalse(is_spatial_index_current())
+
+        condition, obs_ids = self._search_cone(359.0, -30.0, 5.0)
+        self.assertNotIn('spatial.', condition)
+        self.assertIn(1400000000, obs_ids)
+
+    def test_cone_search(self):
+        """
+        Testing whether the cone input of the observation search page filters the observations
+        :return: None
+        """
+        call_command('build_spatial_index', stdout=io.StringIO())
+
+        user = User.objects.create_user(username='searcher', password='password', email='searcher@example.com')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('search_observation'), {
+            'observation_pointing__cone__0': '359',
+            'observation_pointing__cone__1': '-30',
+            'observation_pointing__cone__2': '5',
+            'results_per_page': '10',
+        }, follow=True)
+
+        self.assertEqual(response.context['paginator'].total, len(self._get_expected(359.0, -30.0, 5.0)))
+
+    def _get_search_pages(self, state_id):
+        """
+        Pages through the results of a search state
+        :return: set of the gps times of the observations found, which are their ids
+        """
+        obs_ids = set()
+        page = 1
+
+        while True:
+            response = self.client.get(reverse('search_observation'), {'q': state_id, 'page': page})
+            headers = [header.get('field_name') for header in response.context['display_headers']]
+
+            obs_ids.update(row[headers.index('starttime')][0] for row in response.context['search_results'])
+
+            if page * 2 >= response.context['paginator'].total:
+                return obs_ids
+
+            page += 1
+
+    def test_saved_cone_search(self):
+        """
+        Testing whether a saved cone search keeps finding the observations of the cone once the spatial index is
+        outdated or removed
+        :return: None
+        """
+        call_command('build_spatial_index', stdout=io.StringIO())
+
+        user = User.objects.create_user(username='searcher', password='password', email='searcher@example.com')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('search_observation'), {
+            'observation_pointing__cone__0': '359',
+            'observation_pointing__cone__1': '-30',
+            'observation_pointing__cone__2': '5',
+            'results_per_page': '2',
+        }, follow=True)
+
+        state_id = response.context['search_state_id']
+        state = get_search_state(state_id, 'observation')
+
+        # the state keeps the inputs of the cone, the condition is formed when the query is run
+        self.assertNotIn('spatial.', state.get('query'))
+        self.assertIn(
+            'spatial.observation_rtree',
+            compile_search_query(state.get('query'), state.get('query_count'), state.get('query_values'))[0],
+        )
+
+        self.assertEqual(self._get_search_pages(state_id), self._get_expected(359.0, -30.0, 5.0))
+
+        # a new observation makes the index outdated
+        conn = sqlite3.connect(self.database_path)
+        conn.execute('INSERT INTO observation (obs_id, starttime, calibration, archived, ra_pointing, dec_pointing) '
+                     'VALUES (1400000000, 1400000000, 0, 0, 359.9, -30.0)')
+        conn.commit()
+        conn.close()
+
+        self.positions.append((1400000000, 359.9, -30.0))
+
+        self.assertIn(1400000000, self._get_search_pages(state_id))
+
+        # the index is removed
+        os.remove(os.path.join(self.temp_dir, 'GLEAM-X.spatial.sqlite'))
+
+        self.assertEqual(self._get_search_pages(state_id), self._get_expected(359.0, -30.0, 5.0))
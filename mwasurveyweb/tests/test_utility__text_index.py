@@ -0,0 +1,195 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import io
+import os
+import sqlite3
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.urls import reverse
+
+from accounts.models import User
+from ..utility.database import gleam_cursor
+from ..utility.search import compile_search_query
+from ..utility.search_state import get_search_state
+from ..utility.text_index import (
+    get_full_text_condition,
+    get_match_query,
+    get_match_terms,
+)
+from .utils import (
+    GleamDatabaseTestCase,
+    create_gleam_search_database,
+)
+
+
+class TestTextIndex(GleamDatabaseTestCase):
+    """
+    Class to test the full-text searches with and without the full-text index
+    """
+
+    def create_database(self, database_path):
+        create_gleam_search_database(database_path)
+
+        conn = sqlite3.connect(database_path)
+        # the observations alternate between the two seasons, every third one has two calibrators
+        conn.execute("UPDATE observation SET obsname = 'high_season' || ((obs_id - 1200000000) / 120 % 2 + 1) || '_' "
+                     "|| obs_id, calibrators = CASE WHEN (obs_id - 1200000000) / 120 % 3 = 0 THEN 'HydA 3C444' "
+                     "ELSE 'PicA' END")
+        conn.execute('CREATE TABLE processing (job_id INTEGER PRIMARY KEY, task_id INTEGER, submission_time INTEGER, '
+                     'task TEXT, user TEXT, obs_id INTEGER, stderr TEXT, stdout TEXT, output_files TEXT, '
+                     'batch_file TEXT, start_time INTEGER, end_time INTEGER, status TEXT)')
+        conn.executemany(
+            'INSERT INTO processing (job_id, task, obs_id, stderr, stdout, status) VALUES (?, ?, ?, ?, ?, ?)',
+            [
+                (job_id, 'image', 1200000000, 'Segmentation fault' if job_id % 4 == 0 else '',
+                 'wsclean finished imaging', 'finished')
+                for job_id in range(1, 21)
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+    def get_settings(self):
+        return dict(GLEAM_TEXT_INDEX_PATH=os.path.join(self.temp_dir, 'GLEAM-X.text.sqlite'))
+
+    def setUp(self):
+        cache.clear()
+        caches['search'].clear()
+
+        super().setUp()
+
+    def _search(self, table, key, fields, text):
+        """
+        Finds the rows of a full-text search using the full-text condition
+        :return: condition string and the set of the keys of the rows
+        """
+        condition, values = get_full_text_condition(table, fields, text)
+
+        with gleam_cursor() as cursor:
+            rows = cursor.execute(
+                'SELECT {key} FROM {table} WHERE {condition}'.format(key=key, table=table, condition=condition),
+                values,
+            ).fetchall()
+
+        return condition, set(row[0] for row in rows)
+
+    def test_match_terms(self):
+        """
+        Testing whether the words, the prefixes and the phrases are found in the text and the full-text query syntax
+        is left out
+        :return: None
+        """
+        terms = get_match_terms('high* "season 1" 3C444 NEAR(a, b) ; -')
+
+        self.assertEqual(terms, [
+            (['high'], True),
+            (['season', '1'], False),
+            (['3C444'], False),
+            (['NEAR', 'a'], False),
+            (['b'], False),
+        ])
+        self.assertEqual(
+            get_match_query(['obsname', 'calibrators'], terms[:3]),
+            '{obsname calibrators} : ("high"* "season 1" "3C444")',
+        )
+        self.assertEqual(get_full_text_condition('observation', ['obsname'], '" ; "'), (None, None))
+
+    def test_full_text_search(self):
+        """
+        Testing whether the full-text index finds the same whole words as the search without it, and whether the
+        search goes without the index once the rows are added, changed or removed after the index was updated
+        :return: None
+        """
+        searches = [
+            ('observation', 'obs_id', ['obsname'], 'high_season1', 20),
+            ('observation', 'obs_id', ['obsname'], 'seas*', 40),
+            ('observation', 'obs_id', ['obsname'], 'season', 0),
+            ('observation', 'obs_id', ['obsname'], 'igh', 0),
+            ('observation', 'obs_id', ['obsname', 'calibrators'], '"HydA 3C444" season2', 7),
+            ('processing', 'job_id', ['stderr', 'stdout'], '"segmentation fault"', 5),
+            ('processing', 'job_id', ['stderr', 'stdout'], 'segment', 0),
+            ('processing', 'job_id', ['stderr', 'stdout'], 'segment*', 5),
+        ]
+
+        for table, key, fields, text, total in searches:
+            condition, keys = self._search(table, key, fields, text)
+            self.assertNotIn('MATCH', condition)
+            self.assertEqual(len(keys), total)
+
+        output = io.StringIO()
+        call_command('update_text_index', stdout=output)
+        self.assertIn('observation: 40 rows indexed, 0 rows removed', output.getvalue())
+        self.assertIn('processing: 20 rows indexed, 0 rows removed', output.getvalue())
+
+        for table, key, fields, text, total in searches:
+            condition, keys = self._search(table, key, fields, text)
+            self.assertIn('MATCH', condition)
+            self.assertEqual(len(keys), total)
+
+        # the index is no longer used once the jobs are added, changed or removed after it was updated
+        conn = sqlite3.connect(self.database_path)
+        conn.execute("INSERT INTO processing (job_id, stderr, stdout) VALUES (21, 'segmentation fault', '')")
+        conn.execute("UPDATE processing SET stderr = '' WHERE job_id = 4")
+        conn.execute('DELETE FROM processing WHERE job_id = 8')
+        conn.commit()
+        conn.close()
+
+        condition, keys = self._search('processing', 'job_id', ['stderr', 'stdout'], '"segmentation fault"')
+        self.assertNotIn('MATCH', condition)
+        self.assertEqual(keys, {12, 16, 20, 21})
+
+        # the index of the unchanged observations is still used
+        self.assertIn('MATCH', self._search('observation', 'obs_id', ['obsname'], 'seas*')[0])
+
+        # the changed and the removed jobs are updated in the index
+        output = io.StringIO()
+        call_command('update_text_index', stdout=output)
+        self.assertIn('processing: 2 rows indexed, 1 rows removed', output.getvalue())
+
+        condition, keys = self._search('processing', 'job_id', ['stderr', 'stdout'], '"segmentation fault"')
+        self.assertIn('MATCH', condition)
+        self.assertEqual(keys, {12, 16, 20, 21})
+
+    def test_full_text_input(self):
+        """
+        Testing whether the observation name input of the observation search page is a full-text search
+        :return: None
+        """
+        call_command('update_text_index', stdout=io.StringIO())
+
+        user = User.objects.create_user(username='searcher', password='password', email='searcher@example.com')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('search_observation'), {
+            'observation_observation_info__observation_name__0': 'season2 high*',
+            'results_per_page': '10',
+        }, follow=True)
+
+        self.assertEqual(response.context['paginator'].total, 20)
+
+        # the state keeps the text of the input, the condition is formed when the query is run
+        state_id = response.context['search_state_id']
+        state = get_search_state(state_id, 'observation')
+
+        self.assertNotIn('MATCH', state.get('query'))
+        self.assertIn(
+            'MATCH',
+            compile_search_query(state.get('query'), state.get('query_count'), state.get('query_values'))[0],
+        )
+
+        # the saved search keeps finding the rows once the index is removed
+        os.remove(os.path.join(self.temp_dir, 'GLEAM-X.text.sqlite'))
+
+        obs_ids = set()
+
+        for page in [1, 2]:
+            response = self.client.get(reverse('search_observation'), {'q': state_id, 'page': page})
+            headers = [header.get('field_name') for header in response.context['display_headers']]
+
+            obs_ids.update(row[headers.index('starttime')][0] for row in response.context['search_results'])
+
+        self.assertEqual(response.context['paginator'].total, 20)
+        self.assertEqual(len(obs_ids), 20)
@@ -0,0 +1,145 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+
+from PIL import Image
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..utility.thumbnails import (
+    get_responsive_image,
+    get_thumbnail_name,
+    read_thumbnail_manifest,
+)
+
+
+class TestThumbnails(TestCase):
+    """
+    Class to test the thumbnails of the plot images of the observations
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.plots_path = os.path.join(self.temp_dir, 'plots')
+        self.thumbnails_path = os.path.join(self.temp_dir, 'thumbnails')
+
+        self.settings_override = override_settings(
+            PLOTS_PATH=self.plots_path,
+            THUMBNAILS_PATH=self.thumbnails_path,
+            THUMBNAIL_WIDTHS=(400, 200, 1000),
+        )
+        self.settings_override.enable()
+
+        os.makedirs(os.path.join(self.plots_path, '1200000000'))
+
+        for file_name, size in [('a_amp.png', (800, 600)), ('a_phase.png', (300, 300))]:
+            Image.new('P', size).save(os.path.join(self.plots_path, '1200000000', file_name))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.temp_dir)
+
+    def _generate(self, **options):
+        """
+        Generates the thumbnails with the command
+        :return: output of the command
+        """
+        output = io.StringIO()
+        call_command('generate_thumbnails', stdout=output, **options)
+        return output.getvalue()
+
+    def test_generate_thumbnails(self):
+        """
+        Testing whether the thumbnails narrower than the images are rendered in every format, only once for each
+        version of an image
+        :return: None
+        """
+        self.assertIn('2 images rendered, 0 unchanged, 0 removed', self._generate())
+
+        manifest = read_thumbnail_manifest('1200000000')
+        self.assertEqual(manifest.get('a_amp.png').get('widths'), [200, 400])
+        self.assertEqual(manifest.get('a_phase.png').get('widths'), [200])
+
+        modified_time = manifest.get('a_amp.png').get('modified_time')
+
+        for image_format, pillow_format in [('webp', 'WEBP'), ('png', 'PNG')]:
+            with Image.open(os.path.join(
+                    self.thumbnails_path,
+                    '1200000000',
+                    get_thumbnail_name('a_amp.png', modified_time, 400, image_format),
+            )) as thumbnail:
+                self.assertEqual((thumbnail.format, thumbnail.size), (pillow_format, (400, 300)))
+
+        self.assertIn('0 images rendered, 2 unchanged, 0 removed', self._generate())
+
+        # a new version of an image replaces the thumbnails of the old one, a removed image loses them
+        source_path = os.path.join(self.plots_path, '1200000000', 'a_amp.png')
+        os.utime(source_path, ns=(modified_time + 10 ** 9, modified_time + 10 ** 9))
+        os.remove(os.path.join(self.plots_path, '1200000000', 'a_phase.png'))
+
+        self.assertIn('1 images rendered, 0 unchanged, 1 removed', self._generate(workers=2))
+
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.thumbnails_path, '1200000000'))),
+            sorted(
+                [get_thumbnail_name('a_amp.png', modified_time + 10 ** 9, width, image_format)
+                 for width in [200, 400] for image_format in ['webp', 'png']] + ['thumbnails.json'],
+            ),
+        )
+
+    def test_responsive_image(self):
+        """
+        Testing whether the srcsets offer the thumbnails and the full image, and an image without thumbnails is shown
+        in full
+        :return: None
+        """
+        self.assertEqual(
+            get_responsive_image('images/plots/1200000000/a_amp.png', dict()).get('src'),
+            '/static/images/plots/1200000000/a_amp.png',
+        )
+        self.assertIsNone(get_responsive_image(None, dict()))
+
+        self._generate()
+
+        manifest = read_thumbnail_manifest('1200000000')
+        image = get_responsive_image('images/plots/1200000000/a_amp.png', manifest)
+
+        thumbnail_url = '/static/images/thumbnails/1200000000/{}'.format(
+            get_thumbnail_name('a_amp.png', manifest.get('a_amp.png').get('modified_time'), 200, 'png'),
+        )
+
+        self.assertEqual(image.get('thumbnail'), thumbnail_url)
+        self.assertTrue(image.get('srcset_png').startswith(thumbnail_url + ' 200w, '))
+        self.assertTrue(image.get('srcset_webp').endswith(', /static/images/plots/1200000000/a_amp.png 800w'))
+
+    def test_broken_image(self):
+        """
+        Testing whether an image that can not be read is skipped without losing the thumbnails of the other images
+        :return: None
+        """
+        source_path = os.path.join(self.plots_path, '1200000000', 'b_amp.png')
+        Image.effect_noise((800, 600), 64).save(source_path)
+
+        # truncating the image
+        with open(source_path, 'r+b') as image_file:
+            image_file.truncate(os.path.getsize(source_path) // 2)
+
+        for workers in [1, 2]:
+            self.assertIn(
+                '2 images rendered, 0 unchanged, 0 removed, 1 skipped',
+                self._generate(force=True, workers=workers),
+            )
+
+            manifest = read_thumbnail_manifest('1200000000')
+            self.assertEqual(sorted(manifest), ['a_amp.png', 'a_phase.png'])
+
+            self.assertEqual(
+                [name for name in os.listdir(os.path.join(self.thumbnails_path, '1200000000'))
+                 if name.startswith('b_amp') or name.endswith('.tmp')],
+                [],
+            )
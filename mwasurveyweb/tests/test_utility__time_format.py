@@ -0,0 +1,61 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from django.test import TestCase
+
+from ..utility.time_format import (
+    format_unix_time_fields,
+    format_unix_times,
+)
+
+
+class TestTimeFormat(TestCase):
+    """
+    Class to test the formatting of the unix times
+    """
+
+    def test_format_unix_times(self):
+        """
+        Testing whether the vectorised formatting gives the same times as pytz, including the daylight saving time
+        Western Australia had between 2006 and 2009
+        :return: None
+        """
+        unix_times = np.random.RandomState(0).randint(1100000000, 1300000000, size=1000).tolist()
+
+        for zone_name in ['Australia/Perth', 'UTC', 'Australia/Melbourne']:
+            zone = pytz.timezone(zone_name)
+
+            self.assertEqual(
+                format_unix_times(unix_times, zone_name),
+                [
+                    datetime.fromtimestamp(unix_time, pytz.utc).astimezone(zone).strftime('%d/%m/%Y %H:%M:%S (%Z)')
+                    for unix_time in unix_times
+                ],
+            )
+
+        self.assertEqual(
+            format_unix_times([1200000000, '1250000000.7']),
+            ['11/01/2008 06:20:00 (AWDT)', '11/08/2009 22:13:20 (AWST)'],
+        )
+        self.assertEqual(format_unix_times([]), [])
+
+    def test_format_unix_time_fields(self):
+        """
+        Testing whether the time fields of the rows are formatted and the empty ones are left as they are
+        :return: None
+        """
+        rows = [
+            dict(job_id=1, start_time=1250000000, end_time=None),
+            dict(job_id=2, start_time=0, end_time=1250000060),
+        ]
+
+        self.assertEqual(format_unix_time_fields(rows, ['start_time', 'end_time']), [
+            dict(job_id=1, start_time='11/08/2009 22:13:20 (AWST)', end_time=None),
+            dict(job_id=2, start_time=0, end_time='11/08/2009 22:14:20 (AWST)'),
+        ])
@@ -2,14 +2,31 @@
 Distributed under the MIT License. See LICENSE.txt for more info.
 """
 
+import sqlite3
+from unittest import mock
+
+import numpy as np
+
+from django.core.cache import caches
 from django.test import TestCase
 
 from datetime import datetime, date
 
+from thirdparty import leapseconds
+
 from ..utility.utils import (
     get_gps_time_from_date,
     get_date_from_gps_time,
+    get_dates_from_gps_times,
+    get_gps_times_from_dates,
+    get_display_rows,
+    get_page_query,
+    get_search_results,
+    get_search_total,
+    get_filter_signature,
+    get_search_cache_statistics,
 )
+from .utils import GleamDatabaseTestCase
 
 
 class TestGPSTime(TestCase):
@@ -57,3 +74,174 @@ class TestGPSTime(TestCase):
         for input_output in input_outputs:
             utc_date_time = get_date_from_gps_time(input_output[0])
             self.assertEquals(utc_date_time, input_output[1])
+
+    def test_leap_seconds_are_loaded_once(self):
+        """
+        Testing whether the leap seconds are read from the tzfile only once, and again when the tzfile changes
+        :return: None
+        """
+        get_gps_time_from_date(datetime(2018, 6, 13))
+
+        with mock.patch.object(leapseconds, 'leapseconds', wraps=leapseconds.leapseconds) as mock_leapseconds:
+            for day in range(1, 29):
+                get_gps_time_from_date(datetime(2018, 2, day))
+                get_date_from_gps_time(1202000000 + day * 86400)
+
+            self.assertEqual(mock_leapseconds.call_count, 0)
+
+            with mock.patch.object(leapseconds, '_get_tzfile_stamp', return_value=('replaced', 0, 0, 0)):
+                self.assertEqual(get_gps_time_from_date(datetime(2018, 6, 13)), '1212883218')
+                self.assertEqual(get_date_from_gps_time('1212883218'), datetime(2018, 6, 13))
+
+            self.assertEqual(mock_leapseconds.call_count, 1)
+
+    def test_vectorised_gps_time(self):
+        """
+        Testing whether the vectorised conversions agree with the conversions of single values, around leap seconds too
+        :return: None
+        """
+
+        # every second around the leap seconds of 2015 and 2016, and a day apart from 2008 to 2019
+        gps_times = list(range(1119744017 - 5, 1119744017 + 5)) + list(range(1167264018 - 5, 1167264018 + 5)) + \
+            list(range(883180800, 1230768000, 86400 + 7))
+
+        dates = get_dates_from_gps_times(gps_times)
+        self.assertEqual(dates.tolist(), [get_date_from_gps_time(gps_time) for gps_time in gps_times])
+
+        self.assertEqual(
+            get_gps_times_from_dates(dates).tolist(),
+            [int(get_gps_time_from_date(date_object)) for date_object in dates.tolist()],
+        )
+
+        self.assertEqual(
+            get_dates_from_gps_times(['1212883218', None, 'unknown'], as_string=True).tolist(),
+            ['2018-06-13 00:00:00', '', ''],
+        )
+
+        self.assertEqual(
+            get_gps_times_from_dates(np.array(['2018-06-13', '2018-12-31T21:07:50'])).tolist(),
+            [1212883218, 1230325688],
+        )
+
+    def test_display_rows(self):
+        """
+        Testing whether only the display columns are kept and gps times are paired with their UTC dates
+        :return: None
+        """
+        display_headers = [
+            dict(field_name='starttime', gps_time=True),
+            dict(field_name='status', gps_time=False),
+        ]
+
+        self.assertEqual(
+            get_display_rows([(1212883218, 'imaged', 1212883218, 1212883218)], display_headers),
+            [[(1212883218, '2018-06-13 00:00:00'), ('imaged', None)]],
+        )
+
+
+class TestKeysetPagination(GleamDatabaseTestCase):
+    """
+    Class to test keyset pagination of the search results
+    """
+
+    def create_database(self, database_path):
+        # observations with repeated and missing cenchan values to check the tie-breaker and NULL handling
+        conn = sqlite3.connect(database_path)
+        conn.execute('CREATE TABLE observation (obs_id INTEGER PRIMARY KEY, starttime INTEGER, cenchan INTEGER)')
+        conn.executemany(
+            'INSERT INTO observation VALUES (?, ?, ?)',
+            [(1000000000 + i, 1000000000 + i, None if i % 7 == 0 else i % 3) for i in range(23)],
+        )
+        conn.commit()
+        conn.close()
+
+    def setUp(self):
+        super().setUp()
+
+        caches['search'].clear()
+
+        self.query = 'SELECT observation.starttime, observation.cenchan, observation.obs_id FROM observation'
+
+    def _get_page(self, order_by, limit, offset=0, key=None, reverse=False):
+        page_query, page_values = get_page_query(self.query, order_by, 'obs_id', limit, offset, key, reverse)
+        rows = list(get_search_results(page_query, [], page_values))[0]
+        return rows[::-1] if reverse else rows
+
+    def test_seek_matches_offset(self):
+        """
+        Testing whether seeking page by page (forward and backward) returns the same rows as skipping with offset
+        :return: None
+        """
+        for order_by in [' ORDER BY cenchan ASC', ' ORDER BY cenchan DESC', ' ORDER BY obs_id DESC']:
+            expected = self._get_page(order_by, 100)
+
+            # seeking forward from the last row of the previous page
+            rows = []
+            key = None
+            for _ in range(5):
+                page = self._get_page(order_by, 5, key=key)
+                rows.extend(page)
+                key = list(page[-1][-2:]) if page else None
+
+            self.assertEqual(rows, expected)
+
+            # seeking backward from the first row of the next page
+            rows = self._get_page(order_by, 3, reverse=True)
+            while len(rows) < len(expected):
+                rows = self._get_page(order_by, 5, key=list(rows[0][-2:]), reverse=True) + rows
+
+            self.assertEqual(rows, expected)
+
+    def test_search_total_is_cached(self):
+        """
+        Testing whether the total is counted once for the same conditions and recounted when the database changes
+        :return: None
+        """
+        conditions = ['(observation.cenchan = ?)', '(observation.obs_id >= ?)']
+        values = [1, 1000000010]
+
+        # the order of the conditions does not matter
+        filter_signature = get_filter_signature('observation', conditions, values)
+        self.assertEqual(
+            filter_signature,
+            get_filter_signature('observation', conditions[::-1], values[::-1]),
+        )
+
+        query_count = 'SELECT count(*) total FROM observation WHERE ' + ' AND '.join(conditions)
+
+        self.assertEqual(get_search_total(query_count, values, filter_signature), 5)
+
+        # the cached total is returned even if the query changes, as long as the signature is the same
+        self.assertEqual(get_search_total('SELECT 0', [], filter_signature), 5)
+
+        # changing the database invalidates the cached total
+        conn = sqlite3.connect(self.database_path)
+        conn.execute('INSERT INTO observation VALUES (1000000100, 1000000100, 1)')
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(get_search_total(query_count, values, filter_signature), 6)
+
+    def test_search_results_are_cached(self):
+        """
+        Testing whether repeated searches are served from the cache until the database changes
+        :return: None
+        """
+        query = 'SELECT obs_id FROM observation WHERE cenchan = ? ORDER BY obs_id LIMIT 2'
+
+        first = get_search_results(query, [2])
+        self.assertEqual(get_search_results(query, [2]), first)
+        self.assertEqual(get_search_cache_statistics().get('results_hits'), 1)
+        self.assertEqual(get_search_cache_statistics().get('results_misses'), 1)
+
+        # a different value is a different search
+        self.assertNotEqual(get_search_results(query, [1]), first)
+
+        # changing the database invalidates the cached results
+        conn = sqlite3.connect(self.database_path)
+        conn.execute('DELETE FROM observation WHERE obs_id = ?', [first[0][0][0]])
+        conn.commit()
+        conn.close()
+
+        self.assertNotEqual(get_search_results(query, [2]), first)
+        self.assertEqual(get_search_cache_statistics().get('results_misses'), 3)
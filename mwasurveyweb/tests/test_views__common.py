@@ -0,0 +1,101 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import sqlite3
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import SkyPlot
+from .utils import GleamDatabaseTestCase
+
+
+class TestSkyCoverage(GleamDatabaseTestCase):
+    """
+    Class to test the sky coverage endpoint
+    """
+
+    def setUp(self):
+        cache.clear()
+
+        super().setUp()
+
+    def test_sky_coverage(self):
+        """
+        Testing whether the coverage of each status is returned and only downloaded again if the database changes
+        :return: None
+        """
+        response = self.client.get(reverse('sky_coverage'))
+        self.assertEqual(response.status_code, 200)
+
+        sky_coverage = response.json()
+        self.assertEqual([layer.get('name') for layer in sky_coverage.get('layers')], ['blue', 'light-grey', 'yellow'])
+        self.assertEqual(sky_coverage.get('statuses').get('imaged').get('total'), 10)
+
+        # the markers mode of the settings draws a marker for each observation
+        self.assertEqual(sky_coverage.get('mode'), 'markers')
+        self.assertEqual(sum(sky_coverage.get('statuses').get('archived').get('positions')[2::3]), 10)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(reverse('sky_coverage'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        etag = response['ETag']
+
+        conn = sqlite3.connect(self.database_path)
+        conn.execute("UPDATE observation SET status = 'archived' WHERE obs_id = 1000000000")
+        conn.commit()
+        conn.close()
+
+        response = self.client.get(reverse('sky_coverage'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json().get('statuses').get('archived').get('total'), 11)
+
+        response = self.client.get(reverse('sky_coverage'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        # the density mode counts the observations in the cells of the grid
+        with override_settings(SKY_PLOTS_MODE='density'):
+            response = self.client.get(reverse('sky_coverage'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json().get('mode'), 'density')
+        self.assertEqual(sum(response.json().get('statuses').get('archived').get('cells')[1::2]), 11)
+
+
+class TestIndex(TestCase):
+    """
+    Class to test the landing page
+    """
+
+    def setUp(self):
+        cache.clear()
+
+        for name in ['_base', 'blue', 'light-grey', 'yellow']:
+            SkyPlot.objects.create(name='/images/skyplots/{}.png'.format(name), is_default=True)
+
+    def test_number_of_queries(self):
+        """
+        Testing whether the landing page is rendered with a fixed number of queries, whatever the number of colours
+        and search pages
+        :return: None
+        """
+
+        # the search menu is built once
+        self.client.get(reverse('index'))
+
+        # sky plots, colours and their configurations, and the version of the search configuration
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('index'))
+
+        self.assertEqual(
+            [button.get('display_text') for button in response.context['buttons']],
+            ['Downloaded, Calibrated, Imaged', 'Unprocessed', 'Archived'],
+        )
+        self.assertEqual(
+            [menu.get('link') for menu in response.context['SEARCH_MENU']],
+            [reverse('search_observation'), reverse('search_processing')],
+        )
@@ -0,0 +1,104 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import sqlite3
+
+from django.core.cache import cache, caches
+from django.urls import reverse
+
+from accounts.models import User
+from .utils import (
+    GleamDatabaseTestCase,
+    create_gleam_search_database,
+)
+
+
+class TestSearch(GleamDatabaseTestCase):
+    """
+    Class to test the search view
+    """
+
+    def create_database(self, database_path):
+        create_gleam_search_database(database_path)
+
+    def setUp(self):
+        cache.clear()
+        caches['search'].clear()
+
+        super().setUp()
+
+        user = User.objects.create_user(username='searcher', password='password', email='searcher@example.com')
+        self.client.force_login(user)
+
+    def test_canonical_search_url(self):
+        """
+        Testing whether a search is redirected to its canonical GET encoding, which is revalidated with its ETag
+        :return: None
+        """
+        canonical_url = reverse('search_observation') + \
+            '?observation_observation_info__status__0=imaged&results_per_page=10'
+
+        response = self.client.post(reverse('search_observation'), {
+            'results_per_page': '10',
+            'observation_observation_info__status__0': 'imaged',
+            'observation_observation_info__observation_name__0': '  ',
+        })
+        self.assertRedirects(response, canonical_url, fetch_redirect_response=False)
+
+        # the same search with the inputs in another order has the same address
+        response = self.client.get(
+            reverse('search_observation') + '?results_per_page=10&observation_observation_info__status__0=imaged',
+        )
+        self.assertRedirects(response, canonical_url, fetch_redirect_response=False)
+
+        response = self.client.get(canonical_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].total, 20)
+        self.assertIn('private', response['Cache-Control'])
+
+        response = self.client.get(canonical_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        # a change of the database changes the ETag
+        conn = sqlite3.connect(self.database_path)
+        conn.execute("UPDATE observation SET status = 'imaged' WHERE obs_id = 1200000000")
+        conn.commit()
+        conn.close()
+
+        response = self.client.get(canonical_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].total, 21)
+
+    def test_search_state_url(self):
+        """
+        Testing whether the pages and the sorting of a search are addressed by the search state, without the session
+        :return: None
+        """
+        response = self.client.get(
+            reverse('search_observation') + '?observation_observation_info__status__0=imaged&results_per_page=10',
+        )
+        state_id = response.context['search_state_id']
+
+        self.client.logout()
+        self.client.force_login(User.objects.get(username='searcher'))
+
+        response = self.client.get(reverse('search_observation') + '?q={}&page=2'.format(state_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].start_index, 11)
+
+        response = self.client.get(reverse('search_observation') + '?q={}&sort=obsname'.format(state_id))
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn(state_id, response['Location'])
+
+        # the address of the first page is encoded when a wrong page number is typed
+        response = self.client.get(reverse('search_observation'), {'q': '{}&sort=obsname'.format(state_id), 'page': 0})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            response['Location'],
+            reverse('search_observation') + '?q={}%26sort%3Dobsname&page=1'.format(state_id),
+        )
+
+        # a state can not be used by another search page
+        response = self.client.get(reverse('search_processing') + '?q={}&page=2'.format(state_id))
+        self.assertIsNone(response.context['search_results'])
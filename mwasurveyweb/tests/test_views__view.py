@@ -0,0 +1,154 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import os
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from ..utility import observation
+from .utils import (
+    GleamDatabaseTestCase,
+    create_gleam_observation_database,
+)
+
+
+class TestObservationSummaries(GleamDatabaseTestCase):
+    """
+    Class to test the observation summaries endpoint
+    """
+
+    def create_database(self, database_path):
+        create_gleam_observation_database(database_path)
+
+    def setUp(self):
+        super().setUp()
+
+        user = User.objects.create_user(username='viewer', password='password', email='viewer@example.com')
+        self.client.force_login(user)
+
+    def test_observation_summaries(self):
+        """
+        Testing whether the summaries of the observations are grouped by observation, in the requested order, with
+        the same attributes as the observation page and without the logs of the jobs
+        :return: None
+        """
+        observation_ids = [1200000120 + 120 * i for i in range(39)] + [1200000000, 1, 1200000000]
+
+        # the 41 distinct ids are queried in chunks of two observations
+        with mock.patch.object(observation, 'OBSERVATION_CHUNK_SIZE', 2), \
+                mock.patch.object(observation, 'get_processing_query', wraps=observation.get_processing_query) as query:
+            response = self.client.get(reverse('observation_summaries'), {
+                'obs_ids': ','.join(str(observation_id) for observation_id in observation_ids),
+            })
+
+        self.assertEqual(query.call_count, 21)
+        self.assertEqual(response.status_code, 200)
+
+        summaries = response.json().get('observations')
+        self.assertEqual(list(summaries), [str(observation_id) for observation_id in observation_ids[:40]])
+        self.assertEqual(response.json().get('missing'), [1])
+
+        with observation.Observation(1200000000) as observation_object:
+            self.assertEqual(
+                set(summaries.get('1200000000').get('attributes')),
+                set(observation_object.attributes),
+            )
+            self.assertEqual(
+                summaries.get('1200000000').get('histogram_attributes'),
+                observation_object.histogram_attributes,
+            )
+            self.assertEqual(
+                summaries.get('1200000000').get('processing'),
+                [
+                    {key: value for key, value in processing_object.items() if key not in ['stderr', 'stdout']}
+                    for processing_object in observation_object.processing_objects
+                ],
+            )
+
+        self.assertEqual(
+            [job.get('job_id') for job in summaries.get('1200000000').get('processing')],
+            [3, 2, 1],
+        )
+        self.assertEqual(len(summaries.get('1200000120').get('processing')), 1)
+        self.assertEqual(summaries.get('1200000240').get('processing'), [])
+
+        # the long lists can be posted
+        response = self.client.post(reverse('observation_summaries'), {'obs_ids': '1200000000 1200000120'})
+        self.assertEqual(list(response.json().get('observations')), ['1200000000', '1200000120'])
+
+    def test_observation_summaries_errors(self):
+        """
+        Testing whether invalid and too long lists of observation ids are rejected
+        :return: None
+        """
+        response = self.client.get(reverse('observation_summaries'), {'obs_ids': '1200000000,abc'})
+        self.assertEqual(response.status_code, 400)
+
+        with override_settings(OBSERVATION_SUMMARY_MAX_IDS=2):
+            response = self.client.get(reverse('observation_summaries'), {'obs_ids': '1,2,3'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestProcessingHistory(GleamDatabaseTestCase):
+    """
+    Class to test the paginated processing jobs of the observation page and the logs of the jobs
+    """
+
+    def create_database(self, database_path):
+        create_gleam_observation_database(database_path)
+
+    def get_settings(self):
+        return dict(
+            PLOTS_PATH=os.path.join(self.temp_dir, 'plots'),
+            THUMBNAILS_PATH=os.path.join(self.temp_dir, 'thumbnails'),
+            PROCESSING_HISTORY_PER_PAGE=2,
+        )
+
+    def setUp(self):
+        super().setUp()
+
+        user = User.objects.create_user(username='viewer', password='password', email='viewer@example.com')
+        self.client.force_login(user)
+
+    def test_processing_history(self):
+        """
+        Testing whether the observation page shows the first page of the jobs without their logs and the next pages are
+        loaded from the endpoint
+        :return: None
+        """
+        response = self.client.get(reverse('view_observation', args=[1200000000]))
+        observation_object = response.context['observation']
+
+        self.assertEqual(
+            [processing_object.get('job_id') for processing_object in observation_object.processing_objects],
+            [3, 2],
+        )
+        self.assertTrue(observation_object.processing_has_next)
+        self.assertNotIn('calibrated', response.content.decode())
+        self.assertContains(response, reverse('processing_logs', args=[2]))
+
+        response = self.client.get(reverse('observation_processing', args=[1200000000]), {'page': 2})
+
+        self.assertEqual(response.json().get('fields'), observation.PROCESSING_FIELDS)
+        self.assertEqual([job.get('job_id') for job in response.json().get('jobs')], [1])
+        self.assertEqual(response.json().get('jobs')[0].get('logs_url'), reverse('processing_logs', args=[1]))
+        self.assertNotIn('stdout', response.json().get('jobs')[0])
+        self.assertFalse(response.json().get('has_next'))
+
+        response = self.client.get(reverse('observation_processing', args=[1200000000]), {'page': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_processing_logs(self):
+        """
+        Testing whether the logs of a job are returned on request
+        :return: None
+        """
+        response = self.client.get(reverse('processing_logs', args=[2]))
+        self.assertEqual(response.json(), {'job_id': 2, 'stderr': '', 'stdout': 'calibrated'})
+
+        response = self.client.get(reverse('processing_logs', args=[99]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,119 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from ..utility.database import close_connections
+
+
+def create_gleam_database(database_path):
+    """
+    Creates a small GLEAM-X like database with the pointings of the observations for testing, the observations cycle
+    through the unprocessed, imaged and archived statuses
+    :param database_path: path of the database file
+    """
+    conn = sqlite3.connect(database_path)
+    conn.execute('CREATE TABLE observation (obs_id INTEGER PRIMARY KEY, starttime INTEGER, status TEXT, '
+                 'ra_pointing REAL, dec_pointing REAL)')
+    conn.executemany(
+        'INSERT INTO observation VALUES (?, ?, ?, ?, ?)',
+        [
+            (1000000000 + i, 1000000000 + i, ['unprocessed', 'imaged', 'archived'][i % 3], i * 12.0, -30.0 + i)
+            for i in range(30)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def create_gleam_search_database(database_path):
+    """
+    Creates a small GLEAM-X like database with the observation columns of the search page for testing
+    :param database_path: path of the database file
+    """
+    conn = sqlite3.connect(database_path)
+    conn.execute('CREATE TABLE observation (obs_id INTEGER PRIMARY KEY, starttime INTEGER, obsname TEXT, creator TEXT, '
+                 'calibration INTEGER, calibrators TEXT, cal_obs_id INTEGER, peelsrcs TEXT, ion_phs_med INTEGER, '
+                 'ion_phs_peak INTEGER, ion_phs_std INTEGER, archived INTEGER, status TEXT, ra_pointing REAL, '
+                 'dec_pointing REAL, elevation_pointing REAL, azimuth_pointing REAL, duration_sec INTEGER, '
+                 'cenchan INTEGER)')
+    conn.executemany(
+        'INSERT INTO observation VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        [
+            (1200000000 + i * 120, 1200000000 + i * 120, 'obs{}'.format(i), 'gleam', 0, '', None, '', 1, i % 50, 3, 0,
+             ['unprocessed', 'imaged'][i % 2], i * 3.0, -30.0, 80.0, 0.0, 120, 145)
+            for i in range(40)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def create_gleam_observation_database(database_path):
+    """
+    Creates a small GLEAM-X like database with the observation columns of the observation page and a processing table
+    for testing, the first observation has three jobs and the second one has one
+    :param database_path: path of the database file
+    """
+    create_gleam_search_database(database_path)
+
+    conn = sqlite3.connect(database_path)
+
+    for column in ['delays TEXT', 'flags TEXT', 'selfcal INTEGER']:
+        conn.execute('ALTER TABLE observation ADD COLUMN {}'.format(column))
+
+    conn.execute('CREATE TABLE processing (job_id INTEGER PRIMARY KEY, task_id INTEGER, submission_time INTEGER, '
+                 'task TEXT, user TEXT, obs_id INTEGER, stderr TEXT, stdout TEXT, output_files TEXT, '
+                 'batch_file TEXT, start_time INTEGER, end_time INTEGER, status TEXT)')
+    conn.executemany(
+        'INSERT INTO processing (job_id, task, obs_id, start_time, submission_time, stderr, stdout, status) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        [
+            (1, 'download', 1200000000, 1500000000, 1500000000, '', 'downloaded', 'finished'),
+            (2, 'calibrate', 1200000000, 1500003600, 1500003000, '', 'calibrated', 'finished'),
+            (3, 'image', 1200000000, 1500007200, 1500007000, '', 'imaging', 'started'),
+            (4, 'download', 1200000120, 1500000000, 1500000000, '', 'downloaded', 'finished'),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+class GleamDatabaseTestCase(TestCase):
+    """
+    Base class of the tests using a GLEAM-X database. Each test gets its own database in a temporary directory, which is
+    used through GLEAM_DATABASE_PATH of the settings and removed once the pooled connections to it are closed.
+    """
+
+    def create_database(self, database_path):
+        """
+        Creates the GLEAM-X database of a test, the subclasses override it for the databases of their tests
+        :param database_path: path of the database file
+        """
+        create_gleam_database(database_path)
+
+    def get_settings(self):
+        """
+        Finds the settings overridden along with GLEAM_DATABASE_PATH during a test
+        :return: dictionary of the settings
+        """
+        return dict()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database_path = os.path.join(self.temp_dir, 'GLEAM-X.sqlite')
+        self.create_database(self.database_path)
+
+        self.settings_override = override_settings(GLEAM_DATABASE_PATH=self.database_path, **self.get_settings())
+        self.settings_override.enable()
+
+    def tearDown(self):
+        close_connections()
+        self.settings_override.disable()
+        shutil.rmtree(self.temp_dir)
@@ -40,6 +40,10 @@ except:
 urlpatterns = [
     path('', common.index, name='index'),
     path('about/', common.about, name='about'),
+    path('sky_coverage/', common.sky_coverage, name='sky_coverage'),
+    path('observation_summaries/', view.observation_summaries, name='observation_summaries'),
+    path('observation_processing/<int:observation_id>/', view.observation_processing, name='observation_processing'),
+    path('processing_logs/<int:job_id>/', view.processing_logs, name='processing_logs'),
 ]
 
 urlpatterns += search_urls
@@ -0,0 +1,422 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+from urllib.request import pathname2url
+
+from django.conf import settings
+
+# names under which the index files built next to the GLEAM-X database are attached to the connections, the spatial
+# index of the observation positions (see spatial.py) and the full-text index of the text fields (see text_index.py)
+SPATIAL_INDEX_SCHEMA = 'spatial'
+TEXT_INDEX_SCHEMA = 'text_index'
+
+# per thread storage of the idle connections, each thread keeps its own pool so that connections are never shared
+# between threads (sqlite3 connections are not thread safe by default).
+_local = threading.local()
+
+# counters to report the health of the connection layer, shared by all threads of the process.
+_statistics_lock = threading.Lock()
+_statistics = dict(
+    opened=0,  # number of new connections opened
+    reused=0,  # number of times an idle connection was handed out again
+    released=0,  # number of connections returned to the pool
+    discarded=0,  # number of connections closed instead of being returned to the pool
+    errors=0,  # number of failures while opening or using a connection
+    data_changes=0,  # number of changes to the database content noticed through PRAGMA data_version
+)
+
+
+class _Connection(sqlite3.Connection):
+    """
+    Connection class that allows storing the identity of the files it is opened for and the last data version it has
+    seen.
+    """
+    file_identity = None
+    data_version = None
+
+
+def _increment(counter):
+    """
+    Increments one of the connection layer counters.
+    :param counter: name of the counter
+    """
+    with _statistics_lock:
+        _statistics[counter] += 1
+
+
+def _get_database_uri(database_path):
+    """
+    Constructs the SQLite URI to open the GLEAM-X database in read-only mode.
+    :param database_path: path to the GLEAM-X database file
+    :return: string of the URI
+    """
+    return 'file:{}?mode=ro'.format(pathname2url(os.path.abspath(database_path)))
+
+
+def _get_file_identity(database_path):
+    """
+    Finds the identity of the database file. If the file is replaced (for example, by copying a new version of the
+    GLEAM-X database over it), the identity changes and the old connections need to be discarded.
+    :param database_path: path to the GLEAM-X database file
+    :return: tuple of device and inode of the file, None if the file does not exist
+    """
+    try:
+        stat = os.stat(database_path)
+    except OSError:
+        return None
+
+    return stat.st_dev, stat.st_ino
+
+
+def _get_index_paths():
+    """
+    Lists the index files that are attached to the connections to the GLEAM-X database, if they have been built.
+    :return: list of tuples of the schema name and the path of the index files
+    """
+    return [
+        (SPATIAL_INDEX_SCHEMA, settings.GLEAM_SPATIAL_INDEX_PATH),
+        (TEXT_INDEX_SCHEMA, settings.GLEAM_TEXT_INDEX_PATH),
+    ]
+
+
+def _get_connection_identity(database_path):
+    """
+    Finds the identity of the files a connection is opened for, the GLEAM-X database and its index files. Building an
+    index for the first time or replacing it changes the identity as well, so that the connections opened before are
+    discarded and the new ones attach the new index.
+    :param database_path: path to the GLEAM-X database file
+    :return: tuple of the identities of the database file and the index files
+    """
+    return (_get_file_identity(database_path), ) + tuple(
+        _get_file_identity(index_path) for schema, index_path in _get_index_paths()
+    )
+
+
+def _angular_distance(ra_1, dec_1, ra_2, dec_2):
+    """
+    SQL function to find the angular distance between two positions on the sky, using the haversine formula which is
+    accurate for small distances as well.
+    :param ra_1: right ascension of the first position in degrees
+    :param dec_1: declination of the first position in degrees
+    :param ra_2: right ascension of the second position in degrees
+    :param dec_2: declination of the second position in degrees
+    :return: angular distance in degrees, None if any of the positions is missing
+    """
+    try:
+        ra_1, dec_1, ra_2, dec_2 = [math.radians(float(value)) for value in [ra_1, dec_1, ra_2, dec_2]]
+    except (TypeError, ValueError):
+        return None
+
+    haversine = math.sin((dec_2 - dec_1) / 2) ** 2 + \
+        math.cos(dec_1) * math.cos(dec_2) * math.sin((ra_2 - ra_1) / 2) ** 2
+
+    return math.degrees(2 * math.asin(math.sqrt(min(haversine, 1))))
+
+
+@lru_cache(maxsize=256)
+def _get_words_regex(pattern):
+    """
+    Compiles the regular expression of the words of a full-text term, once for each term.
+    :param pattern: string of the regular expression, see get_words_pattern of text_index
+    :return: compiled regular expression
+    """
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def _match_words(value, pattern):
+    """
+    SQL function to check whether a text contains the words of a full-text term, as whole words.
+    :param value: text of the field
+    :param pattern: string of the regular expression of the term, see get_words_pattern of text_index
+    :return: 1 if the text contains the words, 0 otherwise
+    """
+    if value is None:
+        return 0
+
+    return 1 if _get_words_regex(pattern).search(str(value)) else 0
+
+
+def _get_pool(database_path):
+    """
+    Returns the list of idle connections of the current thread for a database path.
+    :param database_path: path to the GLEAM-X database file
+    :return: list of idle connections
+    """
+
+    # a forked process (ex: a gunicorn worker) must not reuse the connections of its parent
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.pools = dict()
+
+    return _local.pools.setdefault(database_path, [])
+
+
+def _close(conn):
+    """
+    Closes a connection silently.
+    :param conn: connection to close
+    """
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def _open_connection(database_path):
+    """
+    Opens a new read-only connection to the GLEAM-X database and applies the configured pragmas. The index files are
+    attached to the connection if they have been built.
+    :param database_path: path to the GLEAM-X database file
+    :return: connection object
+    """
+    conn = sqlite3.connect(_get_database_uri(database_path), uri=True, factory=_Connection)
+
+    # the identity is found before attaching, so that an index replaced in the meantime makes the connection outdated
+    file_identity = _get_connection_identity(database_path)
+
+    try:
+        for pragma, value in settings.GLEAM_DATABASE_PRAGMAS.items():
+            conn.execute('PRAGMA {pragma} = {value}'.format(pragma=pragma, value=value))
+
+        for (schema, index_path), index_identity in zip(_get_index_paths(), file_identity[1:]):
+            if index_identity is not None:
+                conn.execute('ATTACH DATABASE ? AS {}'.format(schema), [_get_database_uri(index_path)])
+    except sqlite3.Error:
+        _close(conn)
+        raise
+
+    # used by the cone search and the full-text search conditions
+    conn.create_function('angular_distance', 4, _angular_distance)
+    conn.create_function('match_words', 2, _match_words)
+
+    # remembering which files the connection belongs to and the current version of the data
+    conn.file_identity = file_identity
+    _check_data_version(conn)
+
+    return conn
+
+
+def _check_data_version(conn):
+    """
+    Checks whether the content of the database has been changed by another connection (ex: the pipeline updating the
+    GLEAM-X database in place) since this connection last looked at it, using PRAGMA data_version. This catches changes
+    that the modification time of the file may miss, for example on network file systems.
+    :param conn: pooled connection
+    :return: boolean, whether the content has changed
+    """
+    try:
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+    except sqlite3.Error:
+        return False
+
+    changed = conn.data_version is not None and conn.data_version != data_version
+
+    if changed:
+        _increment('data_changes')
+
+    conn.data_version = data_version
+
+    return changed
+
+
+def _get_file_stat(file_path, revalidate=False):
+    """
+    Finds the status of a file.
+    :param file_path: path of the file
+    :param revalidate: boolean to open the file before looking at its status, network file systems (ex: NFS) check
+    their cached attributes of a file with the server when it is opened
+    :return: stat result, None if the file does not exist
+    """
+    try:
+        if not revalidate:
+            return os.stat(file_path)
+
+        file_descriptor = os.open(file_path, os.O_RDONLY)
+
+        try:
+            return os.fstat(file_descriptor)
+        finally:
+            os.close(file_descriptor)
+    except OSError:
+        return None
+
+
+def get_database_version():
+    """
+    Finds a version stamp of the GLEAM-X database. The stamp is made of the inode, the size and the modification time of
+    the database file and of its write-ahead log, if any, so it changes whenever they are modified or replaced and is
+    the same in every process. It can be used to invalidate anything derived from the database content, including the
+    entries of caches shared between the workers.
+    If a pooled connection notices a change of the content through PRAGMA data_version, the files are opened to look at
+    their status, so that the attributes cached by a network file system are not used.
+    :return: string of the version stamp
+    """
+    database_path = settings.GLEAM_DATABASE_PATH
+
+    # looking at the data version through an idle connection, if there is one, does not cost a new connection
+    pool = _get_pool(database_path)
+    revalidate = bool(pool) and _check_data_version(pool[-1])
+
+    parts = []
+
+    for file_path in [database_path, database_path + '-wal']:
+        stat = _get_file_stat(file_path, revalidate=revalidate)
+
+        if stat is not None:
+            parts.extend([stat.st_ino, stat.st_size, stat.st_mtime_ns])
+
+    return '-'.join(str(part) for part in parts)
+
+
+def get_database_modified_time():
+    """
+    Finds the last time the GLEAM-X database file (or its write-ahead log, if any) was modified.
+    :return: datetime object in UTC, None if the database file does not exist
+    """
+    database_path = settings.GLEAM_DATABASE_PATH
+
+    modified_times = []
+
+    for file_path in [database_path, database_path + '-wal']:
+        try:
+            modified_times.append(os.stat(file_path).st_mtime)
+        except OSError:
+            continue
+
+    if not modified_times:
+        return None
+
+    return datetime.fromtimestamp(max(modified_times), tz=timezone.utc)
+
+
+def acquire_connection():
+    """
+    Finds an idle connection to the GLEAM-X database from the pool of the current thread, or opens a new one if there
+    is none. The connection must be handed back by calling release_connection once the work is finished.
+    :return: read-only connection object
+    """
+    database_path = settings.GLEAM_DATABASE_PATH
+
+    pool = _get_pool(database_path)
+    file_identity = _get_connection_identity(database_path)
+
+    while pool:
+        conn = pool.pop()
+
+        # the database file or its spatial index has been replaced since the connection was opened
+        if conn.file_identity != file_identity:
+            _close(conn)
+            _increment('discarded')
+            continue
+
+        _check_data_version(conn)
+
+        _increment('reused')
+        return conn
+
+    try:
+        conn = _open_connection(database_path)
+    except sqlite3.Error:
+        _increment('errors')
+        raise
+
+    _increment('opened')
+    return conn
+
+
+def release_connection(conn, discard=False):
+    """
+    Hands a connection back to the pool of the current thread, so that it can be reused by the next request.
+    :param conn: connection object obtained from acquire_connection
+    :param discard: boolean to close the connection instead of returning it to the pool, ex: after an error.
+    """
+    if conn is None:
+        return
+
+    pool = _get_pool(settings.GLEAM_DATABASE_PATH)
+
+    if not discard:
+        try:
+            # leaving nothing open for the next user of the connection
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error:
+            discard = True
+
+    if discard or len(pool) >= settings.GLEAM_DATABASE_POOL_SIZE or conn in pool:
+        _close(conn)
+        _increment('discarded')
+        return
+
+    pool.append(conn)
+    _increment('released')
+
+
+@contextmanager
+def gleam_cursor(row_factory=None):
+    """
+    Context manager to execute queries to the GLEAM-X database using a pooled connection. The connection is returned
+    to the pool when the context exits, or discarded if an SQLite error occurred.
+    :param row_factory: optional row factory for the cursor, ex: dict_factory
+    :return: cursor object
+    """
+    conn = acquire_connection()
+    discard = False
+
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory
+        yield cursor
+    except sqlite3.Error:
+        _increment('errors')
+        discard = True
+        raise
+    finally:
+        release_connection(conn, discard=discard)
+
+
+def close_connections():
+    """
+    Closes all idle connections of the current thread.
+    """
+    for pool in getattr(_local, 'pools', dict()).values():
+        while pool:
+            _close(pool.pop())
+            _increment('discarded')
+
+
+def get_health_metrics():
+    """
+    Reports the health of the GLEAM-X database connection layer. It runs a trivial query to make sure the database is
+    reachable and includes the counters of the connection pool.
+    :return: dictionary of the health metrics
+    """
+    healthy = True
+
+    try:
+        with gleam_cursor() as cursor:
+            cursor.execute('SELECT 1').fetchone()
+    except sqlite3.Error:
+        healthy = False
+
+    with _statistics_lock:
+        metrics = dict(_statistics)
+
+    metrics.update(
+        healthy=healthy,
+        database_path=os.path.normpath(settings.GLEAM_DATABASE_PATH),
+        idle=len(_get_pool(settings.GLEAM_DATABASE_PATH)),
+        pool_size=settings.GLEAM_DATABASE_POOL_SIZE,
+    )
+
+    return metrics
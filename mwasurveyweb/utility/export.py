@@ -0,0 +1,255 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import csv
+
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+
+from .database import gleam_cursor
+from .utils import (
+    get_page_query,
+    get_dates_from_gps_times,
+)
+
+# supported export formats with their content types and file extensions
+CSV = 'csv'
+VOTABLE = 'votable'
+
+EXPORT_FORMATS = {
+    CSV: dict(content_type='text/csv', extension='csv'),
+    VOTABLE: dict(content_type='application/x-votable+xml', extension='xml'),
+}
+
+
+class _Echo(object):
+    """
+    File like object that returns what is written to it, so that the csv writer can be used to produce lines for
+    streaming.
+    """
+
+    def write(self, value):
+        return value
+
+
+def get_export_columns(display_headers):
+    """
+    Finds the columns of the export. The display columns are exported, columns of gps times are followed by a column of
+    their UTC dates.
+    :param display_headers: list of display headers of the search
+    :return: list of dictionaries of the table name, the field name and the display name of the columns, the columns of
+    the UTC dates have their VOTable data type as well
+    """
+    columns = []
+
+    for display_header in display_headers:
+        columns.append(
+            dict(
+                table_name=display_header.get('table_name'),
+                field_name=display_header.get('field_name'),
+                display=display_header.get('display'),
+            )
+        )
+
+        if display_header.get('gps_time'):
+            columns.append(
+                dict(
+                    field_name='{}_utc'.format(display_header.get('field_name')),
+                    display='{} (UTC)'.format(display_header.get('display')),
+                    datatype='char',
+                )
+            )
+
+    return columns
+
+
+def get_export_batches(query, query_values, order_by, tie_breaker, display_headers):
+    """
+    Retrieves all the rows of a search query in batches of GLEAM_EXPORT_BATCH_SIZE rows using fetchmany, so that the
+    memory used does not depend on the number of results. Each row has the values of the export columns.
+    :param query: search query string without the ORDER BY and LIMIT clauses
+    :param query_values: list of values of the search query
+    :param order_by: String that defines the ORDER BY of the query. Format: ' ORDER BY column_name ASC/DESC'
+    :param tie_breaker: name of the unique field used to order the rows with the same sort field value
+    :param display_headers: list of display headers of the search
+    :return: generator of lists of rows
+    """
+
+    # a negative limit does not limit the number of rows in SQLite
+    export_query, export_values = get_page_query(query, order_by, tie_breaker, limit=-1)
+
+    with gleam_cursor() as cursor:
+        cursor.execute(export_query, list(query_values) + export_values)
+
+        while True:
+            rows = cursor.fetchmany(settings.GLEAM_EXPORT_BATCH_SIZE)
+
+            if not rows:
+                break
+
+            # only the display columns are exported
+            columns = [[row[index] for row in rows] for index in range(len(display_headers))]
+            export_columns = []
+
+            for display_header, column in zip(display_headers, columns):
+                export_columns.append(column)
+
+                # converting the gps times of the whole batch at once
+                if display_header.get('gps_time'):
+                    export_columns.append(get_dates_from_gps_times(column, as_string=True).tolist())
+
+            yield list(zip(*export_columns))
+
+
+def stream_csv(batches, display_headers):
+    """
+    Produces the lines of a CSV file of the search results.
+    :param batches: generator of lists of rows, see get_export_batches
+    :param display_headers: list of display headers of the search
+    :return: generator of the lines of the CSV file
+    """
+    writer = csv.writer(_Echo())
+
+    yield writer.writerow([column.get('field_name') for column in get_export_columns(display_headers)])
+
+    for rows in batches:
+        yield ''.join(writer.writerow(row) for row in rows)
+
+
+def get_declared_types(table_names):
+    """
+    Finds the types declared for the fields of tables of the GLEAM-X database.
+    :param table_names: iterable of the names of the tables
+    :return: dictionary of the declared type (upper case, empty if none) of each (table name, field name)
+    """
+    declared_types = dict()
+
+    with gleam_cursor() as cursor:
+        for table_name in table_names:
+            for row in cursor.execute('PRAGMA table_info({})'.format(table_name)).fetchall():
+                declared_types[(table_name, row[1])] = (row[2] or '').upper()
+
+    return declared_types
+
+
+def get_votable_datatype(declared_type, values):
+    """
+    Finds the VOTable data type of a column. The type declared for the field is used if there is one, following the
+    type affinity rules of SQLite, so that the data type holds for all the rows. Otherwise (ex: the search state was
+    saved before the display headers had their table names) the data type is found from the values that have been read,
+    with numbers widened to double, as a later value may not be an integer.
+    :param declared_type: upper case type declared for the field in the GLEAM-X database, None if it is not known
+    :param values: list of values of the column that have been read
+    :return: VOTable data type
+    """
+    if declared_type:
+        if 'INT' in declared_type:
+            return 'long'
+        if any(name in declared_type for name in ['CHAR', 'CLOB', 'TEXT', 'BLOB']):
+            return 'char'
+
+        # real and numeric affinities
+        return 'double'
+
+    values = [value for value in values if value is not None]
+
+    if values and all(isinstance(value, (int, float)) for value in values):
+        return 'double'
+
+    return 'char'
+
+
+def get_votable_value(value):
+    """
+    Formats a value for a VOTable cell.
+    :param value: value of the cell
+    :return: string of the value, empty for None
+    """
+    if value is None:
+        return ''
+
+    if isinstance(value, float):
+        return repr(value)
+
+    return escape(str(value))
+
+
+def stream_votable(batches, display_headers, resource_name='search'):
+    """
+    Produces the parts of a VOTable (TABLEDATA serialisation) of the search results. The data types of the columns are
+    found from the types declared for their fields, see get_votable_datatype.
+    :param batches: generator of lists of rows, see get_export_batches
+    :param display_headers: list of display headers of the search
+    :param resource_name: name of the resource of the VOTable
+    :return: generator of the parts of the VOTable
+    """
+    columns = get_export_columns(display_headers)
+
+    first_rows = next(batches, [])
+
+    declared_types = get_declared_types(set(column.get('table_name') for column in columns if column.get('table_name')))
+
+    yield '<?xml version="1.0" encoding="utf-8"?>\n' \
+          '<VOTABLE version="1.3" xmlns="http://www.ivoa.net/xml/VOTable/v1.3">\n' \
+          '<RESOURCE name={}>\n' \
+          '<TABLE name={}>\n'.format(quoteattr(resource_name), quoteattr(resource_name))
+
+    for index, column in enumerate(columns):
+        datatype = column.get('datatype') or get_votable_datatype(
+            declared_types.get((column.get('table_name'), column.get('field_name'))),
+            [row[index] for row in first_rows],
+        )
+
+        yield '<FIELD name={name} datatype="{datatype}"{arraysize}>' \
+              '<DESCRIPTION>{description}</DESCRIPTION></FIELD>\n'.format(
+                  name=quoteattr(column.get('field_name')),
+                  datatype=datatype,
+                  arraysize=' arraysize="*"' if datatype == 'char' else '',
+                  description=escape(column.get('display')),
+              )
+
+    yield '<DATA>\n<TABLEDATA>\n'
+
+    for rows in _prepend(first_rows, batches):
+        yield ''.join(
+            '<TR>{}</TR>\n'.format(''.join('<TD>{}</TD>'.format(get_votable_value(value)) for value in row))
+            for row in rows
+        )
+
+    yield '</TABLEDATA>\n</DATA>\n</TABLE>\n</RESOURCE>\n</VOTABLE>\n'
+
+
+def _prepend(first_rows, batches):
+    """
+    Yields the batch that has been read ahead and then the rest of the batches.
+    :param first_rows: list of rows of the first batch
+    :param batches: generator of the rest of the batches
+    :return: generator of lists of rows
+    """
+    if first_rows:
+        yield first_rows
+
+    for rows in batches:
+        yield rows
+
+
+def stream_search_results(export_format, query, query_values, order_by, tie_breaker, display_headers, form_type):
+    """
+    Produces the content of an export of the search results in the requested format.
+    :param export_format: CSV or VOTABLE
+    :param query: search query string without the ORDER BY and LIMIT clauses
+    :param query_values: list of values of the search query
+    :param order_by: String that defines the ORDER BY of the query. Format: ' ORDER BY column_name ASC/DESC'
+    :param tie_breaker: name of the unique field used to order the rows with the same sort field value
+    :param display_headers: list of display headers of the search
+    :param form_type: string defining the type of the search, ex: 'observation' or 'processing'
+    :return: generator of the parts of the content
+    """
+    batches = get_export_batches(query, query_values, order_by, tie_breaker, display_headers)
+
+    if export_format == VOTABLE:
+        return stream_votable(batches, display_headers, resource_name=form_type)
+
+    return stream_csv(batches, display_headers)
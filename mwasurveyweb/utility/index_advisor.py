@@ -0,0 +1,368 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import os
+import re
+import sqlite3
+import time
+from urllib.request import pathname2url
+
+from django.conf import settings
+
+from .schema import get_search_page_schema
+from .search import get_search_keys
+from .utils import (
+    get_operator_by_input_type,
+    get_page_query,
+)
+
+# number of rows of the representative page queries
+PAGE_LIMIT = 100
+
+
+def get_search_filters(form_type):
+    """
+    Finds the conditions the active search inputs of a search page produce, in the same form as SearchQuery does. Only
+    the first condition of an input (ex: the lower bound of a range) is used, the other ones need the same index.
+    :param form_type: string defining the type of the search, ex: 'observation' or 'processing'
+    :return: list of dictionaries of the name of the input, the table, the field, the field operator, the expression and
+    the operator of the condition
+    """
+    search_filters = []
+
+    for name, search_input in sorted(get_search_page_schema(form_type).get('search_inputs').items()):
+
+        # the search queries only select from the table of the search page
+        if search_input.get('table_name') != form_type:
+            continue
+
+        # a radius is searched as a range around its centre
+        operator, field_operator = get_operator_by_input_type(search_input.get('input_type'), index='0', second_value=1)
+
+        if not operator:
+            continue
+
+        expression = '{table}.{field}'.format(
+            table=search_input.get('table_name'),
+            field=search_input.get('field_name'),
+        )
+
+        if field_operator:
+            expression = '{field_operator}({expression})'.format(field_operator=field_operator, expression=expression)
+
+        search_filters.append(
+            dict(
+                name=name,
+                table=search_input.get('table_name'),
+                field=search_input.get('field_name'),
+                field_operator=field_operator,
+                expression=expression,
+                operator=operator,
+            )
+        )
+
+    return search_filters
+
+
+def get_representative_value(cursor, search_filter):
+    """
+    Finds a value of the condition that is likely to be searched, the median value of the expression.
+    :param cursor: cursor of the GLEAM-X database
+    :param search_filter: dictionary of the condition, see get_search_filters
+    :return: median value of the expression, None if there is no value
+    """
+    row = cursor.execute(
+        'SELECT {expression} FROM {table} WHERE {expression} IS NOT NULL ORDER BY 1 '
+        'LIMIT 1 OFFSET (SELECT count({expression}) / 2 FROM {table})'.format(
+            expression=search_filter.get('expression'),
+            table=search_filter.get('table'),
+        )
+    ).fetchone()
+
+    return row[0] if row else None
+
+
+def get_representative_queries(cursor, form_type):
+    """
+    Formulates the queries a search page runs for each of its search inputs: the count of the results and the first
+    page of the results in the initial order. The page of the results without any condition is included as well.
+    :param cursor: cursor of the GLEAM-X database
+    :param form_type: string defining the type of the search, ex: 'observation' or 'processing'
+    :return: list of dictionaries of the name, the table, the condition, the query and the values of the queries
+    """
+    order_by, tie_breaker, key_fields = get_search_keys(form_type)
+    order_by = order_by.format(order_by='ASC')
+
+    # selecting the displayed fields and the keys of the rows, as SearchQuery does
+    select_fields = [
+        '{}.{}'.format(display_column.get('table_name'), display_column.get('field_name'))
+        for display_column in get_search_page_schema(form_type).get('display_columns')
+    ]
+    select_fields += ['{}.{}'.format(form_type, key_field) for key_field in key_fields
+                      if '{}.{}'.format(form_type, key_field) not in select_fields]
+
+    query = 'SELECT {select_fields} FROM {table} '.format(select_fields=', '.join(select_fields), table=form_type)
+
+    page_query, page_values = get_page_query(query, order_by, tie_breaker, limit=PAGE_LIMIT)
+
+    representative_queries = [
+        dict(
+            name='{} page'.format(form_type),
+            table=form_type,
+            search_filter=None,
+            query=page_query,
+            values=page_values,
+        ),
+    ]
+
+    for search_filter in get_search_filters(form_type):
+        value = get_representative_value(cursor, search_filter)
+
+        if value is None:
+            continue
+
+        condition = 'WHERE ({expression} {operator} ?)'.format(
+            expression=search_filter.get('expression'),
+            operator=search_filter.get('operator'),
+        )
+
+        page_query, page_values = get_page_query(query + condition, order_by, tie_breaker, limit=PAGE_LIMIT)
+
+        representative_queries.extend([
+            dict(
+                name='{} count'.format(search_filter.get('name')),
+                table=form_type,
+                search_filter=search_filter,
+                query='SELECT count(*) total FROM {table} {condition}'.format(table=form_type, condition=condition),
+                values=[value],
+            ),
+            dict(
+                name='{} page'.format(search_filter.get('name')),
+                table=form_type,
+                search_filter=search_filter,
+                query=page_query,
+                values=[value] + page_values,
+            ),
+        ])
+
+    return representative_queries
+
+
+def get_query_plan(cursor, query, values):
+    """
+    Finds the plan of a query using EXPLAIN QUERY PLAN.
+    :param cursor: cursor of the GLEAM-X database
+    :param query: query string
+    :param values: list of values of the query
+    :return: list of the details of the steps of the plan
+    """
+    return [row[3] for row in cursor.execute('EXPLAIN QUERY PLAN ' + query, values).fetchall()]
+
+
+def is_table_scanned(plan, table):
+    """
+    Checks whether a query plan reads the whole table without the help of an index.
+    :param plan: list of the details of the steps of the plan
+    :param table: name of the table
+    :return: True if the table is scanned, False otherwise
+    """
+    return any(re.match(r'^SCAN (TABLE )?{}( AS \w+)?$'.format(table), detail) for detail in plan)
+
+
+def is_sorted(plan):
+    """
+    Checks whether a query plan sorts the rows, instead of reading them in order from an index.
+    :param plan: list of the details of the steps of the plan
+    :return: True if the rows are sorted, False otherwise
+    """
+    return any(detail.startswith('USE TEMP B-TREE FOR ORDER BY') for detail in plan)
+
+
+def get_query_time(cursor, query, values, repeat=3):
+    """
+    Times a query, the best of a number of runs is reported as the other runs are slowed down by other processes.
+    :param cursor: cursor of the GLEAM-X database
+    :param query: query string
+    :param values: list of values of the query
+    :param repeat: number of runs
+    :return: time of the fastest run in seconds
+    """
+    times = []
+
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        cursor.execute(query, values).fetchall()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def analyse_queries(cursor, representative_queries, repeat=3):
+    """
+    Finds the plans and the times of the representative queries.
+    :param cursor: cursor of the GLEAM-X database
+    :param representative_queries: list of dictionaries of the queries, see get_representative_queries
+    :param repeat: number of runs to time each query
+    :return: list of dictionaries of the queries along with their plans and times
+    """
+    return [
+        dict(
+            representative_query,
+            plan=get_query_plan(cursor, representative_query.get('query'), representative_query.get('values')),
+            time=get_query_time(
+                cursor,
+                representative_query.get('query'),
+                representative_query.get('values'),
+                repeat=repeat,
+            ),
+        )
+        for representative_query in representative_queries
+    ]
+
+
+def _get_index(table, columns, reason):
+    """
+    Constructs a proposed index.
+    :param table: name of the table
+    :param columns: list of the columns or expressions of the index
+    :param reason: text explaining why the index is proposed
+    :return: dictionary of the name, the table, the columns, the SQL statement and the reason of the index
+    """
+    name = 'ix_{}_{}'.format(table, '_'.join(re.sub(r'\W+', '_', column.lower()).strip('_') for column in columns))
+
+    return dict(
+        name=name,
+        table=table,
+        columns=columns,
+        sql='CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})'.format(
+            name=name,
+            table=table,
+            columns=', '.join(columns),
+        ),
+        reason=reason,
+    )
+
+
+def propose_indexes(analysed_queries, existing_indexes=()):
+    """
+    Proposes indexes for the representative queries that scan their table or sort their rows.
+    1. A condition that scans the table gets an index on its field, or on its expression (ex: ABS(field)). A LIKE
+    condition needs the case insensitive collation of the LIKE operator for the index to be used.
+    2. An equality condition gets the sort field and the tie-breaker appended, so that the index covers the count and
+    returns the first page in order.
+    3. The page without any condition gets an index on the sort field and the tie-breaker if it is sorted.
+    An index is not proposed if it exists already or if its columns are the first columns of another proposed index.
+    :param analysed_queries: list of dictionaries of the queries with their plans, see analyse_queries
+    :param existing_indexes: names of the indexes that already exist in the database
+    :return: list of dictionaries of the proposed indexes, see _get_index
+    """
+    proposals = []
+
+    for analysed_query in analysed_queries:
+        search_filter = analysed_query.get('search_filter')
+        plan = analysed_query.get('plan')
+        table = analysed_query.get('table')
+
+        if search_filter is None:
+            order_by, tie_breaker, key_fields = get_search_keys(table)
+
+            if is_sorted(plan):
+                proposals.append(_get_index(table, key_fields, 'the results are sorted for every page'))
+
+            continue
+
+        if not analysed_query.get('name').endswith(' count') or not is_table_scanned(plan, table):
+            continue
+
+        # indexes on expressions refer to the fields without the table name
+        column = search_filter.get('field')
+
+        if search_filter.get('field_operator'):
+            column = '{}({})'.format(search_filter.get('field_operator'), column)
+
+        if search_filter.get('operator') == 'LIKE':
+            column += ' COLLATE NOCASE'
+
+        columns = [column]
+
+        if search_filter.get('operator') == '=':
+            order_by, tie_breaker, key_fields = get_search_keys(table)
+            columns += [key_field for key_field in key_fields if key_field != search_filter.get('field')]
+
+        proposals.append(_get_index(table, columns, '{} scans the table'.format(search_filter.get('name'))))
+
+    unique_proposals = []
+
+    for proposal in proposals:
+        columns = proposal.get('columns')
+
+        # an index also serves the conditions on its first columns, so only the longer index is kept
+        is_redundant = proposal.get('name') in existing_indexes or any(
+            other.get('table') == proposal.get('table') and len(other.get('columns')) > len(columns) and
+            other.get('columns')[:len(columns)] == columns
+            for other in proposals
+        )
+
+        if not is_redundant and proposal.get('name') not in [other.get('name') for other in unique_proposals]:
+            unique_proposals.append(proposal)
+
+    return unique_proposals
+
+
+def get_existing_indexes(cursor):
+    """
+    Finds the names of the indexes of the database.
+    :param cursor: cursor of the GLEAM-X database
+    :return: list of the names of the indexes
+    """
+    return [row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()]
+
+
+def copy_database(database_path, copy_path):
+    """
+    Copies the GLEAM-X database using the SQLite backup API, which gives a consistent copy even if the database is
+    being written to.
+    :param database_path: path of the GLEAM-X database
+    :param copy_path: path of the copy, replaced if it exists
+    """
+    if os.path.exists(copy_path):
+        os.remove(copy_path)
+
+    source = sqlite3.connect('file:{}?mode=ro'.format(pathname2url(os.path.abspath(database_path))), uri=True)
+    destination = sqlite3.connect(copy_path)
+
+    try:
+        source.backup(destination)
+    finally:
+        destination.close()
+        source.close()
+
+
+def open_database_copy(copy_path):
+    """
+    Opens a copy of the GLEAM-X database for writing, with the pragmas used for the GLEAM-X database so that the times
+    are comparable.
+    :param copy_path: path of the copy
+    :return: connection object
+    """
+    conn = sqlite3.connect(copy_path)
+
+    for pragma, value in settings.GLEAM_DATABASE_PRAGMAS.items():
+        if pragma != 'query_only':
+            conn.execute('PRAGMA {pragma} = {value}'.format(pragma=pragma, value=value))
+
+    return conn
+
+
+def create_indexes(conn, proposals):
+    """
+    Creates the proposed indexes and updates the statistics the query planner uses to choose between them.
+    :param conn: connection to a copy of the GLEAM-X database
+    :param proposals: list of dictionaries of the proposed indexes, see propose_indexes
+    """
+    for proposal in proposals:
+        conn.execute(proposal.get('sql'))
+
+    conn.execute('ANALYZE')
+    conn.commit()
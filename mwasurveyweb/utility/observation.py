@@ -2,19 +2,182 @@
 Distributed under the MIT License. See LICENSE.txt for more info.
 """
 
-import os
 import sqlite3
-from datetime import datetime
+from collections import OrderedDict
 
-import pytz
 from django.conf import settings
 
+from .database import (
+    acquire_connection,
+    gleam_cursor,
+    release_connection,
+)
+from .plots import (
+    classify_plot_files,
+    get_plot_file_names,
+)
+from .thumbnails import (
+    get_responsive_image,
+    read_thumbnail_manifest,
+)
+from .time_format import format_unix_time_fields
 from .utils import (
     get_date_from_gps_time,
     dict_factory,
 )
 
 
+# number of observation ids in the IN list of a query, below the limit of the number of values of an SQLite query
+OBSERVATION_CHUNK_SIZE = 500
+
+# fields of the processing jobs of an observation, the logs are left out as they can be large, they are fetched for a
+# job when needed, see get_processing_logs
+PROCESSING_FIELDS = ['start_time', 'submission_time', 'task', 'job_id', 'task_id', 'user', 'status', ]
+
+
+def get_observation_info_query(condition):
+    """
+    Forms the query to collect observation attributes. Ordered in a way so that two column can have the required
+    format. For example: ra_pointing, dec_pointing are in the same column.
+    :param condition: condition selecting the observations, ex: 'obs_id = ?'
+    :return: query string
+    """
+    return 'SELECT ' \
+           '{0}.obsname, ' \
+           'cenchan || " (" || CAST(1.28 * {0}.cenchan AS INT) || " MHz)" cenchan, ' \
+           '{0}.ra_pointing, ' \
+           '{0}.delays, ' \
+           '{0}.dec_pointing, ' \
+           'CASE WHEN {0}.calibration = 0 THEN \'False\' ELSE \'True\' END calibration, ' \
+           '{0}.azimuth_pointing, ' \
+           '{0}.cal_obs_id, ' \
+           '{0}.elevation_pointing, ' \
+           '{0}.calibrators, ' \
+           '{0}.peelsrcs, ' \
+           '{0}.flags, ' \
+           '{0}.selfcal, ' \
+           '{0}.ion_phs_med, ' \
+           '{0}.ion_phs_peak, ' \
+           '{0}.ion_phs_std, ' \
+           'CASE WHEN {0}.archived = 0 THEN \'False\' ELSE \'True\' END archived, ' \
+           'obs_id "UTC date-obs", ' \
+           '{0}.status ' \
+           ' FROM {0} WHERE {1}'.format('observation', condition)
+
+
+def get_observation_info(result):
+    """
+    Separates the histogram attributes of an observation from the rest and converts its gps time to the UTC date.
+    :param result: dictionary of a row of the query of get_observation_info_query
+    :return: result and histogram attributes as dictionaries.
+    """
+    # separating the histogram attributes as they are to be displayed near the histogram.
+    histogram_attributes = dict(
+        ion_phs_med=result.pop('ion_phs_med', None),
+        ion_phs_peak=result.pop('ion_phs_peak', None),
+        ion_phs_std=result.pop('ion_phs_std', None),
+    )
+
+    # converting gps time to UTC date
+    result.update({
+        "UTC date-obs": get_date_from_gps_time(result.get('UTC date-obs')),
+    })
+
+    return result, histogram_attributes
+
+
+def get_processing_query(fields, condition):
+    """
+    Forms the query to collect the processing jobs of observations, the latest first. The jobs started at the same
+    time are ordered by job id, so that the pages of the jobs do not overlap.
+    :param fields: list of the fields of the processing table
+    :param condition: condition selecting the jobs, ex: 'obs_id = ?'
+    :return: query string
+    """
+    return 'SELECT {fields} FROM {table} WHERE {condition} ORDER BY start_time DESC, job_id DESC'.format(
+        fields=', '.join('{}.{}'.format('processing', field) for field in fields),
+        table='processing',
+        condition=condition,
+    )
+
+
+def get_processing_objects(results):
+    """
+    Converts the unix times of the processing jobs to AWST, the times of all the jobs at once.
+    :param results: list of dictionaries of the rows of the query of get_processing_query
+    :return: list of processing object dictionaries
+    """
+    return format_unix_time_fields([dict(result) for result in results], ['submission_time', 'start_time', ])
+
+
+def get_processing_page(cursor, observation_id, page):
+    """
+    Collects a page of the processing jobs of an observation, the latest first, PROCESSING_HISTORY_PER_PAGE of the
+    settings jobs per page.
+    :param cursor: cursor of the GLEAM-X database with the dict_factory row factory
+    :param observation_id: observation id
+    :param page: number of the page, starting from 1
+    :return: list of processing objects and whether there are jobs after the page
+    """
+    per_page = settings.PROCESSING_HISTORY_PER_PAGE
+
+    # one more job than the page is retrieved to find whether there is a next page
+    results = cursor.execute(
+        get_processing_query(PROCESSING_FIELDS, 'obs_id = ?') + ' LIMIT ? OFFSET ?',
+        [observation_id, per_page + 1, (page - 1) * per_page],
+    ).fetchall()
+
+    return get_processing_objects(results[:per_page]), len(results) > per_page
+
+
+def get_observation_summaries(observation_ids):
+    """
+    Collects the attributes and the processing jobs of many observations with a few queries instead of two for each
+    observation. The observations are queried in chunks of OBSERVATION_CHUNK_SIZE ids and the jobs are grouped by
+    observation in memory.
+    :param observation_ids: list of the observation ids
+    :return: dictionary of the attributes, the histogram attributes and the list of the processing jobs of each
+    observation found, by observation id
+    """
+    observation_ids = list(OrderedDict.fromkeys(observation_ids))
+
+    summaries = OrderedDict()
+
+    with gleam_cursor(row_factory=dict_factory) as cursor:
+        for index in range(0, len(observation_ids), OBSERVATION_CHUNK_SIZE):
+            chunk = observation_ids[index:index + OBSERVATION_CHUNK_SIZE]
+            condition = 'obs_id IN ({})'.format(', '.join('?' * len(chunk)))
+
+            observations = dict()
+
+            for result in cursor.execute(get_observation_info_query(condition), chunk).fetchall():
+                # the gps time of the observation is its id
+                observation_id = result.get('UTC date-obs')
+
+                attributes, histogram_attributes = get_observation_info(result)
+
+                observations[observation_id] = dict(
+                    attributes=attributes,
+                    histogram_attributes=histogram_attributes,
+                    processing=[],
+                )
+
+            results = cursor.execute(get_processing_query(['obs_id'] + PROCESSING_FIELDS, condition), chunk).fetchall()
+
+            for result in get_processing_objects(results):
+                observation = observations.get(result.pop('obs_id'))
+
+                if observation is not None:
+                    observation.get('processing').append(result)
+
+            # keeping the order of the requested ids
+            for observation_id in chunk:
+                if observation_id in observations:
+                    summaries[observation_id] = observations.get(observation_id)
+
+    return summaries
+
+
 class Observation(object):
     """
     Class to define a single observation
@@ -29,21 +192,24 @@ class Observation(object):
 
         self.observation_id = observation_id
         self.processing_objects = []
+        self.processing_has_next = False
 
-        # creating the connection and cursor
-        try:
-            self.conn = sqlite3.connect(settings.GLEAM_DATABASE_PATH)
+        # acquiring a pooled connection and creating the cursor
+        self.conn = None
 
-            self.conn.row_factory = dict_factory
+        try:
+            self.conn = acquire_connection()
 
             self.cursor = self.conn.cursor()
 
+            self.cursor.row_factory = dict_factory
+
         except sqlite3.Error:
             self.health_okay = False
 
         # collecting information in groups for an observation.
         self.attributes, self.histogram_attributes = self._populate_observation_info()
-        self.processing_objects = self._populate_processing_objects()
+        self.processing_objects, self.processing_has_next = self._populate_processing_objects()
         self.carousel_amplitude, self.carousel_phase, self.histogram, self.phase_map = \
             self._populate_carousels_and_images()
 
@@ -51,138 +217,43 @@ class Observation(object):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        try:
-            self.conn.close()
-        except sqlite3.Error:
-            pass
+        # handing the connection back to the pool
+        release_connection(self.conn)
 
     def _populate_observation_info(self):
         """
         Populates observation attributes. These are used in template.
         :return: result and histogram attributes as dictionaries.
         """
-
-        # query to collect observation attributes. Ordered in a way so that two column can have the required format.
-        # For example: ra_pointing, dec_pointing are in the same column.
-        query = 'SELECT ' \
-                '{0}.obsname, ' \
-                'cenchan || " (" || CAST(1.28 * {0}.cenchan AS INT) || " MHz)" cenchan, ' \
-                '{0}.ra_pointing, ' \
-                '{0}.delays, ' \
-                '{0}.dec_pointing, ' \
-                'CASE WHEN {0}.calibration = 0 THEN \'False\' ELSE \'True\' END calibration, ' \
-                '{0}.azimuth_pointing, ' \
-                '{0}.cal_obs_id, ' \
-                '{0}.elevation_pointing, ' \
-                '{0}.calibrators, ' \
-                '{0}.peelsrcs, ' \
-                '{0}.flags, ' \
-                '{0}.selfcal, ' \
-                '{0}.ion_phs_med, ' \
-                '{0}.ion_phs_peak, ' \
-                '{0}.ion_phs_std, ' \
-                'CASE WHEN {0}.archived = 0 THEN \'False\' ELSE \'True\' END archived, ' \
-                'obs_id "UTC date-obs", ' \
-                '{0}.status ' \
-                ' FROM {0} WHERE obs_id = ?'.format('observation')
-
         values = [self.observation_id]
 
-        result = dict(self.cursor.execute(query, values).fetchone())
+        result = dict(self.cursor.execute(get_observation_info_query('obs_id = ?'), values).fetchone())
 
-        # separating the histogram attributes as they are to be displayed near the histogram.
-        histogram_attributes = dict(
-            ion_phs_med=result.pop('ion_phs_med', None),
-            ion_phs_peak=result.pop('ion_phs_peak', None),
-            ion_phs_std=result.pop('ion_phs_std', None),
-        )
-
-        # converting gps time to UTC date
-        result.update({
-            "UTC date-obs": get_date_from_gps_time(result.get('UTC date-obs')),
-        })
-
-        return result, histogram_attributes
+        return get_observation_info(result)
 
     def _populate_processing_objects(self):
         """
-        Populate processing object information for the observation.
-        :return: list of processing objects.
+        Populate processing object information for the observation. Only the first page of the jobs is collected, the
+        next pages are loaded by the page from the observation processing endpoint.
+        :return: list of processing objects and whether there are more jobs.
         """
-
-        # query to extract processing information
-        query = 'SELECT ' \
-                '{0}.start_time, ' \
-                '{0}.submission_time, ' \
-                '{0}.task, ' \
-                '{0}.job_id, ' \
-                '{0}.task_id ,' \
-                '{0}.user, ' \
-                '{0}.status, ' \
-                '{0}.stderr, ' \
-                '{0}.stdout ' \
-                ' FROM {0} WHERE obs_id = ? ORDER BY start_time DESC'.format('processing')
-
-        values = [self.observation_id]
-
-        results = self.cursor.execute(query, values).fetchall()
-
-        processing_objects = []
-
-        utc_tz = pytz.timezone('UTC')
-        perth_tz = pytz.timezone('Australia/Perth')
-
-        for result in results:
-            processing_dict = dict(result)
-
-            unix_time = result.get('submission_time')
-            if unix_time:
-                utc_time = utc_tz.localize(datetime.fromtimestamp(unix_time))
-                awst_time = utc_time.astimezone(perth_tz)
-                processing_dict.update({
-                    'submission_time': awst_time.strftime('%d/%m/%Y %H:%M:%S (%Z)'),
-                })
-
-            unix_time = result.get('start_time')
-            if unix_time:
-                utc_time = utc_tz.localize(datetime.fromtimestamp(unix_time))
-                awst_time = utc_time.astimezone(perth_tz)
-                processing_dict.update({
-                    'start_time': awst_time.strftime('%d/%m/%Y %H:%M:%S (%Z)'),
-                })
-
-            processing_objects.append(processing_dict)
-
-        return processing_objects
+        return get_processing_page(self.cursor, self.observation_id, 1)
 
     def _populate_carousels_and_images(self):
         """
-        Collects the images for carousels (amplitude and phase), histogram and phase map.
-        :return: lists of carousel images, histogram and phase map images.
+        Collects the images for carousels (amplitude and phase), histogram and phase map. The images are found from the
+        manifest of the observation, the directory of the images is only listed if it has changed. Each image comes
+        with its thumbnails, if they have been generated.
+        :return: lists of carousel images, histogram and phase map images, see get_responsive_image.
         """
-        carousel_amplitude = []
-        carousel_phase = []
-        histogram = None
-        phase_map = None
-
-        # constructing the path for image store for this observation
-        image_path = os.path.join(settings.BASE_DIR, '..', 'static', 'images', 'plots', self.observation_id)
-
-        files = []
-        for (dir_path, dir_names, file_names) in os.walk(image_path):
-            files.extend(file_names)
-
-        files = sorted(files)
-
-        # categorising each file based on the name suffix.
-        for file_name in files:
-            if file_name.endswith('_amp.png'):
-                carousel_amplitude.append(os.path.join('images', 'plots', self.observation_id, file_name))
-            elif file_name.endswith('_phase.png'):
-                carousel_phase.append(os.path.join('images', 'plots', self.observation_id, file_name))
-            elif file_name.endswith('_histogram.png'):
-                histogram = os.path.join('images', 'plots', self.observation_id, file_name)
-            elif file_name.endswith('_phasemap.png'):
-                phase_map = os.path.join('images', 'plots', self.observation_id, file_name)
-
-        return carousel_amplitude, carousel_phase, histogram, phase_map
+        carousel_amplitude, carousel_phase, histogram, phase_map = \
+            classify_plot_files(self.observation_id, get_plot_file_names(self.observation_id))
+
+        manifest = read_thumbnail_manifest(self.observation_id)
+
+        return (
+            [get_responsive_image(file_path, manifest) for file_path in carousel_amplitude],
+            [get_responsive_image(file_path, manifest) for file_path in carousel_phase],
+            get_responsive_image(histogram, manifest),
+            get_responsive_image(phase_map, manifest),
+        )
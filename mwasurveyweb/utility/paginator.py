@@ -44,3 +44,46 @@ class Paginator(object):
 
         if self.current_page + 1 < self.next_page_number:
             self.next_page_number = self.current_page + 1
+
+
+def get_page_plan(page, per_page, total=None, page_keys=None):
+    """
+    Finds the cheapest way to retrieve a page for keyset pagination. A page can be reached by seeking forward from the
+    last row of an already visited page before it, by seeking backward from the first row of an already visited page
+    after it, or by starting from either end of the results. The rows of the pages in between need to be skipped, so
+    the plan with the least number of rows to skip is chosen.
+    :param page: number of the page to retrieve, starting from 1
+    :param per_page: number of rows per page
+    :param total: total number of rows if known, otherwise None
+    :param page_keys: dictionary of visited pages, the keys are the page numbers (as strings) and the values are lists
+    of the keys of the first and the last row of the page
+    :return: dictionary with the key to seek past, whether to seek backward, the number of rows to skip and the limit
+    """
+
+    # starting from the beginning of the results
+    plan = dict(key=None, reverse=False, offset=(page - 1) * per_page, limit=per_page)
+
+    # starting from the end of the results, in the reverse order
+    if total is not None:
+        rows_in_page = min(per_page, total - (page - 1) * per_page)
+        offset = max(total - page * per_page, 0)
+
+        if 0 < rows_in_page and offset < plan.get('offset'):
+            plan = dict(key=None, reverse=True, offset=offset, limit=rows_in_page)
+
+    for visited_page, keys in (page_keys or dict()).items():
+        visited_page = int(visited_page)
+
+        # seeking forward from the last row of a page before
+        if visited_page < page:
+            offset = (page - 1 - visited_page) * per_page
+            if offset < plan.get('offset'):
+                plan = dict(key=keys[1], reverse=False, offset=offset, limit=per_page)
+
+        # seeking backward from the first row of a page after, this page must be a full page then
+        elif visited_page > page:
+            offset = (visited_page - page - 1) * per_page
+            if offset < plan.get('offset'):
+                plan = dict(key=keys[0], reverse=True, offset=offset, limit=per_page)
+
+    return plan
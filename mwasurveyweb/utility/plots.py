@@ -0,0 +1,158 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import json
+import os
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import PlotManifest
+
+# name suffixes of the plot images of an observation
+AMPLITUDE_SUFFIX = '_amp.png'
+PHASE_SUFFIX = '_phase.png'
+HISTOGRAM_SUFFIX = '_histogram.png'
+PHASE_MAP_SUFFIX = '_phasemap.png'
+
+PLOT_SUFFIXES = (AMPLITUDE_SUFFIX, PHASE_SUFFIX, HISTOGRAM_SUFFIX, PHASE_MAP_SUFFIX, )
+
+
+def get_plots_directory(observation_id):
+    """
+    Constructs the path of the directory of the plot images of an observation.
+    :param observation_id: observation id
+    :return: path of the directory
+    """
+    return os.path.join(settings.PLOTS_PATH, str(observation_id))
+
+
+def get_directory_modified_time(directory):
+    """
+    Finds the modification time of a directory, which changes whenever a file is added to, removed from or renamed in
+    the directory.
+    :param directory: path of the directory
+    :return: modification time in nanoseconds, None if the directory does not exist
+    """
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+def list_plot_files(directory):
+    """
+    Lists the plot images in a directory.
+    :param directory: path of the directory
+    :return: sorted list of the names of the plot images
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return sorted(entry.name for entry in entries if entry.is_file() and entry.name.endswith(PLOT_SUFFIXES))
+    except OSError:
+        return []
+
+
+def _save_plot_manifest(observation_id, modified_time, directory):
+    """
+    Lists the plot images of an observation and stores them in its manifest.
+    :param observation_id: observation id
+    :param modified_time: modification time of the directory, found before listing it so that a file added while
+    listing makes the manifest outdated rather than missing the file
+    :param directory: path of the directory of the plot images
+    :return: list of the names of the plot images
+    """
+    file_names = list_plot_files(directory) if modified_time is not None else []
+
+    PlotManifest.objects.update_or_create(
+        observation_id=str(observation_id),
+        defaults=dict(modified_time=modified_time, file_names=json.dumps(file_names)),
+    )
+
+    return file_names
+
+
+def get_plot_file_names(observation_id):
+    """
+    Finds the plot images of an observation from its manifest. The directory is only listed again (and the manifest
+    updated) if its modification time differs from the one of the manifest, which costs a single stat of the directory
+    instead of listing it.
+    :param observation_id: observation id
+    :return: sorted list of the names of the plot images
+    """
+    directory = get_plots_directory(observation_id)
+    modified_time = get_directory_modified_time(directory)
+
+    manifest = PlotManifest.objects.filter(observation_id=str(observation_id)).first()
+
+    if manifest is not None and manifest.modified_time == modified_time:
+        return json.loads(manifest.file_names)
+
+    return _save_plot_manifest(observation_id, modified_time, directory)
+
+
+def classify_plot_files(observation_id, file_names):
+    """
+    Categorises the plot images of an observation based on their name suffixes.
+    :param observation_id: observation id
+    :param file_names: sorted list of the names of the plot images
+    :return: lists of amplitude and phase carousel images, histogram and phase map images, as paths relative to the
+    static files
+    """
+    carousel_amplitude = []
+    carousel_phase = []
+    histogram = None
+    phase_map = None
+
+    for file_name in file_names:
+        file_path = os.path.join('images', 'plots', str(observation_id), file_name)
+
+        if file_name.endswith(AMPLITUDE_SUFFIX):
+            carousel_amplitude.append(file_path)
+        elif file_name.endswith(PHASE_SUFFIX):
+            carousel_phase.append(file_path)
+        elif file_name.endswith(HISTOGRAM_SUFFIX):
+            histogram = file_path
+        elif file_name.endswith(PHASE_MAP_SUFFIX):
+            phase_map = file_path
+
+    return carousel_amplitude, carousel_phase, histogram, phase_map
+
+
+def update_plot_manifests(force=False):
+    """
+    Updates the manifests of all the observations that have a directory of plot images. Only the directories modified
+    since their manifest was made are listed, unless forced. The manifests of the directories that have been removed
+    are removed as well.
+    :param force: boolean to list all the directories
+    :return: numbers of the manifests updated, unchanged and removed
+    """
+    try:
+        with os.scandir(settings.PLOTS_PATH) as entries:
+            observation_ids = sorted(entry.name for entry in entries if entry.is_dir())
+    except OSError:
+        observation_ids = []
+
+    modified_times = dict(PlotManifest.objects.values_list('observation_id', 'modified_time'))
+
+    updated = 0
+
+    with transaction.atomic():
+        for observation_id in observation_ids:
+            directory = get_plots_directory(observation_id)
+            modified_time = get_directory_modified_time(directory)
+
+            if not force and observation_id in modified_times and modified_times.get(observation_id) == modified_time:
+                continue
+
+            _save_plot_manifest(observation_id, modified_time, directory)
+            updated += 1
+
+        # the manifests of the observations without a directory are kept, they tell the views there is nothing to list
+        removed_ids = set(
+            observation_id for observation_id, modified_time in modified_times.items() if modified_time is not None
+        ) - set(observation_ids)
+        PlotManifest.objects.filter(observation_id__in=removed_ids).delete()
+
+    return updated, len(observation_ids) - updated, len(removed_ids)
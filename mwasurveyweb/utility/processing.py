@@ -3,14 +3,29 @@ Distributed under the MIT License. See LICENSE.txt for more info.
 """
 
 import sqlite3
-from datetime import datetime
-
-import pytz
-from django.conf import settings
 
+from .database import (
+    acquire_connection,
+    gleam_cursor,
+    release_connection,
+)
+from .time_format import format_unix_time_fields
 from .utils import dict_factory
 
 
+def get_processing_logs(job_id):
+    """
+    Collects the logs of a processing job, these are left out of the processing jobs of the observation page.
+    :param job_id: job id
+    :return: dictionary of the job id, the stderr and the stdout of the job, None if the job is not found
+    """
+    with gleam_cursor(row_factory=dict_factory) as cursor:
+        return cursor.execute(
+            'SELECT {0}.job_id, {0}.stderr, {0}.stdout FROM {0} WHERE job_id = ?'.format('processing'),
+            [job_id],
+        ).fetchone()
+
+
 class Processing(object):
     """
     Class to define a single processing
@@ -25,14 +40,16 @@ class Processing(object):
 
         self.processing_id = processing_id
 
-        # creating the connection and cursor
-        try:
-            self.conn = sqlite3.connect(settings.GLEAM_DATABASE_PATH)
+        # acquiring a pooled connection and creating the cursor
+        self.conn = None
 
-            self.conn.row_factory = dict_factory
+        try:
+            self.conn = acquire_connection()
 
             self.cursor = self.conn.cursor()
 
+            self.cursor.row_factory = dict_factory
+
         except sqlite3.Error:
             self.health_okay = False
 
@@ -43,10 +60,8 @@ class Processing(object):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        try:
-            self.conn.close()
-        except sqlite3.Error:
-            pass
+        # handing the connection back to the pool
+        release_connection(self.conn)
 
     def _populate_processing_info(self):
         """
@@ -75,32 +90,7 @@ class Processing(object):
 
         result = dict(self.cursor.execute(query, values).fetchone())
 
-        utc_tz = pytz.timezone('UTC')
-        perth_tz = pytz.timezone('Australia/Perth')
-
-        unix_time = result.get('submission_time')
-        if unix_time:
-            utc_time = utc_tz.localize(datetime.fromtimestamp(unix_time))
-            awst_time = utc_time.astimezone(perth_tz)
-            result.update({
-                'submission_time': awst_time.strftime('%d/%m/%Y %H:%M:%S (%Z)'),
-            })
-
-        unix_time = result.get('start_time')
-        if unix_time:
-            utc_time = utc_tz.localize(datetime.fromtimestamp(unix_time))
-            awst_time = utc_time.astimezone(perth_tz)
-            result.update({
-                'start_time': awst_time.strftime('%d/%m/%Y %H:%M:%S (%Z)'),
-            })
-
-        unix_time = result.get('end_time')
-        if unix_time:
-            utc_time = utc_tz.localize(datetime.fromtimestamp(unix_time))
-            awst_time = utc_time.astimezone(perth_tz)
-            result.update({
-                'end_time': awst_time.strftime('%d/%m/%Y %H:%M:%S (%Z)'),
-            })
+        format_unix_time_fields([result], ['submission_time', 'start_time', 'end_time', ])
 
         # separating the observation attributes.
         observation_attributes = dict(
@@ -0,0 +1,188 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+from django.core.cache import cache
+from django.db.models import F, Prefetch
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import constants
+from ..forms.utility.utils import get_field_properties
+from ..models import (
+    SearchPage,
+    SearchInputGroup,
+    SearchInput,
+    SearchPageDisplayColumn,
+    SearchConfigurationVersion,
+)
+
+# primary key of the single row of the version of the search configuration
+SEARCH_CONFIGURATION_VERSION_ID = 1
+
+
+def get_search_configuration_version():
+    """
+    Finds the version of the search configuration. It is read from the database rather than from the cache, which may
+    be local to the process, so that every worker notices a change of the configuration made through another one.
+    :return: integer of the version, 0 if the configuration has never been changed
+    """
+    return SearchConfigurationVersion.objects.filter(pk=SEARCH_CONFIGURATION_VERSION_ID) \
+        .values_list('version', flat=True).first() or 0
+
+
+def _build_search_page_schema(form_type):
+    """
+    Builds the schema of a search page from the database using a fixed number of queries.
+    :param form_type: string defining the type of the search page, ex: 'observation' or 'processing'
+    :return: dictionary of the input groups, the search inputs and the display columns of the search page
+    """
+
+    # finding the active input groups that are active on this search page
+    input_groups = SearchInputGroup.objects.filter(
+        active=True,
+        searchpageinputgroup__search_page__name=form_type,
+        searchpageinputgroup__active=True,
+    ).order_by('display_order')
+
+    # finding the active search inputs of those groups along with their options
+    search_inputs = SearchInput.objects.filter(active=True, search_input_group__in=input_groups) \
+        .order_by('display_order') \
+        .prefetch_related(Prefetch('searchinputoption_set'))
+
+    search_inputs_by_group = dict()
+
+    # fields that are searched as gps times, the same fields are displayed as UTC dates in the results
+    gps_time_fields = set()
+
+    for search_input in search_inputs:
+        search_inputs_by_group.setdefault(search_input.search_input_group_id, []).append(search_input)
+
+        if search_input.input_type in [constants.DATE_GPS, constants.DATE_GPS_RANGE, ]:
+            gps_time_fields.add((search_input.table_name, search_input.field_name))
+
+    groups = []
+
+    # registry of the search inputs keyed by '<search input group name>__<search input name>', it is used to build
+    # the search query without going to the database
+    search_input_registry = dict()
+
+    for input_group in input_groups:
+
+        # input groups without any search input are not rendered
+        if input_group.pk not in search_inputs_by_group:
+            continue
+
+        fieldsets, field_properties = get_field_properties(
+            input_group.name,
+            search_inputs=search_inputs_by_group.get(input_group.pk),
+        )
+
+        for search_input in search_inputs_by_group.get(input_group.pk):
+            search_input_registry.update({
+                '{group_name}__{input_name}'.format(group_name=input_group.name, input_name=search_input.name): dict(
+                    table_name=search_input.table_name,
+                    field_name=search_input.field_name,
+                    field_type=search_input.field_type,
+                    input_type=search_input.input_type,
+                ),
+            })
+
+        groups.append(
+            dict(
+                name=input_group.name,
+                title=input_group.display_name,
+                description=input_group.description,
+                fieldsets=fieldsets,
+                field_properties=field_properties,
+            )
+        )
+
+    # finding the columns to display in the search results
+    display_columns = list(
+        SearchPageDisplayColumn.objects.filter(active=True, search_page__name=form_type)
+        .order_by('display_order')
+        .values('table_name', 'field_name', 'display_name')
+    )
+
+    for display_column in display_columns:
+        display_column.update(
+            gps_time=(display_column.get('table_name'), display_column.get('field_name')) in gps_time_fields,
+        )
+
+    return dict(
+        groups=groups,
+        search_inputs=search_input_registry,
+        display_columns=display_columns,
+    )
+
+
+def get_search_page_schema(form_type):
+    """
+    Returns the compiled schema of a search page: its input groups with their fieldsets and field properties, the
+    properties of its search inputs and the columns to display in the results. The schema is built once and served
+    from the cache until the search configuration changes (see signals), only the version of the configuration is
+    read from the database. The cache returns a fresh copy each time, so the schema can not be altered by its users.
+    Initial values like 'today' depend on the date, therefore the date is part of the cache key.
+    :param form_type: string defining the type of the search page, ex: 'observation' or 'processing'
+    :return: dictionary of the input groups, the search inputs and the display columns of the search page
+    """
+    cache_key = 'search_page_schema:{version}:{form_type}:{date}'.format(
+        version=get_search_configuration_version(),
+        form_type=form_type,
+        date=timezone.localtime(timezone.now()).strftime('%Y%m%d'),
+    )
+
+    schema = cache.get(cache_key)
+
+    if schema is None:
+        schema = _build_search_page_schema(form_type)
+        cache.set(cache_key, schema)
+
+    return schema
+
+
+def get_search_menu():
+    """
+    Returns the search menu, that is, the search pages having an active input group with at least one active search
+    input. The menu is built with a single query and served from the cache until the search configuration changes (see
+    signals), only the version of the configuration is read from the database.
+    :return: list of dictionaries of the link and the display text of the search pages
+    """
+    cache_key = 'search_menu:{version}'.format(version=get_search_configuration_version())
+
+    menu = cache.get(cache_key)
+
+    if menu is None:
+        search_pages = SearchPage.objects.filter(
+            searchpageinputgroup__active=True,
+            searchpageinputgroup__search_input_group__in=SearchInput.objects.filter(active=True)
+            .values('search_input_group'),
+        ).distinct().order_by('display_order')
+
+        menu = [
+            dict(
+                link=reverse('search_' + search_page.name),
+                display='Search ' + search_page.display_name,
+            ) for search_page in search_pages
+        ]
+
+        cache.set(cache_key, menu)
+
+    return menu
+
+
+def invalidate_search_page_schemas():
+    """
+    Invalidates the compiled schemas of all search pages and the search menu in every worker, so that they are rebuilt
+    on the next request, by moving the version of the search configuration forward.
+    """
+
+    # get_or_create copes with the row being created by another worker at the same time
+    SearchConfigurationVersion.objects.get_or_create(pk=SEARCH_CONFIGURATION_VERSION_ID)
+
+    # incremented in the database, so that concurrent changes are not lost, update skips auto_now
+    SearchConfigurationVersion.objects.filter(pk=SEARCH_CONFIGURATION_VERSION_ID).update(
+        version=F('version') + 1,
+        update_time=timezone.now(),
+    )
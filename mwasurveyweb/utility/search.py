@@ -5,10 +5,16 @@ Distributed under the MIT License. See LICENSE.txt for more info.
 from datetime import timedelta
 
 from django.core.exceptions import ValidationError
-from django.db.models import Q
 
+from .schema import get_search_page_schema
+from .spatial import get_cone_condition
+from .text_index import (
+    get_full_text_condition,
+    get_match_terms,
+)
 from .utils import (
     check_forms_validity,
+    get_filter_signature,
     get_operator_by_input_type,
     get_gps_time_from_date,
     get_unix_time_from_date,
@@ -16,7 +22,6 @@ from .utils import (
 
 from ..models import (
     SearchInput,
-    SearchPageDisplayColumn,
 )
 
 from ..forms.search_parameter import SearchParameterForm
@@ -24,6 +29,76 @@ from ..forms.search import SearchForm
 
 from .. import constants
 
+# placeholder of a condition depending on the indexes next to the GLEAM-X database, see compile_search_query. The
+# conditions are formed each time the query is run, as the indexes can be rebuilt, become outdated or be removed during
+# the life of a search state. The placeholder is not valid SQL, so a query run without being compiled fails.
+DEFERRED_CONDITION = '(<deferred condition>)'
+
+# functions forming each type of the deferred conditions from their inputs
+DEFERRED_CONDITION_BUILDERS = {
+    'cone': get_cone_condition,
+    'full_text': get_full_text_condition,
+}
+
+
+def get_deferred_value(condition_type, **arguments):
+    """
+    Forms the value standing for a deferred condition in the values of a query.
+    :param condition_type: type of the condition, one of DEFERRED_CONDITION_BUILDERS
+    :param arguments: inputs of the condition, the arguments of its builder
+    :return: dictionary of the type and the inputs of the condition
+    """
+    return dict(deferred=condition_type, arguments=arguments)
+
+
+def compile_search_query(query, query_count, query_values):
+    """
+    Forms the deferred conditions of a search query with the current state of the indexes, replacing their
+    placeholders in the queries and their inputs in the values.
+    :param query: query string
+    :param query_count: count query string
+    :param query_values: list of the values of the queries, see get_deferred_value for the deferred conditions
+    :return: query string, count query string and list of the values, ready to be run
+    """
+    conditions = []
+    values = []
+
+    for value in query_values:
+        if isinstance(value, dict) and value.get('deferred'):
+            condition, condition_values = DEFERRED_CONDITION_BUILDERS.get(value.get('deferred'))(
+                **value.get('arguments')
+            )
+
+            conditions.append(condition)
+            values.extend(condition_values)
+        else:
+            values.append(value)
+
+    compiled_queries = []
+
+    # the placeholders and the values of the conditions are in the same order
+    for search_query in [query, query_count]:
+        parts = search_query.split(DEFERRED_CONDITION)
+        compiled_queries.append(parts[0] + ''.join(
+            condition + part for condition, part in zip(conditions, parts[1:])
+        ))
+
+    return compiled_queries[0], compiled_queries[1], values
+
+
+def get_search_keys(form_type):
+    """
+    Finds the initial ORDER BY clause and the tie-breaker (a unique field to order the rows having the same sort field
+    value, required for keyset pagination) of a search.
+    :param form_type: string defining the type of the search, ex: 'observation' or 'processing'
+    :return: ORDER BY clause with an {order_by} placeholder for the direction, tie-breaker field and list of the fields
+    of the keys of the rows
+    """
+    if form_type == 'observation':
+        return ' ORDER BY starttime {order_by}', 'obs_id', ['starttime', 'obs_id']
+
+    return ' ORDER BY job_id {order_by}', 'job_id', ['job_id']
+
 
 class SearchQuery(object):
     """
@@ -37,19 +112,23 @@ class SearchQuery(object):
         :param form_type: string defines the type of the form, ex: 'observation' or 'processing'
         """
 
-        # forming the subquery for the total count
+        # forming the query for the total count, this is run separately from the query of the pages
         self.query_count = 'SELECT count(*) total ' \
                            'FROM {0} '.format(form_type)
 
         temp_query_condition = []
+        temp_query_condition_values = []
 
         # from the database_search_parameters forming the conditions
         # a condition can be in the following forms:
         # 1. count(a.b) > ?
         # 2. a.b > ?
+        # 3. a condition formed beforehand with its own values, ex: a deferred cone search
         # later during execution the ? will be replaced by the values by the cursor
         for db_search_parameter in self.database_search_parameters:
-            if db_search_parameter.get('field_operator', None):
+            if db_search_parameter.get('condition', None):
+                temp_query_part = db_search_parameter.get('condition')
+            elif db_search_parameter.get('field_operator', None):
                 temp_query_part = '({field_operator}({table}.{field}) {operator} ?)'.format(
                     field_operator=db_search_parameter.get('field_operator'),
                     table=db_search_parameter.get('table'),
@@ -65,17 +144,25 @@ class SearchQuery(object):
 
             # appending the query conditions and their corresponding values
             temp_query_condition.append(temp_query_part)
-            self.query_values.append(db_search_parameter.get('value'))
 
-        # subquery formation
+            if db_search_parameter.get('condition', None):
+                temp_query_condition_values.append(db_search_parameter.get('values'))
+                self.query_values.extend(db_search_parameter.get('values'))
+            else:
+                temp_query_condition_values.append(db_search_parameter.get('value'))
+                self.query_values.append(db_search_parameter.get('value'))
+
+        # count query formation
         if temp_query_condition:
             self.query_count = self.query_count + 'WHERE ' + ' AND '.join(temp_query_condition)
 
+        # the signature identifies the set of conditions, it is used to cache the total count
+        self.filter_signature = get_filter_signature(form_type, temp_query_condition, temp_query_condition_values)
+
         # query select information, this is different than count query. This retrieves the required information
         # based on the configuration set in the database.
-        # finding the search page table and columns from the database
-        table_columns = SearchPageDisplayColumn.objects.filter(Q(active=True), Q(search_page__name=form_type)) \
-            .order_by('display_order')
+        # finding the search page table and columns from the compiled schema of the search page
+        table_columns = self.search_page_schema.get('display_columns')
 
         self.display_headers = []
 
@@ -85,34 +172,40 @@ class SearchQuery(object):
         for table_column in table_columns:
             self.display_headers.append(
                 dict(
-                    display=table_column.display_name,  # what is displayed in the UI.
-                    field_name=table_column.field_name,  # actual field that is referenced to.
+                    display=table_column.get('display_name'),  # what is displayed in the UI.
+                    table_name=table_column.get('table_name'),  # table of the field, its type is used by the exports.
+                    field_name=table_column.get('field_name'),  # actual field that is referenced to.
                     sort_order='',  # to show which order they are displayed currently. Initially it is not ordered.
+                    gps_time=table_column.get('gps_time'),  # gps time values are displayed with their UTC dates.
                 )
             )
 
             query_substring += '{table_name}.{field_name}, '.format(
-                table_name=table_column.table_name,
-                field_name=table_column.field_name,
+                table_name=table_column.get('table_name'),
+                field_name=table_column.get('field_name'),
             )
 
-        # forming the final query including total count up to the condition part
+        # keyset pagination needs the default sort field and the tie-breaker values of each row, adding them to the
+        # selection if they are not displayed
+        for key_field in self.key_fields:
+            if key_field not in [display_header.get('field_name') for display_header in self.display_headers]:
+                query_substring += '{table_name}.{field_name}, '.format(
+                    table_name=form_type,
+                    field_name=key_field,
+                )
+
+        # forming the final query up to the condition part
         self.query = \
-            'SELECT {select_fields}' \
-            'subtable.total ' \
-            'FROM {table}, ({query_count}) subtable '.format(
-                select_fields=query_substring,
+            'SELECT {select_fields} ' \
+            'FROM {table} '.format(
+                select_fields=query_substring.rstrip(', '),
                 table=form_type,
-                query_count=self.query_count,
             )
 
         # adding the condition part if required. Otherwise, nothing will be added.
         if temp_query_condition:
             self.query = self.query + 'WHERE ' + ' AND '.join(temp_query_condition)
 
-        # add up search parameters here
-        self.query = self.query + self.search_parameter_order_by + self.search_parameter_limit
-
     def _update_database_search_parameter(self, value, search_input, search_form, input_properties):
         """
         Creates a database search parameter parameters for a particular search input and value.
@@ -124,7 +217,7 @@ class SearchQuery(object):
         '>' is the operator
         These are later forms a dictionary and appended to the database_search_parameters list.
         :param value: input value by the user
-        :param search_input: search input instance
+        :param search_input: dictionary of the search input properties from the search page schema
         :param search_form: search form that this input belongs to
         :param input_properties: list of input properties containing, group name, name and index
         """
@@ -142,19 +235,19 @@ class SearchQuery(object):
         try:
 
             # converting the value to gps time if input type is gps date or gps date range
-            if search_input.input_type in [constants.DATE_GPS, constants.DATE_GPS_RANGE, ]:
+            if search_input.get('input_type') in [constants.DATE_GPS, constants.DATE_GPS_RANGE, ]:
                 value_adjusted = get_gps_time_from_date(value_adjusted)
 
             # converting the value to unix timestamp if input type is unix date or unix date range
-            if search_input.input_type in [constants.DATE_UNIX, constants.DATE_UNIX_RANGE]:
+            if search_input.get('input_type') in [constants.DATE_UNIX, constants.DATE_UNIX_RANGE]:
                 value_adjusted = get_unix_time_from_date(value_adjusted)
 
             # converting the value based on the field type
-            if search_input.field_type == SearchInput.INT:
+            if search_input.get('field_type') == SearchInput.INT:
                 value_adjusted = int(value_adjusted)
-            elif search_input.field_type == SearchInput.FLOAT:
+            elif search_input.get('field_type') == SearchInput.FLOAT:
                 value_adjusted = float(value_adjusted)
-            elif search_input.field_type == SearchInput.BOOL:
+            elif search_input.get('field_type') == SearchInput.BOOL:
                 value_adjusted = 1 if value_adjusted else 0
         except (TypeError, ValueError):
             pass
@@ -167,7 +260,7 @@ class SearchQuery(object):
         # A conversion like this requires two input values by the user, however, this function only gets one, that is:
         # x or r, so, for finding a or b from x or r only is not possible. Therefore, we need to find out the other
         # value to complete the calculation.
-        if search_input.input_type == constants.RADIUS:
+        if search_input.get('input_type') == constants.RADIUS:
 
             # constructing the other field name by altering the index properties of the input properties and then
             # by joining them with '__'.
@@ -178,9 +271,9 @@ class SearchQuery(object):
                 if search_form['form'].cleaned_data.get(field_name) else 0
 
             # converting the value based on the input type
-            if search_input.field_type == SearchInput.INT:
+            if search_input.get('field_type') == SearchInput.INT:
                 radius_value_adjusted = int(radius_value)
-            elif search_input.field_type == SearchInput.FLOAT:
+            elif search_input.get('field_type') == SearchInput.FLOAT:
                 radius_value_adjusted = float(radius_value)
             else:
                 radius_value_adjusted = radius_value
@@ -189,18 +282,86 @@ class SearchQuery(object):
             value_adjusted += radius_value_adjusted * (-1 if input_properties[2] == '0' else 1)
 
         # find the operator and field operators based on the input type, index and dependent value
-        operator, field_operator = get_operator_by_input_type(search_input.input_type, index, second_value=radius_value)
+        operator, field_operator = get_operator_by_input_type(
+            search_input.get('input_type'),
+            index,
+            second_value=radius_value,
+        )
 
         self.database_search_parameters.append(
             dict(
-                table=search_input.table_name,
-                field=search_input.field_name,
+                table=search_input.get('table_name'),
+                field=search_input.get('field_name'),
                 field_operator=field_operator,
                 operator=operator,
                 value=value_adjusted,
             )
         )
 
+    def _update_database_cone_parameter(self, search_input, search_form, input_properties):
+        """
+        Creates a database search parameter for a cone search input. The three values of the input (RA, Dec and radius,
+        in degrees) are needed together, so they are taken from the form's cleaned data. The field name of the input
+        holds the RA and the Dec fields separated by a comma, ex: 'ra_pointing,dec_pointing'.
+        :param search_input: dictionary of the search input properties from the search page schema
+        :param search_form: search form that this input belongs to
+        :param input_properties: list of input properties containing, group name, name and index
+        """
+        values = [
+            search_form['form'].cleaned_data.get('__'.join(input_properties[:-1] + [str(index)]))
+            for index in range(3)
+        ]
+
+        # the cone is not searched until all of its values are given
+        if any(value is None or value == '' for value in values):
+            return
+
+        ra_field, dec_field = [field.strip() for field in search_input.get('field_name').split(',')]
+
+        # the condition depends on the spatial index, it is formed each time the query is run
+        self.database_search_parameters.append(
+            dict(
+                table=search_input.get('table_name'),
+                field=search_input.get('field_name'),
+                condition=DEFERRED_CONDITION,
+                values=[get_deferred_value(
+                    'cone',
+                    table=search_input.get('table_name'),
+                    ra_field=ra_field,
+                    dec_field=dec_field,
+                    ra=float(values[0]),
+                    dec=float(values[1]),
+                    radius=float(values[2]),
+                )],
+            )
+        )
+
+    def _update_database_full_text_parameter(self, value, search_input):
+        """
+        Creates a database search parameter for a full-text search input. The field name of the input may hold more than
+        one field separated by commas, ex: 'stderr,stdout', the terms are looked for in any of them.
+        :param value: input value by the user
+        :param search_input: dictionary of the search input properties from the search page schema
+        """
+        # nothing to search for, ex: only punctuation
+        if not get_match_terms(value):
+            return
+
+        # the condition depends on the full-text index, it is formed each time the query is run
+        self.database_search_parameters.append(
+            dict(
+                table=search_input.get('table_name'),
+                field=search_input.get('field_name'),
+                condition=DEFERRED_CONDITION,
+                values=[get_deferred_value(
+                    'full_text',
+                    table=search_input.get('table_name'),
+                    fields=[field.strip() for field in search_input.get('field_name').split(',')],
+                    text=value,
+                )],
+            )
+        )
+
     def _enlist_database_search_parameter(self, key, value, search_form):
         """
         Lists a database search parameter, i.e., query parts for a particular user input.
@@ -216,14 +377,24 @@ class SearchQuery(object):
         # 3. index
         input_properties = key.split('__')
 
-        # get the search input from the database
-        try:
-            search_input = SearchInput.objects.get(
-                search_input_group__name=input_properties[0],
-                name=input_properties[1],
-                active=True,
-            )
-        except SearchInput.DoesNotExist:
+        # get the search input from the registry of the search page schema, no database query is needed
+        search_input = self.search_page_schema.get('search_inputs').get('__'.join(input_properties[:2]))
+
+        if not search_input:
+            return
+
+        # a cone is searched once for its three values, when its first value is met
+        if search_input.get('input_type') == constants.CONE:
+            if input_properties[2] == '0':
+                self._update_database_cone_parameter(
+                    search_input=search_input,
+                    search_form=search_form,
+                    input_properties=input_properties,
+                )
+            return
+
+        if search_input.get('input_type') == constants.FULL_TEXT:
+            self._update_database_full_text_parameter(value=value, search_input=search_input)
             return
 
         # update the database search parameter for this input parameters.
@@ -238,7 +409,7 @@ class SearchQuery(object):
         # anything that has been on that day need be evaluated as a range, meaning for the above example:
         # we should search for anything between 01/01/2008 00:00:00:000 to 02/01/2008 00:00:00:000. To achieve that,
         # another query constraint is needed to be added with the index 1.
-        if search_input.input_type in [constants.DATE_GPS, constants.DATE_UNIX, ]:
+        if search_input.get('input_type') in [constants.DATE_GPS, constants.DATE_UNIX, ]:
             self._update_database_search_parameter(
                 value=value + timedelta(days=1),
                 search_input=search_input,
@@ -248,8 +419,8 @@ class SearchQuery(object):
 
     def _process_search_parameters(self, cleaned_data):
         """
-        Sets up the ORDER BY and LIMIT clause based on user input. Currently, search parameter form only takes these
-        two inputs from the user. Based on the information passed, these two query clauses are computed.
+        Sets up the ORDER BY clause and the limit based on user input. Currently, search parameter form only takes these
+        two inputs from the user. Based on the information passed, these two query parameters are computed.
         :param cleaned_data: cleaned data of the search parameters form
         """
 
@@ -264,7 +435,6 @@ class SearchQuery(object):
                 order_by = 'DESC' if value else 'ASC'
 
         self.search_parameter_order_by = self.search_parameter_order_by.format(order_by=order_by)
-        self.search_parameter_limit = self.search_parameter_limit.format(limit=self.limit, offset=self.offset)
 
     def _process_query(self):
         """
@@ -279,7 +449,7 @@ class SearchQuery(object):
 
             # handling search parameter form, basically sets the
             # 1. ORDER BY clause
-            # 2. LIMIT clause
+            # 2. limit
             if type(form) is SearchParameterForm:
                 self._process_search_parameters(cleaned_data)
 
@@ -293,16 +463,22 @@ class SearchQuery(object):
 
     def get_query(self):
         """
-        Function that is called from outside to get the query and its clauses
-        :return: query string, values, order by clause, limit, offset, display headers
+        Function that is called from outside to get the query and its clauses. The query does not contain the ORDER BY
+        and LIMIT clauses, those are added for each page using get_page_query. The conditions depending on the indexes
+        are placeholders until the query is compiled with compile_search_query.
+        :return: query string, count query string, values, filter signature, order by clause, limit, offset, display
+        headers, tie-breaker field
         """
         return \
             self.query, \
+            self.query_count, \
             self.query_values, \
+            self.filter_signature, \
             self.search_parameter_order_by, \
             self.limit, \
             self.offset, \
-            self.display_headers
+            self.display_headers, \
+            self.tie_breaker
 
     def __init__(self, search_forms, form_type):
         """
@@ -319,6 +495,9 @@ class SearchQuery(object):
         # to store the query for counting total
         self.query_count = None
 
+        # to identify the conditions of the query regardless of their order
+        self.filter_signature = None
+
         # to render the query with values, should be in order
         self.query_values = []
 
@@ -335,14 +514,11 @@ class SearchQuery(object):
         # display headers to be rendered in the UI.
         self.display_headers = []
 
-        # constructing the initial ORDER BY clause based on the form type
-        if form_type == 'observation':
-            self.search_parameter_order_by = ' ORDER BY starttime {order_by}'
-        else:
-            self.search_parameter_order_by = ' ORDER BY job_id {order_by}'
+        # constructing the initial ORDER BY clause and the tie-breaker based on the form type
+        self.search_parameter_order_by, self.tie_breaker, self.key_fields = get_search_keys(form_type)
 
-        # setting up the search parameter LIMIT and OFFSET clause
-        self.search_parameter_limit = ' LIMIT {limit} OFFSET {offset}'
+        # compiled schema of the search page, containing the search inputs and the columns to display
+        self.search_page_schema = get_search_page_schema(form_type)
 
         # if forms are valid proceed to process and generate query
         # otherwise, raise an error.
@@ -0,0 +1,151 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import SearchState
+
+# version of the format of the search state, increase it when the fields of the state change
+SEARCH_STATE_VERSION = 2
+
+# number of seconds between two updates of the creation time of a state in use, see _refresh_search_state
+SEARCH_STATE_REFRESH_INTERVAL = 24 * 60 * 60
+
+# fields of the search state
+SEARCH_STATE_FIELDS = [
+    'form_type',
+    'query',
+    'query_count',
+    'query_values',
+    'filter_signature',
+    'display_headers',
+    'order_by',
+    'limit',
+    'tie_breaker',
+]
+
+
+def _get_search_state_cache_key(state_id):
+    """
+    Finds the cache key of a search state.
+    :param state_id: hash of the search state
+    :return: string of the cache key
+    """
+    return 'search_state:{}:{}'.format(SEARCH_STATE_VERSION, state_id)
+
+
+def _get_search_state_refresh_key(state_id):
+    """
+    Finds the cache key marking a search state as recently refreshed, see _refresh_search_state.
+    :param state_id: hash of the search state
+    :return: string of the cache key
+    """
+    return 'search_state_refreshed:{}:{}'.format(SEARCH_STATE_VERSION, state_id)
+
+
+def _refresh_search_state(state_id, serialised_state):
+    """
+    Moves the last used time of a search state forward, so that the states in use (ex: a link to a search shared with
+    others) do not expire. This is done at most once every SEARCH_STATE_REFRESH_INTERVAL for a state. A state removed
+    while its cached copy was still in use is stored again.
+    :param state_id: hash of the search state
+    :param serialised_state: JSON serialisation of the search state
+    """
+    if cache.get(_get_search_state_refresh_key(state_id)):
+        return
+
+    if not SearchState.objects.filter(id=state_id).update(last_used_time=timezone.now()):
+        SearchState.objects.get_or_create(
+            id=state_id,
+            defaults=dict(
+                version=SEARCH_STATE_VERSION,
+                state=serialised_state,
+            ),
+        )
+
+    cache.set(_get_search_state_refresh_key(state_id), True, SEARCH_STATE_REFRESH_INTERVAL)
+
+
+def save_search_state(**state):
+    """
+    Stores a search state under the hash of its content. As the same search always has the same hash, a state is only
+    stored once however many times it is searched.
+    :param state: fields of the search state, see SEARCH_STATE_FIELDS
+    :return: hash of the search state
+    """
+    serialised_state = json.dumps(
+        [SEARCH_STATE_VERSION] + [state.get(field) for field in SEARCH_STATE_FIELDS],
+        separators=(',', ':'),
+    )
+
+    state_id = hashlib.sha1(serialised_state.encode()).hexdigest()[:16]
+
+    if not cache.get(_get_search_state_cache_key(state_id)):
+        _, created = SearchState.objects.get_or_create(
+            id=state_id,
+            defaults=dict(
+                version=SEARCH_STATE_VERSION,
+                state=serialised_state,
+            ),
+        )
+
+        cache.set(_get_search_state_cache_key(state_id), serialised_state, None)
+
+        # a new state does not need to be refreshed
+        if created:
+            cache.set(_get_search_state_refresh_key(state_id), True, SEARCH_STATE_REFRESH_INTERVAL)
+
+    _refresh_search_state(state_id, serialised_state)
+
+    return state_id
+
+
+def get_search_state(state_id, form_type):
+    """
+    Retrieves a search state. The states are immutable, so they are cached once read. Using a state keeps it from
+    expiring.
+    :param state_id: hash of the search state
+    :param form_type: string defining the type of the search, ex: 'observation' or 'processing'
+    :return: dictionary of the fields of the search state, None if there is no such state for the form type
+    """
+    if not state_id:
+        return None
+
+    serialised_state = cache.get(_get_search_state_cache_key(state_id))
+
+    if not serialised_state:
+        try:
+            serialised_state = SearchState.objects.get(id=state_id, version=SEARCH_STATE_VERSION).state
+        except SearchState.DoesNotExist:
+            return None
+
+        cache.set(_get_search_state_cache_key(state_id), serialised_state, None)
+
+    state = dict(zip(SEARCH_STATE_FIELDS, json.loads(serialised_state)[1:]))
+
+    # a state can only be used for the search page it was created for
+    if state.get('form_type') != form_type:
+        return None
+
+    _refresh_search_state(state_id, serialised_state)
+
+    return state
+
+
+def clear_expired_search_states():
+    """
+    Removes the search states not used for SEARCH_STATE_EXPIRY_DAYS of the settings, and the states of the older
+    versions of the format, which are never used.
+    :return: number of the search states removed
+    """
+    expiry_time = timezone.now() - timedelta(days=settings.SEARCH_STATE_EXPIRY_DAYS)
+
+    return SearchState.objects.filter(Q(last_used_time__lt=expiry_time) | ~Q(version=SEARCH_STATE_VERSION)).delete()[0]
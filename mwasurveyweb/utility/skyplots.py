@@ -3,146 +3,617 @@ Distributed under the MIT License. See LICENSE.txt for more info.
 """
 
 import os
-import itertools
+import hashlib
+import json
 import sqlite3
-import astropy.units as u
+import tempfile
 import logging
+import numpy as np
 
-from astropy.coordinates import SkyCoord
+from concurrent.futures import ProcessPoolExecutor
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 
+from .database import (
+    gleam_cursor,
+    get_database_version,
+)
 from ..models import (
-    SkyPlotsConfiguration,
     Colour,
     SkyPlot,
 )
 
-import matplotlib
-
-# this must be used like the following
-# setting up the matplotlib backend as 'Agg'
-matplotlib.use('Agg')
-# now importing the pyplot
-import matplotlib.pyplot as plt
+# each figure is drawn on its own Agg canvas, pyplot (and its global state) is not used, so that figures can be
+# rendered in worker processes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import LinearSegmentedColormap, Normalize, to_rgb
+from matplotlib.figure import Figure
 
 logger = logging.getLogger(__name__)
 
+# name of the image showing the empty sky, the colour layers are drawn on top of it. The images of the layers are named
+# after their colours, the leading underscore keeps the name apart from the colour names.
+BASE_IMAGE_NAME = '_base'
+
+# file keeping the signature of the data and the configuration the sky plots were last generated for
+SIGNATURE_FILE_NAME = 'signature.txt'
+
+# modes of drawing the observations on the sky plots, see SKY_PLOTS_MODE in the settings
+MARKERS = 'markers'
+DENSITY = 'density'
+
+# size in points and opacity of the markers of the observations in the MARKERS mode
+MARKER_SIZE = 40
+MARKER_ALPHA = 0.1
+
+# number of decimals the positions of the markers are rounded to in the sky coverage, in radian (about 0.006 degrees)
+MARKER_POSITION_DECIMALS = 4
+
+
+def get_sky_plots_directory():
+    """
+    Finds the directory where the sky plot images are saved.
+    :return: path of the directory
+    """
+    return os.path.join(
+        settings.BASE_DIR,
+        '..',
+        'static/images/skyplots/',
+    )
+
 
-def generate_sky_plot_by_colour(colour_set, cursor, is_default=False):
+def get_sky_plot_layers():
+    """
+    Finds the colour layers of the sky plots along with the observation statuses drawn in each of them, in the order of
+    the colour names, so that names and the order of drawing are consistent.
+    :return: list of dictionaries of colour name, colour code and the list of statuses
     """
-    This function generates a sky plot by colours. A colour can resemble more than one status and hence, for each colour
-    this function finds the related observations and plots them in the graph using the associated colour code.
-    :param colour_set: set of colour
+    colours = Colour.objects.all().order_by('name').prefetch_related('skyplotsconfiguration_set')
+
+    return [
+        dict(
+            name=colour.name,
+            code=colour.code,
+            statuses=sorted(
+                [configuration.observation_status for configuration in colour.skyplotsconfiguration_set.all()]
+            ),
+        ) for colour in colours
+    ]
+
+
+def get_observation_coordinates(cursor, statuses):
+    """
+    Retrieves the pointings of the observations of the statuses from the GLEAM-X database using a single query.
     :param cursor: cursor to execute queries to the GLEAM-X database
-    :param is_default: boolean to indicate whether this plot is the default to show on the landing page
-    :return: nothing, but saves an image
+    :param statuses: list of observation statuses
+    :return: dictionary of status to a tuple of numpy arrays of ra and dec in degrees
     """
+    coordinates = dict()
 
-    # query to retrieve ra and dec for observation
-    query = 'SELECT ra_pointing, dec_pointing FROM observation WHERE status = ?'
+    if not statuses:
+        return coordinates
 
-    # figure/plot configuration
-    plt.figure(figsize=(16, 8.4))
-    plt.subplot(111, projection="aitoff")
-    plt.grid(True)
+    # query to retrieve ra and dec of the observations, ordered so that the same data gives the same signature
+    query = 'SELECT status, ra_pointing, dec_pointing FROM observation WHERE status IN ({}) ORDER BY obs_id'.format(
+        ', '.join(['?'] * len(statuses))
+    )
 
-    # list to store distinct colour names
-    colours = []
+    results = cursor.execute(query, statuses).fetchall()
 
-    for colour in colour_set:
+    status_column = np.array([row[0] for row in results], dtype=object)
+    ra_dec = np.array([row[1:] for row in results], dtype=np.float64).reshape(-1, 2)
 
-        # finding the related status for a colour
-        status_list = SkyPlotsConfiguration.objects.filter(colour=colour).values('observation_status')
+    for status in statuses:
+        selected = status_column == status
 
-        for status in status_list:
+        # observations without pointing can not be plotted
+        selected &= np.isfinite(ra_dec).all(axis=1)
 
-            # finding the observations' information for the status
-            results = cursor.execute(query, [status.get('observation_status')]).fetchall()
-            ra = []
-            dec = []
+        coordinates.update({
+            status: (ra_dec[selected, 0], ra_dec[selected, 1]),
+        })
 
-            # creating list of ra and dec
-            for row in results:
-                ra.append(row[0])
-                dec.append(row[1])
+    return coordinates
 
-            # continue to the next status if there are no observations found for the current status
-            if not len(ra):
-                continue
 
-            # Otherwise, change to sky-coordinates and find ra and dec in radian
-            c = SkyCoord(ra=ra, dec=dec, frame='icrs', unit=(u.degree, u.degree))
-            ra_rad = c.ra.wrap_at(180 * u.deg).radian
-            dec_rad = c.dec.radian
+def get_sky_plots_signature(layers, coordinates, options):
+    """
+    Computes a signature of the configuration of the layers and the pointings of the observations drawn, it changes if
+    any observation changes its status (or pointing) or the configuration is changed.
+    :param layers: list of the colour layers
+    :param coordinates: dictionary of status to a tuple of numpy arrays of ra and dec
+    :param options: dictionary of the options of drawing, ex: the mode
+    :return: string of the signature
+    """
+    signature = hashlib.sha1(json.dumps([layers, options], sort_keys=True).encode())
 
-            # plot ra and dec in the graph
-            plt.plot(ra_rad, dec_rad, 'o', markersize=40, alpha=0.1, color='#{}'.format(colour.code))
+    for status in sorted(coordinates.keys()):
+        ra, dec = coordinates.get(status)
+        signature.update(status.encode())
+        signature.update(ra.tobytes())
+        signature.update(dec.tobytes())
 
-        colours.append(colour.name)
+    return signature.hexdigest()
 
-    # constructing the image name
-    image_name = '_'.join(colours)
 
-    # for no colour image, the name must be blank
-    if not image_name:
-        image_name = 'blank'
+def get_image_names(layers):
+    """
+    Finds the names of the sky plot images for the layers, the base image is the first.
+    :param layers: list of the colour layers
+    :return: list of the image names
+    """
+    return [
+        '/images/skyplots/{}.png'.format(name) for name in [BASE_IMAGE_NAME] + [layer.get('name') for layer in layers]
+    ]
 
-    # construct the image path to save the image
-    file_path = os.path.join(
-        settings.BASE_DIR,
-        '..',
-        'static/images/skyplots/',
-        '{}.png'.format(image_name),
+
+def is_sky_plots_up_to_date(layers, signature):
+    """
+    Checks whether the sky plots have already been generated for the same data and configuration.
+    :param layers: list of the colour layers
+    :param signature: signature of the current data and configuration
+    :return: True if nothing needs to be generated, False otherwise
+    """
+    try:
+        with open(os.path.join(get_sky_plots_directory(), SIGNATURE_FILE_NAME)) as signature_file:
+            if signature_file.read().strip() != signature:
+                return False
+    except OSError:
+        return False
+
+    image_names = get_image_names(layers)
+
+    # the entries of the sky plots and their images must all be there
+    if set(SkyPlot.objects.values_list('name', flat=True)) != set(image_names):
+        return False
+
+    return all(
+        os.path.exists(os.path.join(get_sky_plots_directory(), os.path.basename(image_name)))
+        for image_name in image_names
+    )
+
+
+def save_observation_coordinates(coordinates, file_path):
+    """
+    Saves the pointings of all statuses in a single numpy file, so that the processes rendering the sky plots can map
+    it in memory instead of receiving a copy of the pointings with each task.
+    :param coordinates: dictionary of status to a tuple of numpy arrays of ra and dec in degrees
+    :param file_path: path of the numpy file
+    :return: dictionary of status to the (start, end) rows of its pointings in the file
+    """
+    offsets = dict()
+    ra_dec = []
+    start = 0
+
+    for status in sorted(coordinates.keys()):
+        ra, dec = coordinates.get(status)
+        ra_dec.append(np.column_stack([ra, dec]))
+        offsets.update({
+            status: (start, start + len(ra)),
+        })
+        start += len(ra)
+
+    np.save(file_path, np.concatenate(ra_dec) if ra_dec else np.empty((0, 2)))
+
+    return offsets
+
+
+def load_observation_coordinates(file_path, offsets):
+    """
+    Maps the pointings saved by save_observation_coordinates in memory.
+    :param file_path: path of the numpy file
+    :param offsets: dictionary of status to the (start, end) rows of its pointings in the file
+    :return: dictionary of status to a tuple of numpy arrays of ra and dec in degrees
+    """
+    ra_dec = np.load(file_path, mmap_mode='r')
+
+    return {
+        status: (ra_dec[start:end, 0], ra_dec[start:end, 1]) for status, (start, end) in offsets.items()
+    }
+
+
+def get_plot_coordinates(ra, dec):
+    """
+    Converts the pointings to the coordinates of the aitoff projection, that is, ra wrapped at 180 degrees (in the range
+    [-180, 180) degrees) and dec, both in radian. This is the same as
+    SkyCoord(ra=ra, dec=dec, unit=(u.degree, u.degree)).ra.wrap_at(180 * u.deg).radian (and .dec.radian) of astropy, but
+    using numpy only.
+    :param ra: numpy array of ra in degrees
+    :param dec: numpy array of dec in degrees
+    :return: tuple of numpy arrays of ra and dec in radian
+    """
+    ra = np.array(ra, dtype=np.float64)
+
+    # wrapping the angles in the range [-180, 180)
+    ra -= np.floor((ra + 180.0) / 360.0) * 360.0
+
+    # rounding errors can push the angles out of the range
+    ra[ra >= 180.0] -= 360.0
+    ra[ra < -180.0] += 360.0
+
+    return np.radians(ra), np.radians(np.asarray(dec, dtype=np.float64))
+
+
+def get_density_grid(bins):
+    """
+    Finds the edges of the cells of an equal-area grid of the sky. The cells are equal in ra and in sin(dec), so that
+    all of them cover the same area of the sky.
+    :param bins: tuple of the number of cells in ra and in dec
+    :return: tuple of numpy arrays of the edges in ra and dec in radian
+    """
+    ra_edges = np.linspace(-np.pi, np.pi, bins[0] + 1)
+    dec_edges = np.arcsin(np.linspace(-1.0, 1.0, bins[1] + 1))
+
+    return ra_edges, dec_edges
+
+
+def get_density(ra, dec, bins):
+    """
+    Counts the observations in the cells of the equal-area grid of the sky.
+    :param ra: numpy array of ra in degrees
+    :param dec: numpy array of dec in degrees
+    :param bins: tuple of the number of cells in ra and in dec
+    :return: numpy array of the counts with a row for each cell in dec
+    """
+    ra_rad, dec_rad = get_plot_coordinates(ra, dec)
+
+    counts, _, _ = np.histogram2d(
+        np.sin(dec_rad),
+        ra_rad,
+        bins=[bins[1], bins[0]],
+        range=[[-1.0, 1.0], [-np.pi, np.pi]],
+    )
+
+    return counts
+
+
+def create_figure():
+    """
+    Creates the figure of a sky plot on its own Agg canvas. The base image and all layers use the same figure, so that
+    they can be drawn on top of each other.
+    :return: the figure and its aitoff axes
+    """
+    figure = Figure(figsize=(16, 8.4))
+    FigureCanvasAgg(figure)
+
+    return figure, figure.add_subplot(111, projection="aitoff")
+
+
+def generate_sky_plot_base(file_path):
+    """
+    Generates the base image of the sky plots, that is, the empty sky with its grid.
+    :param file_path: path to save the image
+    """
+    figure, axes = create_figure()
+    axes.grid(True)
+
+    figure.savefig(file_path)
+
+
+def generate_sky_plot_by_colour(layer, coordinates, file_path, mode=MARKERS, bins=None):
+    """
+    This function generates the sky plot layer of a colour. A colour can resemble more than one status and hence, for
+    each colour this function plots the observations of the related statuses using the associated colour code. The
+    layer is transparent, so that it can be shown on top of the base image and the other layers.
+    :param layer: dictionary of colour name, colour code and the list of statuses
+    :param coordinates: dictionary of status to a tuple of numpy arrays of ra and dec in degrees
+    :param file_path: path to save the image
+    :param mode: MARKERS to draw a marker for each observation, DENSITY to draw the number of observations in the cells
+    of an equal-area grid
+    :param bins: tuple of the number of cells in ra and in dec of the grid for the DENSITY mode
+    """
+    figure, axes = create_figure()
+
+    # only the observations are drawn, the grid and the frame are in the base image
+    axes.set_axis_off()
+
+    if mode == DENSITY:
+        draw_density(axes, layer, coordinates, bins)
+    else:
+        draw_markers(axes, layer, coordinates)
+
+    figure.savefig(file_path, transparent=True)
+
+
+def draw_markers(axes, layer, coordinates):
+    """
+    Draws a marker for each observation of the statuses of a layer.
+    :param axes: aitoff axes of the figure
+    :param layer: dictionary of colour name, colour code and the list of statuses
+    :param coordinates: dictionary of status to a tuple of numpy arrays of ra and dec in degrees
+    """
+    for status in layer.get('statuses'):
+        ra, dec = coordinates.get(status, (np.array([]), np.array([])))
+
+        # continue to the next status if there are no observations found for the current status
+        if not len(ra):
+            continue
+
+        # Otherwise, find the coordinates of the projection, ra and dec in radian
+        ra_rad, dec_rad = get_plot_coordinates(ra, dec)
+
+        # plot ra and dec in the graph
+        axes.plot(
+            ra_rad,
+            dec_rad,
+            'o',
+            markersize=MARKER_SIZE,
+            alpha=MARKER_ALPHA,
+            color='#{}'.format(layer.get('code')),
+        )
+
+
+def draw_density(axes, layer, coordinates, bins):
+    """
+    Draws the number of observations of the statuses of a layer in the cells of an equal-area grid, as a single mesh
+    whose opacity grows with the (logarithm of the) number of observations. Empty cells are left transparent.
+    :param axes: aitoff axes of the figure
+    :param layer: dictionary of colour name, colour code and the list of statuses
+    :param coordinates: dictionary of status to a tuple of numpy arrays of ra and dec in degrees
+    :param bins: tuple of the number of cells in ra and in dec of the grid
+    """
+    counts = np.zeros((bins[1], bins[0]))
+
+    for status in layer.get('statuses'):
+        ra, dec = coordinates.get(status, (np.array([]), np.array([])))
+        counts += get_density(ra, dec, bins)
+
+    # nothing to draw if there are no observations found for the statuses
+    if not counts.any():
+        return
+
+    colour = to_rgb('#{}'.format(layer.get('code')))
+    colour_map = LinearSegmentedColormap.from_list(
+        'density_{}'.format(layer.get('name')),
+        [colour + (0.15, ), colour + (0.9, )],
     )
 
-    # save the image in the physical location
-    plt.savefig(file_path)
-    plt.close()
-
-    # create or update an entry to the database, so that it is available
-    SkyPlot.objects.update_or_create(
-        name='/images/skyplots/{}.png'.format(image_name),
-        defaults={
-            "generation_time": timezone.localtime(timezone.now()),
-            "is_default": is_default,
-        }
+    ra_edges, dec_edges = get_density_grid(bins)
+
+    axes.pcolormesh(
+        ra_edges,
+        dec_edges,
+        np.ma.masked_equal(np.log1p(counts), 0),
+        cmap=colour_map,
+        norm=Normalize(vmin=0, vmax=np.log1p(counts.max())),
     )
 
 
-def generate_sky_plots():
+def render_sky_plot(task):
+    """
+    Renders a sky plot image, the base image if the task has no layer, otherwise the layer. This is the unit of work
+    given to the worker processes, therefore, it does not use the application database.
+    :param task: dictionary of the layer, the path and offsets of the pointings file and the path to save the image
+    """
+    if task.get('layer') is None:
+        generate_sky_plot_base(task.get('file_path'))
+    else:
+        generate_sky_plot_by_colour(
+            task.get('layer'),
+            load_observation_coordinates(task.get('data_path'), task.get('offsets')),
+            task.get('file_path'),
+            mode=task.get('mode'),
+            bins=task.get('bins'),
+        )
+
+
+def generate_sky_plots(force=False, workers=1, mode=None):
     """
     Generates sky plots based on the information stored in the GLEAM-X database and application's default database.
+    Instead of a plot for every combination of colours, a base image and a transparent layer for each colour are
+    generated and the landing page shows the layers of the selected colours on top of the base image. Nothing is
+    generated if neither the observations nor the configuration changed since the last time.
+    The images are rendered in a pool of worker processes if more than one worker is requested. They replace the
+    current images and the database entries are updated together only once all of them are rendered, so that the
+    landing page never shows a partially updated set.
+    :param force: boolean to generate the sky plots even if nothing has changed
+    :param workers: number of processes rendering the images
+    :param mode: MARKERS or DENSITY, how to draw the observations, SKY_PLOTS_MODE of the settings if not given
     """
 
     # finding the current time.
     now = timezone.localtime(timezone.now())
 
-    # connect to gleam-x database
-    try:
-
-        conn = sqlite3.connect(settings.GLEAM_DATABASE_PATH)
-
-        cursor = conn.cursor()
+    layers = get_sky_plot_layers()
 
+    # retrieving the pointings of all the statuses at once
+    try:
+        with gleam_cursor() as cursor:
+            coordinates = get_observation_coordinates(
+                cursor,
+                [status for layer in layers for status in layer.get('statuses')],
+            )
     except sqlite3.Error as ex:
         print('Could not generate plots due to SQLite error : ' + ex.__str__())
         logger.info('Could not generate plots due to SQLite error : ' + ex.__str__())
-    else:
+        return
+
+    options = dict(
+        mode=mode or settings.SKY_PLOTS_MODE,
+        bins=list(settings.SKY_PLOTS_DENSITY_BINS),
+    )
+
+    signature = get_sky_plots_signature(layers, coordinates, options)
+
+    if not force and is_sky_plots_up_to_date(layers, signature):
+        logger.info('Sky plots are up to date')
+        return
+
+    directory = get_sky_plots_directory()
+    image_names = [BASE_IMAGE_NAME] + [layer.get('name') for layer in layers]
+
+    # the images are rendered to temporary files first
+    temporary_file_paths = [
+        os.path.join(directory, '{}.tmp.png'.format(image_name)) for image_name in image_names
+    ]
+
+    data_file_descriptor, data_path = tempfile.mkstemp(suffix='.npy')
+    os.close(data_file_descriptor)
+
+    try:
+        offsets = save_observation_coordinates(coordinates, data_path)
+
+        tasks = [
+            dict(
+                layer=layer,
+                data_path=data_path,
+                offsets=offsets,
+                file_path=file_path,
+                mode=options.get('mode'),
+                bins=options.get('bins'),
+            ) for layer, file_path in zip([None] + layers, temporary_file_paths)
+        ]
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(render_sky_plot, tasks))
+        else:
+            for task in tasks:
+                render_sky_plot(task)
+
+        # replacing the current images
+        for image_name, temporary_file_path in zip(image_names, temporary_file_paths):
+            os.replace(temporary_file_path, os.path.join(directory, '{}.png'.format(image_name)))
+
+    finally:
+        os.remove(data_path)
+
+        for temporary_file_path in temporary_file_paths:
+            if os.path.exists(temporary_file_path):
+                os.remove(temporary_file_path)
+
+    with transaction.atomic():
+
+        # create or update the entries to the database, so that they are available. All images are shown at the
+        # beginning.
+        for image_name in image_names:
+            SkyPlot.objects.update_or_create(
+                name='/images/skyplots/{}.png'.format(image_name),
+                defaults={
+                    "generation_time": timezone.localtime(timezone.now()),
+                    "is_default": True,
+                }
+            )
+
+        # clean up the image files
+        SkyPlot.objects.filter(generation_time__lt=now).delete()
+
+    with open(os.path.join(directory, SIGNATURE_FILE_NAME), 'w') as signature_file:
+        signature_file.write(signature)
+
+
+def get_figure_geometry():
+    """
+    Finds the size of the sky plot images and the position of the aitoff axes in them, so that the coverage can be
+    drawn on top of the base image by the browser.
+    :return: dictionary of the size in pixels, the axes as [left, bottom, width, height] fractions of the image and the
+    resolution in dots per inch
+    """
+    figure, axes = create_figure()
 
-        # find out the colours, in order, so that names would be consistent
-        colours = Colour.objects.all().order_by('name')
+    # the aitoff axes keep their aspect ratio, which moves them within the subplot area
+    axes.apply_aspect()
 
-        # for each combination of colour, a sky plot is generated
-        for L in range(0, len(colours) + 1):
-            for subset in itertools.combinations(colours, L):
-                generate_sky_plot_by_colour(subset, cursor, is_default=(L == len(colours)))
+    return dict(
+        size=[int(size) for size in figure.get_size_inches() * figure.dpi],
+        axes=[round(float(bound), 6) for bound in axes.get_position().bounds],
+        dpi=float(figure.dpi),
+    )
+
+
+def get_sky_coverage_etag():
+    """
+    Computes the entity tag of the sky coverage. It changes with the GLEAM-X database, the configuration of the
+    layers and the mode of the sky plots.
+    :return: string of the entity tag
+    """
+    return hashlib.sha1(json.dumps(
+        [get_database_version(), get_sky_plot_layers(), list(settings.SKY_PLOTS_DENSITY_BINS), settings.SKY_PLOTS_MODE],
+    ).encode()).hexdigest()
+
+
+def get_marker_positions(ra, dec):
+    """
+    Finds the distinct positions of the markers of the observations in the aitoff projection, along with the number of
+    observations at each of them. The pointings of the survey repeat, so there are far fewer positions than
+    observations.
+    :param ra: numpy array of ra in degrees
+    :param dec: numpy array of dec in degrees
+    :return: flat list of triples of ra and dec in radian and number of observations
+    """
+    positions = np.round(np.column_stack(get_plot_coordinates(ra, dec)), MARKER_POSITION_DECIMALS)
+
+    if not len(positions):
+        return []
+
+    positions, counts = np.unique(positions, axis=0, return_counts=True)
+
+    return np.column_stack([positions, counts]).reshape(-1).tolist()
+
+
+def get_sky_coverage():
+    """
+    Computes the coverage of the sky by the observations of each status, the same way as SKY_PLOTS_MODE of the settings
+    draws the sky plot images. In the MARKERS mode, it is the distinct positions of the markers of the observations
+    (see get_marker_positions). In the DENSITY mode, it is the number of observations in the cells of the equal-area
+    grid (see get_density_grid). Only the non-empty cells are listed, as a flat list of pairs of cell index (row in dec
+    * number of cells in ra + column in ra) and count. The coverage is cached until the GLEAM-X database or the
+    configuration changes.
+    :return: dictionary of the mode, the grid, the markers, the geometry of the figure, the layers and the coverage of
+    each status
+    """
+    cache_key = 'sky_coverage:{}'.format(get_sky_coverage_etag())
+
+    sky_coverage = cache.get(cache_key)
+
+    if sky_coverage is not None:
+        return sky_coverage
+
+    mode = settings.SKY_PLOTS_MODE
+    layers = get_sky_plot_layers()
+    bins = list(settings.SKY_PLOTS_DENSITY_BINS)
+
+    with gleam_cursor() as cursor:
+        coordinates = get_observation_coordinates(
+            cursor,
+            [status for layer in layers for status in layer.get('statuses')],
+        )
+
+    statuses = dict()
+
+    for status, (ra, dec) in coordinates.items():
+        if mode == DENSITY:
+            counts = get_density(ra, dec, bins).astype(np.int64).reshape(-1)
+            cells = np.flatnonzero(counts)
+
+            statuses.update({
+                status: dict(
+                    total=int(len(ra)),
+                    cells=np.column_stack([cells, counts[cells]]).reshape(-1).tolist(),
+                ),
+            })
+        else:
+            statuses.update({
+                status: dict(
+                    total=int(len(ra)),
+                    positions=get_marker_positions(ra, dec),
+                ),
+            })
+
+    figure = get_figure_geometry()
+
+    sky_coverage = dict(
+        mode=DENSITY if mode == DENSITY else MARKERS,
+        grid=dict(ra_bins=bins[0], dec_bins=bins[1]),
+        markers=dict(size=round(MARKER_SIZE * figure.get('dpi') / 72, 2), alpha=MARKER_ALPHA),
+        figure=figure,
+        layers=layers,
+        statuses=statuses,
+    )
 
-        try:
-            conn.close()
-        except sqlite3.Error:
-            pass
+    cache.set(cache_key, sky_coverage)
 
-    # clean up the image files
-    SkyPlot.objects.filter(generation_time__lt=now).delete()
+    return sky_coverage
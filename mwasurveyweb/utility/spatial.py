@@ -0,0 +1,285 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .database import (
+    SPATIAL_INDEX_SCHEMA,
+    gleam_cursor,
+    get_database_version,
+)
+
+# the positions the spatial index is built from
+SPATIAL_INDEX_TABLE = 'observation'
+SPATIAL_INDEX_KEY = 'obs_id'
+SPATIAL_INDEX_FIELDS = ('ra_pointing', 'dec_pointing')
+
+# number of positions read from the GLEAM-X database at a time while finding their stamp
+POSITIONS_BATCH_SIZE = 10000
+
+# margin in degrees added to the boxes around a cone, so that the rounding errors do not leave out positions on the
+# border of the cone, the exact angular distance check decides about those
+CONE_MARGIN = 1e-9
+
+
+def get_unit_vector(ra, dec):
+    """
+    Converts a position on the sky to a point on the unit sphere. Points close on the sky are close in space as well,
+    regardless of the wrap-around of the right ascension at 0/360 degrees or of the poles.
+    :param ra: right ascension in degrees
+    :param dec: declination in degrees
+    :return: tuple of x, y and z
+    """
+    ra, dec = math.radians(ra), math.radians(dec)
+
+    return math.cos(dec) * math.cos(ra), math.cos(dec) * math.sin(ra), math.sin(dec)
+
+
+def get_positions_stamp(cursor):
+    """
+    Finds a stamp of the observation positions, a digest of the key and the position of every observation in the
+    order of the keys. It changes when observations are added or removed or their positions are updated, but not when
+    the other fields (ex: the status) are, so the spatial index does not need to be rebuilt each time the pipeline
+    updates the GLEAM-X database.
+    :param cursor: cursor of the GLEAM-X database
+    :return: string of the stamp
+    """
+    digest = hashlib.sha1()
+
+    cursor.execute('SELECT {key}, {ra}, {dec} FROM {table} ORDER BY {key}'.format(
+        key=SPATIAL_INDEX_KEY,
+        ra=SPATIAL_INDEX_FIELDS[0],
+        dec=SPATIAL_INDEX_FIELDS[1],
+        table=SPATIAL_INDEX_TABLE,
+    ))
+
+    rows = cursor.fetchmany(POSITIONS_BATCH_SIZE)
+
+    # repr keeps every digit of the positions
+    while rows:
+        digest.update(repr(rows).encode())
+        rows = cursor.fetchmany(POSITIONS_BATCH_SIZE)
+
+    return digest.hexdigest()
+
+
+def build_spatial_index(index_path):
+    """
+    Builds the spatial index of the observation positions in a file next to the GLEAM-X database, which itself is
+    never modified. The positions are stored as points on the unit sphere in an R*Tree table, so that a cone is found
+    by looking up the box around it. The file is built under a temporary name and then moved over the old one, the
+    connections to the GLEAM-X database notice the new file and attach it.
+    :param index_path: path of the spatial index file
+    :return: number of positions in the index
+    """
+    # the version is found before the positions are read, so that a change in between makes it older than the
+    # positions rather than newer
+    database_version = get_database_version()
+
+    with gleam_cursor() as cursor:
+
+        # reading the positions and their stamp from the same snapshot of the database
+        cursor.execute('BEGIN')
+
+        positions_stamp = get_positions_stamp(cursor)
+
+        rows = cursor.execute(
+            'SELECT {key}, {ra}, {dec} FROM {table} WHERE {ra} IS NOT NULL AND {dec} IS NOT NULL'.format(
+                key=SPATIAL_INDEX_KEY,
+                ra=SPATIAL_INDEX_FIELDS[0],
+                dec=SPATIAL_INDEX_FIELDS[1],
+                table=SPATIAL_INDEX_TABLE,
+            )
+        ).fetchall()
+
+    positions = [(row[0], ) + get_unit_vector(row[1], row[2]) for row in rows]
+
+    file_descriptor, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(index_path)),
+        suffix='.tmp',
+    )
+    os.close(file_descriptor)
+
+    try:
+        conn = sqlite3.connect(temp_path)
+
+        try:
+            conn.execute('CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)')
+            conn.execute('CREATE TABLE observation_position (obs_id INTEGER PRIMARY KEY, x REAL, y REAL, z REAL)')
+            conn.execute('CREATE VIRTUAL TABLE observation_rtree USING rtree(id, min_x, max_x, min_y, max_y, min_z, '
+                         'max_z)')
+
+            conn.executemany('INSERT INTO observation_position VALUES (?, ?, ?, ?)', positions)
+
+            # the R*Tree stores boxes, a point is a box of no size
+            conn.executemany(
+                'INSERT INTO observation_rtree VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(obs_id, x, x, y, y, z, z) for obs_id, x, y, z in positions],
+            )
+
+            conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('positions_stamp', positions_stamp),
+                ('database_version', database_version),
+            ])
+            conn.commit()
+        finally:
+            conn.close()
+
+        os.replace(temp_path, index_path)
+    except (OSError, sqlite3.Error):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return len(positions)
+
+
+def is_spatial_index_current():
+    """
+    Checks whether the spatial index has been built from the current observation positions. The index is current
+    without reading the positions while the GLEAM-X database is the one it was built from, otherwise the stamp of the
+    positions is compared. The answer is cached for the version of the GLEAM-X database and of the index file, so the
+    positions are only looked at again when either of them changes.
+    :return: True if the spatial index can be used, False otherwise
+    """
+    try:
+        stat = os.stat(settings.GLEAM_SPATIAL_INDEX_PATH)
+    except OSError:
+        return False
+
+    cache_key = 'spatial_index_current_{}'.format(
+        '-'.join(str(part) for part in [get_database_version(), stat.st_ino, stat.st_size, stat.st_mtime_ns]),
+    )
+
+    is_current = cache.get(cache_key)
+
+    if is_current is None:
+        try:
+            with gleam_cursor() as cursor:
+                is_current = SPATIAL_INDEX_SCHEMA in [row[1] for row in cursor.execute('PRAGMA database_list')]
+
+                if is_current:
+                    meta = dict(cursor.execute('SELECT name, value FROM {}.meta'.format(SPATIAL_INDEX_SCHEMA)))
+
+                    is_current = meta.get('database_version') == get_database_version() or \
+                        meta.get('positions_stamp') == get_positions_stamp(cursor)
+        except sqlite3.Error:
+            return False
+
+        cache.set(cache_key, is_current)
+
+    return is_current
+
+
+def get_cone_index_condition(table, ra, dec, radius):
+    """
+    Forms the condition of a cone search using the spatial index. The R*Tree finds the candidates in the box around
+    the cone in the unit sphere space, the exact check compares the dot product of the unit vectors with the cosine of
+    the radius.
+    :param table: name of the table searched
+    :param ra: right ascension of the centre in degrees
+    :param dec: declination of the centre in degrees
+    :param radius: radius in degrees
+    :return: condition string and the list of its values
+    """
+    centre = get_unit_vector(ra, dec)
+
+    # the length of the chord of the radius, every point of the cone is within it from the centre in each axis
+    half_width = 2 * math.sin(math.radians(min(radius + CONE_MARGIN, 180)) / 2)
+
+    condition = \
+        '({table}.{key} IN (' \
+        'SELECT cone_position.obs_id ' \
+        'FROM {schema}.observation_rtree cone_box ' \
+        'JOIN {schema}.observation_position cone_position ON cone_position.obs_id = cone_box.id ' \
+        'WHERE cone_box.max_x >= ? AND cone_box.min_x <= ? ' \
+        'AND cone_box.max_y >= ? AND cone_box.min_y <= ? ' \
+        'AND cone_box.max_z >= ? AND cone_box.min_z <= ? ' \
+        'AND cone_position.x * ? + cone_position.y * ? + cone_position.z * ? >= ?))'.format(
+            table=table,
+            key=SPATIAL_INDEX_KEY,
+            schema=SPATIAL_INDEX_SCHEMA,
+        )
+
+    values = []
+    for coordinate in centre:
+        values.extend([coordinate - half_width, coordinate + half_width])
+
+    values.extend(centre)
+    values.append(math.cos(math.radians(radius)))
+
+    return condition, values
+
+
+def get_cone_scan_condition(table, ra_field, dec_field, ra, dec, radius):
+    """
+    Forms the condition of a cone search without the spatial index. The box of declinations and right ascensions
+    around the cone narrows the rows down (using the indexes of the fields, if any), the angular distance decides.
+    The right ascensions of the box wrap around at 0/360 degrees and are not limited if the cone contains a pole.
+    :param table: name of the table searched
+    :param ra_field: name of the right ascension field
+    :param dec_field: name of the declination field
+    :param ra: right ascension of the centre in degrees
+    :param dec: declination of the centre in degrees
+    :param radius: radius in degrees
+    :return: condition string and the list of its values
+    """
+    ra_expression = '{}.{}'.format(table, ra_field)
+    dec_expression = '{}.{}'.format(table, dec_field)
+
+    dec_min = dec - radius - CONE_MARGIN
+    dec_max = dec + radius + CONE_MARGIN
+
+    conditions = ['{} BETWEEN ? AND ?'.format(dec_expression)]
+    values = [dec_min, dec_max]
+
+    if -90 < dec_min and dec_max < 90:
+
+        # widest right ascension difference of the cone, at the declination where the cone touches the meridian
+        half_width = math.degrees(math.asin(min(math.sin(math.radians(radius)) / math.cos(math.radians(dec)), 1)))
+        half_width += CONE_MARGIN
+
+        if half_width < 180:
+            ra_min = (ra - half_width) % 360
+            ra_max = (ra + half_width) % 360
+
+            if ra_min <= ra_max:
+                conditions.append('{} BETWEEN ? AND ?'.format(ra_expression))
+            else:
+                conditions.append('({ra} >= ? OR {ra} <= ?)'.format(ra=ra_expression))
+
+            values.extend([ra_min, ra_max])
+
+    conditions.append('angular_distance({}, {}, ?, ?) <= ?'.format(ra_expression, dec_expression))
+    values.extend([ra, dec, radius])
+
+    return '({})'.format(' AND '.join(conditions)), values
+
+
+def get_cone_condition(table, ra_field, dec_field, ra, dec, radius):
+    """
+    Forms the condition of a cone search, using the spatial index if it has been built from the current positions of
+    the searched fields.
+    :param table: name of the table searched
+    :param ra_field: name of the right ascension field
+    :param dec_field: name of the declination field
+    :param ra: right ascension of the centre in degrees
+    :param dec: declination of the centre in degrees
+    :param radius: radius in degrees
+    :return: condition string and the list of its values
+    """
+    ra = ra % 360
+    dec = min(max(dec, -90), 90)
+
+    if (table, (ra_field, dec_field)) == (SPATIAL_INDEX_TABLE, SPATIAL_INDEX_FIELDS) and is_spatial_index_current():
+        return get_cone_index_condition(table, ra, dec, radius)
+
+    return get_cone_scan_condition(table, ra_field, dec_field, ra, dec, radius)
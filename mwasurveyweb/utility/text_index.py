@@ -0,0 +1,400 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import zlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .database import (
+    TEXT_INDEX_SCHEMA,
+    gleam_cursor,
+    get_database_version,
+)
+
+# number of rows read from the GLEAM-X database at a time while indexing
+INDEX_BATCH_SIZE = 1000
+
+# version of the layout of the index file, kept as its user_version, an index of another version is built again
+TEXT_INDEX_FORMAT = 2
+
+
+def get_match_terms(text):
+    """
+    Splits the text of a full-text search input into its terms. A term is a word, a word ending with * to match the
+    words starting with it, or a "quoted phrase" to match the words next to each other. Only the letters and digits of
+    a term are kept, the rest separate its words the same way as the full-text index does, so the terms can not inject
+    the syntax of the full-text queries.
+    :param text: text of the input
+    :return: list of tuples of the words of each term and whether the last word is a prefix
+    """
+    terms = []
+
+    for phrase, phrase_prefix, word in re.findall(r'"([^"]*)"(\*?)|(\S+)', text):
+        words = re.findall(r'[^\W_]+', phrase or word)
+
+        if words:
+            terms.append((words, bool(phrase_prefix) or (word or '').endswith('*')))
+
+    return terms
+
+
+def get_match_query(fields, terms):
+    """
+    Forms the full-text query of the terms, looking for all of them in any of the fields.
+    :param fields: list of the names of the fields
+    :param terms: list of the terms, see get_match_terms
+    :return: string of the full-text query, ex: '{obsname} : ("high"* "season1")'
+    """
+    return '{{{fields}}} : ({terms})'.format(
+        fields=' '.join(fields),
+        terms=' '.join('"{}"{}'.format(' '.join(words), '*' if prefix else '') for words, prefix in terms),
+    )
+
+
+def get_words_pattern(words, prefix):
+    """
+    Forms the regular expression of a term, matching its words as whole words next to each other, the same way as the
+    full-text index tokenises the text.
+    :param words: list of the words of the term
+    :param prefix: boolean, True if the last word is a prefix
+    :return: string of the regular expression
+    """
+    return r'(?<![^\W_]){words}{end}'.format(
+        words=r'[\W_]+'.join(re.escape(word) for word in words),
+        end='' if prefix else r'(?![^\W_])',
+    )
+
+
+def get_like_condition(table, fields, terms):
+    """
+    Forms the condition looking for the terms without the full-text index. The words of a term are looked for as whole
+    words next to each other (see get_words_pattern), as the full-text query does, so the same search finds the same
+    rows with or without the index. LIKE narrows the rows down before the words are checked.
+    :param table: name of the table searched
+    :param fields: list of the names of the fields
+    :param terms: list of the terms, see get_match_terms
+    :return: condition string and the list of its values
+    """
+    conditions = []
+    values = []
+
+    for words, prefix in terms:
+        conditions.append('({})'.format(' OR '.join(
+            '({table}.{field} LIKE ? AND match_words({table}.{field}, ?))'.format(table=table, field=field)
+            for field in fields
+        )))
+
+        for _ in fields:
+            values.extend(['%{}%'.format('%'.join(words)), get_words_pattern(words, prefix)])
+
+    return '({})'.format(' AND '.join(conditions)), values
+
+
+def _get_row_hash(row):
+    """
+    Finds a checksum of the indexed fields of a row, to notice the rows changed since they were indexed.
+    :param row: tuple of the values of the fields
+    :return: integer checksum
+    """
+    return zlib.crc32('\x00'.join('' if value is None else str(value) for value in row).encode())
+
+
+def _get_rows_digest(row_hashes):
+    """
+    Finds the digest of the checksums of the rows of a table, in the order of their keys, to notice any change of the
+    indexed fields since the table was indexed.
+    :param row_hashes: iterable of the keys and the checksums of the rows, in the order of the keys
+    :return: string of the digest
+    """
+    digest = hashlib.sha1()
+
+    for row_id, row_hash in row_hashes:
+        digest.update('{}:{};'.format(row_id, row_hash).encode())
+
+    return digest.hexdigest()
+
+
+def get_table_digest(cursor, table, key, fields):
+    """
+    Finds the digest of the indexed fields of a table in the GLEAM-X database, see _get_rows_digest.
+    :param cursor: cursor of the GLEAM-X database
+    :param table: name of the table
+    :param key: name of the unique integer field of the table
+    :param fields: list of the names of the text fields
+    :return: string of the digest
+    """
+    cursor.execute('SELECT {key}, {fields} FROM {table} ORDER BY {key}'.format(
+        key=key,
+        fields=', '.join(fields),
+        table=table,
+    ))
+
+    def _get_row_hashes():
+        rows = cursor.fetchmany(INDEX_BATCH_SIZE)
+
+        while rows:
+            for row in rows:
+                yield row[0], _get_row_hash(row[1:])
+
+            rows = cursor.fetchmany(INDEX_BATCH_SIZE)
+
+    return _get_rows_digest(_get_row_hashes())
+
+
+def _update_table_index(conn, table, key, fields, database_version):
+    """
+    Brings the full-text index of a table up to date with the GLEAM-X database. Only the rows added, changed or removed
+    since the last update are written. The digest of the indexed rows and the version of the GLEAM-X database are
+    kept, to tell whether the index is current when it is searched.
+    :param conn: connection to the index file
+    :param table: name of the table
+    :param key: name of the unique integer field of the table, used as the row id of the index
+    :param fields: list of the names of the text fields
+    :param database_version: version of the GLEAM-X database found before its rows are read
+    :return: numbers of the rows indexed and removed
+    """
+    row = conn.execute('SELECT key, fields FROM indexed_table WHERE name = ?', [table]).fetchone()
+
+    # the index is made again if the fields of the table have changed
+    if row is not None and (row[0], json.loads(row[1])) != (key, fields):
+        conn.execute('DROP TABLE {}_text'.format(table))
+        conn.execute('DROP TABLE {}_text_hash'.format(table))
+        row = None
+
+    if row is None:
+        conn.execute("CREATE VIRTUAL TABLE {table}_text USING fts5({fields}, prefix='2 3')".format(
+            table=table,
+            fields=', '.join(fields),
+        ))
+        conn.execute('CREATE TABLE {}_text_hash (id INTEGER PRIMARY KEY, hash INTEGER)'.format(table))
+
+    row_hashes = dict(conn.execute('SELECT id, hash FROM {}_text_hash'.format(table)).fetchall())
+
+    indexed = 0
+
+    with gleam_cursor() as cursor:
+        cursor.execute('SELECT {key}, {fields} FROM {table}'.format(key=key, fields=', '.join(fields), table=table))
+
+        rows = cursor.fetchmany(INDEX_BATCH_SIZE)
+
+        while rows:
+            for row in rows:
+                row_id, row_hash = row[0], _get_row_hash(row[1:])
+
+                if row_hashes.pop(row_id, None) == row_hash:
+                    continue
+
+                conn.execute('DELETE FROM {}_text WHERE rowid = ?'.format(table), [row_id])
+                conn.execute('INSERT INTO {table}_text (rowid, {fields}) VALUES (?, {placeholders})'.format(
+                    table=table,
+                    fields=', '.join(fields),
+                    placeholders=', '.join('?' * len(fields)),
+                ), row)
+                conn.execute('INSERT OR REPLACE INTO {}_text_hash VALUES (?, ?)'.format(table), [row_id, row_hash])
+                indexed += 1
+
+            rows = cursor.fetchmany(INDEX_BATCH_SIZE)
+
+    # the rows left have been removed from the table
+    for row_id in row_hashes:
+        conn.execute('DELETE FROM {}_text WHERE rowid = ?'.format(table), [row_id])
+        conn.execute('DELETE FROM {}_text_hash WHERE id = ?'.format(table), [row_id])
+
+    digest = _get_rows_digest(conn.execute('SELECT id, hash FROM {}_text_hash ORDER BY id'.format(table)))
+
+    conn.execute(
+        'INSERT OR REPLACE INTO indexed_table VALUES (?, ?, ?, ?, ?)',
+        [table, key, json.dumps(fields), digest, database_version],
+    )
+
+    return indexed, len(row_hashes)
+
+
+def update_text_index(index_path, sources, rebuild=False):
+    """
+    Builds or updates the full-text index of the text fields in a file next to the GLEAM-X database, which itself is
+    never modified. A new index is built under a temporary name and then moved over the old one, an existing index is
+    updated in place in a single transaction.
+    :param index_path: path of the full-text index file
+    :param sources: dictionary of the tables to index, each with the key and the list of the text fields to index
+    :param rebuild: boolean to build the index from scratch instead of updating it
+    :return: dictionary of the numbers of the rows indexed and removed for each table
+    """
+    rebuild = rebuild or not os.path.exists(index_path)
+
+    # an index of another layout is built again
+    if not rebuild:
+        conn = sqlite3.connect(index_path)
+
+        try:
+            rebuild = conn.execute('PRAGMA user_version').fetchone()[0] != TEXT_INDEX_FORMAT
+        finally:
+            conn.close()
+
+    # the version is found before the rows are read, so that a change in between makes it older than the rows rather
+    # than newer
+    database_version = get_database_version()
+
+    write_path = index_path
+
+    if rebuild:
+        file_descriptor, write_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(index_path)), suffix='.tmp')
+        os.close(file_descriptor)
+
+    results = dict()
+
+    try:
+        conn = sqlite3.connect(write_path)
+
+        try:
+            conn.execute('PRAGMA user_version = {}'.format(TEXT_INDEX_FORMAT))
+            conn.execute('CREATE TABLE IF NOT EXISTS indexed_table (name TEXT PRIMARY KEY, key TEXT, fields TEXT, '
+                         'digest TEXT, database_version TEXT)')
+
+            for table, source in sorted(sources.items()):
+                results[table] = _update_table_index(
+                    conn,
+                    table,
+                    source.get('key'),
+                    source.get('fields'),
+                    database_version,
+                )
+
+            # removing the tables that are not searched any more
+            for row in conn.execute('SELECT name FROM indexed_table').fetchall():
+                if row[0] not in sources:
+                    conn.execute('DROP TABLE {}_text'.format(row[0]))
+                    conn.execute('DROP TABLE {}_text_hash'.format(row[0]))
+                    conn.execute('DELETE FROM indexed_table WHERE name = ?', [row[0]])
+
+            conn.commit()
+        finally:
+            conn.close()
+
+        if rebuild:
+            os.replace(write_path, index_path)
+    except (OSError, sqlite3.Error):
+        if rebuild and os.path.exists(write_path):
+            os.remove(write_path)
+        raise
+
+    return results
+
+
+def get_text_index_tables():
+    """
+    Finds the tables in the full-text index along with their indexed fields. The answer is cached for the version of
+    the index file.
+    :return: dictionary of the key, the list of the fields, the digest of the rows and the version of the GLEAM-X
+    database indexed for each table
+    """
+    try:
+        stat = os.stat(settings.GLEAM_TEXT_INDEX_PATH)
+    except OSError:
+        return dict()
+
+    cache_key = 'text_index_tables_{}'.format(
+        '-'.join(str(part) for part in [stat.st_ino, stat.st_size, stat.st_mtime_ns]),
+    )
+
+    tables = cache.get(cache_key)
+
+    if tables is None:
+        tables = dict()
+
+        try:
+            with gleam_cursor() as cursor:
+                if TEXT_INDEX_SCHEMA in [row[1] for row in cursor.execute('PRAGMA database_list')]:
+                    rows = cursor.execute(
+                        'SELECT name, key, fields, digest, database_version FROM {}.indexed_table'.format(
+                            TEXT_INDEX_SCHEMA,
+                        ),
+                    ).fetchall()
+
+                    for name, key, fields, digest, database_version in rows:
+                        tables[name] = dict(
+                            key=key,
+                            fields=json.loads(fields),
+                            digest=digest,
+                            database_version=database_version,
+                        )
+        except sqlite3.Error:
+            return dict()
+
+        cache.set(cache_key, tables)
+
+    return tables
+
+
+def is_text_index_current(table, indexed_table):
+    """
+    Checks whether the full-text index of a table has been built from the current text of its rows, the same way as
+    is_spatial_index_current does for the positions. The index is current without reading the rows while the GLEAM-X
+    database is the one it was built from, otherwise the digest of the rows is compared. The text of the processing
+    jobs changes after they are added (ex: their logs), so a row indexed earlier may not be found by its current text.
+    The answer is cached for the version of the GLEAM-X database and the digest of the index.
+    :param table: name of the table
+    :param indexed_table: dictionary of the table in the index, see get_text_index_tables
+    :return: True if the index of the table can be used, False otherwise
+    """
+    database_version = get_database_version()
+
+    if indexed_table.get('database_version') == database_version:
+        return True
+
+    cache_key = 'text_index_current_{}'.format('-'.join([table, indexed_table.get('digest'), database_version]))
+
+    is_current = cache.get(cache_key)
+
+    if is_current is None:
+        try:
+            with gleam_cursor() as cursor:
+                is_current = indexed_table.get('digest') == get_table_digest(
+                    cursor,
+                    table,
+                    indexed_table.get('key'),
+                    indexed_table.get('fields'),
+                )
+        except sqlite3.Error:
+            return False
+
+        cache.set(cache_key, is_current)
+
+    return is_current
+
+
+def get_full_text_condition(table, fields, text):
+    """
+    Forms the condition of a full-text search. The rows are found with MATCH if the full-text index of the table is
+    current, otherwise they are looked for word by word without it (see get_like_condition), which finds the same rows.
+    :param table: name of the table searched
+    :param fields: list of the names of the fields
+    :param text: text of the input, see get_match_terms
+    :return: condition string and the list of its values, None and None if the text has no terms
+    """
+    terms = get_match_terms(text)
+
+    if not terms:
+        return None, None
+
+    indexed_table = get_text_index_tables().get(table)
+
+    if not indexed_table or not set(fields) <= set(indexed_table.get('fields')) \
+            or not is_text_index_current(table, indexed_table):
+        return get_like_condition(table, fields, terms)
+
+    condition = '({table}.{key} IN (SELECT rowid FROM {schema}.{table}_text WHERE {table}_text MATCH ?))'.format(
+        table=table,
+        key=indexed_table.get('key'),
+        schema=TEXT_INDEX_SCHEMA,
+    )
+
+    return condition, [get_match_query(fields, terms)]
@@ -0,0 +1,334 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+from django.conf import settings
+from django.templatetags.static import static
+
+from .plots import (
+    get_plot_file_names,
+    get_plots_directory,
+)
+
+logger = logging.getLogger(__name__)
+
+# formats of the thumbnails, the browsers not supporting the first one take the second one
+WEBP = 'webp'
+PNG = 'png'
+
+THUMBNAIL_FORMATS = (WEBP, PNG, )
+
+# options for saving the thumbnails in each format
+THUMBNAIL_SAVE_OPTIONS = {
+    WEBP: dict(format='WEBP', quality=80, method=4),
+    PNG: dict(format='PNG', optimize=True),
+}
+
+# width of the images on the observation page relative to the width of the browser, for the browser to choose among
+# the thumbnails: half of it from the medium sized screens, all of it below
+THUMBNAIL_SIZES = '(min-width: 768px) 50vw, 100vw'
+
+# name of the file describing the thumbnails of an observation
+THUMBNAIL_MANIFEST_NAME = 'thumbnails.json'
+
+
+def get_thumbnails_directory(observation_id):
+    """
+    Constructs the path of the directory of the thumbnails of an observation.
+    :param observation_id: observation id
+    :return: path of the directory
+    """
+    return os.path.join(settings.THUMBNAILS_PATH, str(observation_id))
+
+
+def get_thumbnail_name(file_name, modified_time, width, image_format):
+    """
+    Constructs the name of a thumbnail of a plot image. The name contains the modification time of the image, so that
+    a thumbnail kept by a browser is never shown for a newer image.
+    :param file_name: name of the plot image
+    :param modified_time: modification time of the plot image in nanoseconds
+    :param width: width of the thumbnail in pixels
+    :param image_format: format of the thumbnail, one of THUMBNAIL_FORMATS
+    :return: name of the thumbnail, ex: 'a_amp_320w_16d6f7a1c2e.webp'
+    """
+    return '{name}_{width}w_{version:x}.{extension}'.format(
+        name=os.path.splitext(file_name)[0],
+        width=width,
+        version=modified_time // 10 ** 6,
+        extension=image_format,
+    )
+
+
+def read_thumbnail_manifest(observation_id):
+    """
+    Reads the manifest of the thumbnails of an observation.
+    :param observation_id: observation id
+    :return: dictionary of the modification time, the width and the widths of the thumbnails of each plot image, empty
+    if there are no thumbnails
+    """
+    try:
+        with open(os.path.join(get_thumbnails_directory(observation_id), THUMBNAIL_MANIFEST_NAME)) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return dict()
+
+
+def _write_thumbnail_manifest(observation_id, manifest):
+    """
+    Writes the manifest of the thumbnails of an observation, to a temporary file first so that the observation page
+    never reads a partially written one.
+    :param observation_id: observation id
+    :param manifest: dictionary of the thumbnails of each plot image, see read_thumbnail_manifest
+    """
+    file_path = os.path.join(get_thumbnails_directory(observation_id), THUMBNAIL_MANIFEST_NAME)
+
+    with open(file_path + '.tmp', 'w') as manifest_file:
+        json.dump(manifest, manifest_file, sort_keys=True)
+
+    os.replace(file_path + '.tmp', file_path)
+
+
+def render_thumbnails(task):
+    """
+    Renders the thumbnails of a plot image in every format, for each width smaller than the image. This is the unit of
+    work given to the worker processes, therefore, it does not use the application database.
+    :param task: dictionary of the path of the image, the directory of the thumbnails, the widths and the names of the
+    thumbnails of each width and format
+    :return: width of the image and the list of the widths of the thumbnails rendered, None if the image could not be
+    read (ex: a truncated file) or a thumbnail could not be written
+    """
+    try:
+        with Image.open(task.get('source_path')) as image:
+            image.load()
+
+            # the palette images are converted for the resampling to blend their colours
+            if image.mode not in ('RGB', 'RGBA', 'L', ):
+                image = image.convert('RGBA')
+
+            widths = []
+
+            for width in task.get('widths'):
+                if width >= image.width:
+                    continue
+
+                thumbnail = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+
+                for image_format in THUMBNAIL_FORMATS:
+                    file_path = os.path.join(task.get('directory'), task.get('names').get(width).get(image_format))
+
+                    thumbnail.save(file_path + '.tmp', **THUMBNAIL_SAVE_OPTIONS.get(image_format))
+                    os.replace(file_path + '.tmp', file_path)
+
+                widths.append(width)
+
+            return image.width, widths
+    except OSError as ex:
+        logger.warning('Could not render the thumbnails of {} : {}'.format(task.get('source_path'), ex))
+
+        # removing the thumbnail being written
+        for names in task.get('names').values():
+            for name in names.values():
+                try:
+                    os.remove(os.path.join(task.get('directory'), name + '.tmp'))
+                except OSError:
+                    pass
+
+        return None
+
+
+def _remove_thumbnails(directory, file_name, entry, new_entry=None):
+    """
+    Removes the thumbnails of a plot image listed in the manifest.
+    :param directory: directory of the thumbnails
+    :param file_name: name of the plot image
+    :param entry: entry of the plot image in the manifest
+    :param new_entry: new entry of the plot image, its thumbnails are kept
+    """
+    kept_names = set()
+
+    if new_entry is not None:
+        kept_names = set(
+            get_thumbnail_name(file_name, new_entry.get('modified_time'), width, image_format)
+            for width in new_entry.get('widths') for image_format in THUMBNAIL_FORMATS
+        )
+
+    for width in entry.get('widths'):
+        for image_format in THUMBNAIL_FORMATS:
+            name = get_thumbnail_name(file_name, entry.get('modified_time'), width, image_format)
+
+            if name in kept_names:
+                continue
+
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def generate_thumbnails(observation_ids=None, force=False, workers=1):
+    """
+    Generates the thumbnails of the plot images of the observations in THUMBNAIL_WIDTHS of the settings. The thumbnails
+    are kept until their image changes, only the images added or modified since the last time are rendered, unless
+    forced. The thumbnails of the images that have been removed are removed as well.
+    The images are rendered in a pool of worker processes if more than one worker is requested. The manifest of an
+    observation is written once all of its thumbnails are rendered, so the observation page only refers to the
+    thumbnails that exist. An image that can not be rendered is left out of the manifest and tried again next time.
+    :param observation_ids: list of the observation ids, all the observations with a directory of plot images if not
+    given
+    :param force: boolean to render the thumbnails even if the images have not changed
+    :param workers: number of processes rendering the thumbnails
+    :return: numbers of the images rendered, unchanged, removed and skipped because they could not be rendered
+    """
+    if observation_ids is None:
+        try:
+            with os.scandir(settings.PLOTS_PATH) as entries:
+                observation_ids = sorted(entry.name for entry in entries if entry.is_dir())
+        except OSError:
+            observation_ids = []
+
+    widths = sorted(settings.THUMBNAIL_WIDTHS)
+
+    manifests = dict()
+    tasks = []
+    unchanged = 0
+    removed = 0
+
+    for observation_id in observation_ids:
+        manifest = read_thumbnail_manifest(observation_id)
+        manifests[str(observation_id)] = manifest
+
+        directory = get_thumbnails_directory(observation_id)
+        file_names = get_plot_file_names(observation_id)
+
+        for file_name in file_names:
+            try:
+                modified_time = os.stat(os.path.join(get_plots_directory(observation_id), file_name)).st_mtime_ns
+            except OSError:
+                continue
+
+            entry = manifest.get(file_name)
+
+            if not force and entry is not None and entry.get('modified_time') == modified_time \
+                    and entry.get('requested_widths') == widths:
+                unchanged += 1
+                continue
+
+            tasks.append(dict(
+                observation_id=str(observation_id),
+                file_name=file_name,
+                modified_time=modified_time,
+                source_path=os.path.join(get_plots_directory(observation_id), file_name),
+                directory=directory,
+                widths=widths,
+                names={
+                    width: {
+                        image_format: get_thumbnail_name(file_name, modified_time, width, image_format)
+                        for image_format in THUMBNAIL_FORMATS
+                    } for width in widths
+                },
+            ))
+
+        # the thumbnails of the images that have been removed
+        for file_name in set(manifest) - set(file_names):
+            _remove_thumbnails(directory, file_name, manifest.pop(file_name))
+            removed += 1
+
+    for directory in set(task.get('directory') for task in tasks):
+        os.makedirs(directory, exist_ok=True)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(render_thumbnails, tasks))
+    else:
+        results = [render_thumbnails(task) for task in tasks]
+
+    skipped = 0
+
+    for task, result in zip(tasks, results):
+        manifest = manifests.get(task.get('observation_id'))
+        file_name = task.get('file_name')
+
+        # the image keeps its previous thumbnails, if any, the ones rendered before the failure are removed
+        if result is None:
+            _remove_thumbnails(
+                task.get('directory'),
+                file_name,
+                dict(modified_time=task.get('modified_time'), widths=task.get('widths')),
+                manifest.get(file_name),
+            )
+            skipped += 1
+            continue
+
+        width, thumbnail_widths = result
+
+        entry = dict(
+            modified_time=task.get('modified_time'),
+            width=width,
+            widths=thumbnail_widths,
+            requested_widths=task.get('widths'),
+        )
+
+        # the thumbnails of the previous version of the image or of the widths no longer requested
+        if file_name in manifest:
+            _remove_thumbnails(task.get('directory'), file_name, manifest.get(file_name), entry)
+
+        manifest[file_name] = entry
+
+    for observation_id, manifest in manifests.items():
+        if os.path.isdir(get_thumbnails_directory(observation_id)):
+            _write_thumbnail_manifest(observation_id, manifest)
+
+    return len(tasks) - skipped, unchanged, removed, skipped
+
+
+def get_responsive_image(file_path, manifest):
+    """
+    Finds the urls of a plot image and its thumbnails for the observation page. The browser chooses the thumbnail
+    matching the width the image is shown at from the srcset, and only loads the full image when it is not smaller.
+    :param file_path: path of the plot image relative to the static files, see classify_plot_files
+    :param manifest: manifest of the thumbnails of the observation, see read_thumbnail_manifest
+    :return: dictionary of the name and url of the image, the url of its smallest thumbnail and the srcsets of each
+    format, None if there is no image
+    """
+    if file_path is None:
+        return None
+
+    observation_id, file_name = file_path.split('/')[-2:]
+    entry = manifest.get(file_name)
+
+    image = dict(
+        name=file_name,
+        src=static(file_path),
+        sizes=THUMBNAIL_SIZES,
+    )
+
+    if not entry or not entry.get('widths'):
+        return image
+
+    for image_format in THUMBNAIL_FORMATS:
+        srcset = [
+            '{url} {width}w'.format(
+                url=static('/'.join([
+                    'images',
+                    'thumbnails',
+                    observation_id,
+                    get_thumbnail_name(file_name, entry.get('modified_time'), width, image_format),
+                ])),
+                width=width,
+            ) for width in entry.get('widths')
+        ]
+
+        image['srcset_{}'.format(image_format)] = ', '.join(
+            srcset + ['{url} {width}w'.format(url=image.get('src'), width=entry.get('width'))],
+        )
+
+        if image_format == PNG:
+            image['thumbnail'] = srcset[0].rsplit(' ', 1)[0]
+
+    return image
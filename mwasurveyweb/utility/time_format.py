@@ -0,0 +1,110 @@
+"""
+Distributed under the MIT License. See LICENSE.txt for more info.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pytz
+
+# time zone the unix times of the processing jobs are shown in
+DISPLAY_TIME_ZONE = 'Australia/Perth'
+
+# unix time epoch as a naive UTC datetime, the transition times of pytz are naive UTC datetimes
+_UNIX_EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=None)
+def get_time_zone(zone_name):
+    """
+    Finds a time zone object, looked up only once for each name.
+    :param zone_name: name of the time zone, ex: 'Australia/Perth'
+    :return: pytz time zone object
+    """
+    return pytz.timezone(zone_name)
+
+
+@lru_cache(maxsize=None)
+def _get_time_zone_arrays(zone_name):
+    """
+    Converts the transitions of a time zone to arrays for vectorised lookups. pytz only exposes them as the attributes
+    of the zones with transitions, the zones without them have a single offset.
+    :param zone_name: name of the time zone
+    :return: dictionary of the transition times in unix seconds, the UTC offsets in seconds and the abbreviations in
+    effect from each transition
+    """
+    zone = get_time_zone(zone_name)
+
+    transition_times = getattr(zone, '_utc_transition_times', None)
+
+    if transition_times:
+        transition_info = zone._transition_info
+    else:
+        transition_times = [datetime.min]
+        transition_info = [(zone.utcoffset(_UNIX_EPOCH), None, zone.tzname(_UNIX_EPOCH))]
+
+    return dict(
+        times=np.array([(time - _UNIX_EPOCH).total_seconds() for time in transition_times], dtype=np.int64),
+        offsets=np.array([info[0].total_seconds() for info in transition_info], dtype=np.int64),
+        abbreviations=[info[2] for info in transition_info],
+    )
+
+
+def format_unix_times(unix_times, zone_name=DISPLAY_TIME_ZONE):
+    """
+    Formats a list of unix times as local times of a time zone in one pass. The UTC offset in effect at each time is
+    found using np.searchsorted over the transitions of the zone, which gives the same times as converting them one by
+    one with pytz.
+    :param unix_times: list of unix times, numbers or text
+    :param zone_name: name of the time zone, DISPLAY_TIME_ZONE if not given
+    :return: list of strings in the format 'DD/MM/YYYY HH:MM:SS (Zone)', ex: '10/01/2008 05:20:00 (AWST)'
+    """
+    if not len(unix_times):
+        return []
+
+    time_zone_arrays = _get_time_zone_arrays(zone_name)
+
+    seconds = np.floor(np.array(unix_times, dtype=np.float64).reshape(-1)).astype(np.int64)
+
+    # finding the transition in effect for each of the times
+    indices = np.maximum(np.searchsorted(time_zone_arrays.get('times'), seconds, side='right') - 1, 0)
+
+    local_times = np.datetime_as_string(
+        (seconds + time_zone_arrays.get('offsets')[indices]).astype('datetime64[s]'),
+        unit='s',
+    ).tolist()
+
+    abbreviations = time_zone_arrays.get('abbreviations')
+
+    # local times are 'YYYY-MM-DDTHH:MM:SS'
+    return [
+        '{day}/{month}/{year} {time} ({zone})'.format(
+            day=local_time[8:10],
+            month=local_time[5:7],
+            year=local_time[0:4],
+            time=local_time[11:],
+            zone=abbreviations[index],
+        ) for local_time, index in zip(local_times, indices.tolist())
+    ]
+
+
+def format_unix_time_fields(rows, fields, zone_name=DISPLAY_TIME_ZONE):
+    """
+    Formats the unix time fields of a list of rows in place, the times of each field in one pass. The empty times are
+    left as they are.
+    :param rows: list of dictionaries of the rows
+    :param fields: list of the names of the unix time fields
+    :param zone_name: name of the time zone, DISPLAY_TIME_ZONE if not given
+    :return: list of the rows
+    """
+    for field in fields:
+        rows_with_time = [row for row in rows if row.get(field)]
+
+        for row, formatted_time in zip(
+                rows_with_time,
+                format_unix_times([row.get(field) for row in rows_with_time], zone_name),
+        ):
+            row[field] = formatted_time
+
+    return rows
@@ -2,16 +2,32 @@
 Distributed under the MIT License. See LICENSE.txt for more info.
 """
 
+import hashlib
+import json
 import sqlite3
+import numpy as np
 import pytz
 
+from urllib.parse import urlencode
+
 from django.conf import settings
+from django.core.cache import caches
 from datetime import datetime, date, time, timedelta
 
 from thirdparty import leapseconds
 
+from .database import (
+    gleam_cursor,
+    get_database_version,
+)
 from .. import constants
 
+# seconds of the gps time epoch (1980-01-06 00:00:00 UTC) since the unix time epoch
+GPS_EPOCH_UNIX_TIME = 315964800
+
+# leap second transition arrays of the leap seconds table they are computed for, see _get_leap_second_arrays
+_leap_second_arrays = (None, None)
+
 
 def dict_factory(cursor, row):
     """
@@ -75,6 +91,85 @@ def update_display_headers_order_by(display_headers, order_by):
     return display_headers
 
 
+def get_keyset_condition(sort_field, direction, tie_breaker, key):
+    """
+    Constructs the condition to seek past a row for keyset pagination. Rows are ordered by the sort field and then by
+    the tie-breaker (a unique field), so the position of a row is defined by the values of those two fields. SQLite puts
+    NULL values first in ascending order (and last in descending order), this is taken care of here.
+    :param sort_field: name of the field the results are ordered by
+    :param direction: 'ASC' or 'DESC'
+    :param tie_breaker: name of the unique field used to order the rows with the same sort field value
+    :param key: list of the sort field value and the tie-breaker value of the row to seek past
+    :return: condition string and list of values for the condition
+    """
+    sort_value, tie_value = key
+    operator = '>' if direction == 'ASC' else '<'
+
+    if sort_field == tie_breaker:
+        return '{tie_breaker} {operator} ?'.format(tie_breaker=tie_breaker, operator=operator), [tie_value]
+
+    if sort_value is None:
+        if direction == 'ASC':
+            condition = '(({sort_field} IS NULL AND {tie_breaker} > ?) OR {sort_field} IS NOT NULL)'
+        else:
+            condition = '({sort_field} IS NULL AND {tie_breaker} < ?)'
+
+        return condition.format(sort_field=sort_field, tie_breaker=tie_breaker), [tie_value]
+
+    if direction == 'ASC':
+        condition = '({sort_field}, {tie_breaker}) > (?, ?)'
+    else:
+        condition = '(({sort_field}, {tie_breaker}) < (?, ?) OR {sort_field} IS NULL)'
+
+    return condition.format(sort_field=sort_field, tie_breaker=tie_breaker), [sort_value, tie_value]
+
+
+def get_page_query(query, order_by, tie_breaker, limit, offset=0, key=None, reverse=False):
+    """
+    Wraps the search query to retrieve a single page of the results. If the key of a neighbouring row is known, the
+    page is found by seeking past that row (keyset pagination) instead of skipping all the rows before it. The sort
+    field value and the tie-breaker value are appended to each row so that the keys of a page can be remembered.
+    :param query: search query string without the ORDER BY and LIMIT clauses
+    :param order_by: String that defines the ORDER BY of the query. Format: ' ORDER BY column_name ASC/DESC'
+    :param tie_breaker: name of the unique field used to order the rows with the same sort field value
+    :param limit: number of rows in the page
+    :param offset: number of rows to skip after the seek position
+    :param key: list of the sort field value and the tie-breaker value of the row to seek past, None to start from the
+    beginning (or the end if reversed) of the results
+    :param reverse: boolean to retrieve the rows in the reverse order, used to seek backward
+    :return: page query string and list of values to be appended to the query values
+    """
+    sort_field, direction = get_order_by_parts(order_by)
+
+    if reverse:
+        direction = 'DESC' if direction == 'ASC' else 'ASC'
+
+    condition = ''
+    values = []
+
+    if key:
+        condition, values = get_keyset_condition(sort_field, direction, tie_breaker, key)
+        condition = ' WHERE ' + condition
+
+    order_by_page = ' ORDER BY {sort_field} {direction}'.format(sort_field=sort_field, direction=direction)
+
+    if sort_field != tie_breaker:
+        order_by_page += ', {tie_breaker} {direction}'.format(tie_breaker=tie_breaker, direction=direction)
+
+    page_query = 'SELECT *, {sort_field}, {tie_breaker} FROM ({query}) page{condition}{order_by} ' \
+                 'LIMIT {limit} OFFSET {offset}'.format(
+                     sort_field=sort_field,
+                     tie_breaker=tie_breaker,
+                     query=query,
+                     condition=condition,
+                     order_by=order_by_page,
+                     limit=int(limit),
+                     offset=int(offset),
+                 )
+
+    return page_query, values
+
+
 def get_unix_time_from_date(date_object):
     """
     Finds the unix timestamp from a date string
@@ -142,6 +237,141 @@ def get_date_from_gps_time(gps_time):
     return date_object
 
 
+def _get_leap_second_arrays():
+    """
+    Converts the leap seconds table (loaded once by the leapseconds library) to arrays for vectorised lookups. The
+    arrays are computed again only if the table has been reloaded.
+    :return: dictionary of the transition times in unix seconds in UTC and in TAI, and the TAI - UTC differences
+    """
+    global _leap_second_arrays
+
+    table = leapseconds.leapseconds_table()
+
+    if _leap_second_arrays[0] is not table:
+
+        # leaving out the sentinel (datetime.max) at the end of the table
+        leap_seconds = table.leapseconds[:-1]
+
+        utc_times = np.array([ls.utc for ls in leap_seconds], dtype='datetime64[s]').astype(np.int64)
+        differences = np.array([ls.dTAI_UTC.total_seconds() for ls in leap_seconds], dtype=np.int64)
+
+        _leap_second_arrays = (
+            table,
+            dict(
+                utc_times=utc_times,
+                tai_times=utc_times + differences,
+                differences=differences,
+            ),
+        )
+
+    return _leap_second_arrays[1]
+
+
+def get_dates_from_gps_times(gps_times, as_string=False):
+    """
+    Vectorised version of get_date_from_gps_time, finds the UTC dates of an array (or list) of gps times in one pass.
+    The leap seconds are applied using np.searchsorted over the leap seconds table.
+    :param gps_times: array or list of gps times, text or numbers. None or dates before 1972 are converted to NaT
+    :param as_string: boolean to return the dates as strings in the format 'YYYY-MM-DD HH:MM:SS' ('' for NaT)
+    :return: numpy array of datetime64[s] or of strings
+    """
+    try:
+        gps_times = np.array(gps_times, dtype=np.float64).reshape(-1)
+    except (TypeError, ValueError):
+        # falling back to the element wise conversion if there are unexpected values
+        gps_times = np.array(
+            [get_gps_time_as_number(gps_time) for gps_time in gps_times],
+            dtype=np.float64,
+        ).reshape(-1)
+
+    leap_second_arrays = _get_leap_second_arrays()
+
+    valid = np.isfinite(gps_times)
+
+    # gps time is 19 seconds behind TAI
+    tai_times = np.floor(np.where(valid, gps_times, 0)).astype(np.int64) + GPS_EPOCH_UNIX_TIME + 19
+
+    # finding the TAI - UTC difference in effect for each of the times
+    indices = np.searchsorted(leap_second_arrays.get('tai_times'), tai_times, side='right') - 1
+    valid &= indices >= 0
+
+    dates = (tai_times - leap_second_arrays.get('differences')[np.maximum(indices, 0)]).astype('datetime64[s]')
+    dates[~valid] = np.datetime64('NaT')
+
+    if not as_string:
+        return dates
+
+    date_strings = np.char.replace(np.datetime_as_string(dates, unit='s'), 'T', ' ')
+    date_strings[~valid] = ''
+
+    return date_strings
+
+
+def get_gps_times_from_dates(dates):
+    """
+    Vectorised version of get_gps_time_from_date, finds the gps times of an array (or list) of UTC dates in one pass.
+    The leap seconds are applied using np.searchsorted over the leap seconds table.
+    :param dates: array or list of UTC dates, datetime64, datetime/date objects or ISO strings
+    :return: numpy array of gps times (int64)
+    """
+    utc_times = np.array(dates, dtype='datetime64[s]').reshape(-1)
+
+    if np.isnat(utc_times).any():
+        raise ValueError('Missing dates can not be converted to gps time')
+
+    utc_times = utc_times.astype(np.int64)
+
+    leap_second_arrays = _get_leap_second_arrays()
+
+    # finding the TAI - UTC difference in effect for each of the dates
+    indices = np.searchsorted(leap_second_arrays.get('utc_times'), utc_times, side='right') - 1
+
+    if (indices < 0).any():
+        raise ValueError('Dates before 1972-01-01 are not supported')
+
+    # gps time is 19 seconds behind TAI
+    return utc_times - GPS_EPOCH_UNIX_TIME + leap_second_arrays.get('differences')[indices] - 19
+
+
+def get_gps_time_as_number(gps_time):
+    """
+    Converts a gps time to a number, used where the vectorised conversion can not handle the values.
+    :param gps_time: gps time text/integer
+    :return: float of the gps time, nan if it is not a number
+    """
+    try:
+        return float(gps_time)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def get_display_rows(rows, display_headers):
+    """
+    Prepares the rows of the search results for display. Only the display columns are kept and each value is paired
+    with its UTC date if the column holds gps times, otherwise with None. The gps times are converted for the whole
+    column at once.
+    :param rows: list of result rows
+    :param display_headers: list of display headers, a header has gps_time set to True for gps time columns
+    :return: list of rows, each is a list of (value, UTC date string or None) pairs
+    """
+    display_rows = [row[:len(display_headers)] for row in rows]
+
+    if not display_rows:
+        return []
+
+    columns = []
+
+    for index, display_header in enumerate(display_headers):
+        values = [row[index] for row in display_rows]
+
+        if display_header.get('gps_time'):
+            columns.append(zip(values, get_dates_from_gps_times(values, as_string=True).tolist()))
+        else:
+            columns.append(zip(values, [None] * len(values)))
+
+    return [list(cells) for cells in zip(*columns)]
+
+
 def check_forms_validity(search_forms):
     """
     Checks validity of search forms.
@@ -157,6 +387,26 @@ def check_forms_validity(search_forms):
     return True
 
 
+def get_search_parameters(search_forms):
+    """
+    Finds the canonical encoding of the inputs of the search forms. Empty inputs are left out and the inputs are sorted
+    by name and value, so that the same search always has the same encoding whatever the order of the inputs.
+    :param search_forms: list of bound search forms
+    :return: url encoded string of the inputs
+    """
+    parameters = []
+
+    for search_form in search_forms:
+        form = search_form.get('form')
+
+        for name in form.fields:
+            parameters.extend(
+                (name, value.strip()) for value in form.data.getlist(name) if value and value.strip()
+            )
+
+    return urlencode(sorted(parameters))
+
+
 def get_operator_by_input_type(input_type, index=None, second_value=0):
     """
     calculate operator and field operator for an input type. Given: a query clause count(a.b) > c
@@ -235,31 +485,127 @@ def get_page_type(path_info):
             .replace('view_', '')
 
 
-def get_search_results(query, query_values):
+def get_filter_signature(table, conditions, values):
+    """
+    Finds a signature for the set of conditions of a search. The conditions are normalised by sorting them along with
+    their values, so that the same filters entered in a different order produce the same signature.
+    :param table: name of the table searched
+    :param conditions: list of condition strings, ex: '(observation.status = ?)'
+    :param values: list of values of the conditions, in order, a list of values for a condition having more than one
+    :return: string of the signature
+    """
+    conditions_values = sorted(zip(conditions, [repr(value) for value in values]))
+
+    return hashlib.sha1(json.dumps([table, conditions_values]).encode()).hexdigest()
+
+
+def _count_search_cache_access(name, hit):
+    """
+    Counts a hit or a miss of the search cache. The counters are kept in the cache itself, so that they are shared by
+    the processes that share the cache.
+    :param name: name of the cached item, ex: 'results' or 'total'
+    :param hit: boolean, True for a hit and False for a miss
+    """
+    search_cache = caches['search']
+    counter_key = 'search_cache_{name}_{access}'.format(name=name, access='hits' if hit else 'misses')
+
+    # add does nothing if the counter exists, this avoids the counter being reset by concurrent requests
+    search_cache.add(counter_key, 0, None)
+
+    try:
+        search_cache.incr(counter_key)
+    except ValueError:
+        # the counter has been evicted in the meantime
+        search_cache.set(counter_key, 1, None)
+
+
+def get_search_cache_statistics():
     """
-    Performs the query and returns the search result.
+    Reports the hit and miss counters of the search cache.
+    :return: dictionary of the counters for the result pages and the totals
+    """
+    search_cache = caches['search']
+
+    statistics = dict()
+
+    for name in ['results', 'total']:
+        for access in ['hits', 'misses']:
+            counter_key = 'search_cache_{name}_{access}'.format(name=name, access=access)
+            statistics.update({
+                '{name}_{access}'.format(name=name, access=access): search_cache.get(counter_key, 0),
+            })
+
+    return statistics
+
+
+def get_search_total(query_count, query_values, filter_signature):
+    """
+    Finds the total number of results of a search. The count is run once for a set of conditions and then cached
+    against the version of the GLEAM-X database, so that paging and sorting do not need to count again. A change of the
+    database file changes the cache key and hence invalidates the cached count.
+    :param query_count: The count query string
+    :param query_values: list of query values to replace the ?s in the count query string
+    :param filter_signature: signature of the conditions of the search, see get_filter_signature
+    :return: total number of results
+    """
+    search_cache = caches['search']
+
+    cache_key = 'search_total:{signature}:{version}'.format(
+        signature=filter_signature,
+        version=get_database_version(),
+    )
+
+    total = search_cache.get(cache_key)
+
+    _count_search_cache_access('total', hit=total is not None)
+
+    if total is None:
+        try:
+            with gleam_cursor() as cursor:
+                total = cursor.execute(query_count, query_values).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+        search_cache.set(cache_key, total)
+
+    return total
+
+
+def get_search_results(query, query_values, page_values=()):
+    """
+    Performs the query and returns the search result. Results are cached against the query (which includes the order,
+    limit and offset of the page), its values and the version of the GLEAM-X database, so that repeated searches do not
+    hit the database again until it changes.
     :param query: The query string
     :param query_values: list of query values to replace the ?s in the query string
+    :param page_values: list of values of the page (seek) condition, these are placed after the query values
     :return: list of search result
     """
-    try:
+    search_cache = caches['search']
+
+    values = list(query_values) + list(page_values)
 
-        conn = sqlite3.connect(settings.GLEAM_DATABASE_PATH)
+    cache_key = 'search_results:{query_hash}:{version}'.format(
+        query_hash=hashlib.sha1(json.dumps([query, [repr(value) for value in values]]).encode()).hexdigest(),
+        version=get_database_version(),
+    )
 
-        cursor = conn.cursor()
+    results = search_cache.get(cache_key)
 
-        # to handle subquery for total object count, values need to be duplicated in order
-        values = query_values + query_values
+    _count_search_cache_access('results', hit=results is not None)
 
-        results = cursor.execute(query, values).fetchall(),
+    if results is not None:
+        return results
+
+    try:
+
+        with gleam_cursor() as cursor:
+
+            results = cursor.execute(query, values).fetchall(),
 
     except sqlite3.Error:
         return [[]]
     else:
-
-        try:
-            conn.close()
-        except sqlite3.Error:
-            pass
+        search_cache.set(cache_key, results)
 
         return results
@@ -1,15 +1,25 @@
 """
 Distributed under the MIT License. See LICENSE.txt for more info.
 """
+import sqlite3
 import time
 
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_GET
 
 from ..models import (
     Colour,
-    SkyPlotsConfiguration,
     SkyPlot,
 )
+from ..utility.database import get_database_modified_time
+from ..utility.skyplots import (
+    BASE_IMAGE_NAME,
+    get_sky_coverage,
+    get_sky_coverage_etag,
+)
 
 
 def index(request):
@@ -19,11 +29,15 @@ def index(request):
     :return: Rendered template
     """
 
-    # finding the sky plots
-    sky_plots = SkyPlot.objects.all()
+    # finding the sky plots, the base image comes first and the colour layers are shown on top of it
+    sky_plots = sorted(
+        SkyPlot.objects.all(),
+        key=lambda sky_plot: (not sky_plot.name.endswith('/{}.png'.format(BASE_IMAGE_NAME)), sky_plot.name),
+    )
 
-    # finding the colours, this is to render the text according to the sky plot colours
-    colours = Colour.objects.all()
+    # finding the colours along with their sky plot configurations, this is to render the text according to the sky
+    # plot colours
+    colours = Colour.objects.all().prefetch_related('skyplotsconfiguration_set')
 
     # buttons to be rendered in the UI
     buttons = []
@@ -32,7 +46,7 @@ def index(request):
         labels = []
 
         # gettting the skyplot configurations for the colour
-        sky_plot_configurations = SkyPlotsConfiguration.objects.filter(colour=colour)
+        sky_plot_configurations = colour.skyplotsconfiguration_set.all()
 
         # generating button labels for the sky plot configuration
         for sky_plot_configuration in sky_plot_configurations:
@@ -60,6 +74,31 @@ def index(request):
     )
 
 
+@require_GET
+@gzip_page
+@condition(
+    etag_func=lambda request: get_sky_coverage_etag(),
+    last_modified_func=lambda request: get_database_modified_time(),
+)
+def sky_coverage(request):
+    """
+    Returns the coverage of the sky by the observations of each status as JSON, so that the landing page can draw and
+    toggle the statuses in the browser. The response carries an ETag and a Last-Modified date based on the GLEAM-X
+    database, so that browsers only download it again when the database changes.
+    :param request: Django request object.
+    :return: JSON response
+    """
+    try:
+        response = JsonResponse(get_sky_coverage())
+    except sqlite3.Error:
+        return JsonResponse({'error': 'The sky coverage is not available'}, status=503)
+
+    # browsers must check with the server whether the coverage has changed before using their copy
+    patch_cache_control(response, no_cache=True)
+
+    return response
+
+
 def about(request):
     """
     Render the about view.
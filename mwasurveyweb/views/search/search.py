@@ -2,129 +2,290 @@
 Distributed under the MIT License. See LICENSE.txt for more info.
 """
 
-import pickle
-import codecs
-import re
+import hashlib
+from urllib.parse import urlencode
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 
-from ...utility.paginator import Paginator
+from ...utility.paginator import (
+    Paginator,
+    get_page_plan,
+)
 from ...forms.search_parameter import SearchParameterForm
 from ...forms.search import SearchForm
-from ...utility.search import SearchQuery
+from ...utility.search import (
+    SearchQuery,
+    compile_search_query,
+)
+from ...utility.database import get_database_version
+from ...utility.schema import get_search_page_schema
+from ...utility.search_state import (
+    save_search_state,
+    get_search_state,
+)
+from ...utility.export import (
+    EXPORT_FORMATS,
+    stream_search_results,
+)
 from ...utility.utils import (
     get_search_results,
+    get_search_total,
+    get_page_query,
     get_page_type,
     update_display_headers_order_by,
     get_order_by_parts,
-)
-from ...models import (
-    SearchInputGroup,
-    SearchInput,
-    SearchPageInputGroup,
+    get_display_rows,
+    get_search_parameters,
 )
 
+# parameters of the search page that are not search inputs
+RESULTS_PARAMETERS = ['q', 'page', 'sort', 'export']
 
-def set_session_search_attributes(request, query, query_values, display_headers, order_by, limit):
+
+def set_session_search_state(request, state_id):
     """
-    Sets up search attributes in the session
+    Sets up the search state in the session. The keys of the visited pages are cleared, as they depend on the query and
+    its order.
     :param request: django request object
-    :param query: string representation of query
-    :param query_values: list of values to render the query
-    :param display_headers: list of search result display headers
-    :param order_by: string representing the order by clause
-    :param limit: limit clause
+    :param state_id: hash of the search state
     """
-    request.session['query'] = query
-    request.session['query_values'] = codecs.encode(pickle.dumps(query_values), "base64").decode()
-    request.session['display_headers'] = codecs.encode(pickle.dumps(display_headers), "base64").decode()
-    request.session['order_by'] = order_by
-    request.session['limit'] = limit
+    request.session['search_state'] = state_id
+    request.session['page_keys'] = dict()
 
 
-def reset_session_search_attributes(request):
+def reset_session_search_state(request):
     """
     Resets the session to None.
     :param request: django request object
     """
-    request.session['query'] = None
-    request.session['query_values'] = None
-    request.session['display_headers'] = None
-    request.session['order_by'] = None
-    request.session['limit'] = None
+    request.session['search_state'] = None
+    request.session['page_keys'] = None
+
+
+def get_first_page_url(form_type, state_id):
+    """
+    Finds the address of the first page of the results of a search state.
+    :param form_type: string defining the type of the search, ex: 'observation' or 'processing'
+    :param state_id: hash of the search state, it is encoded as it may come from the request
+    :return: address of the first page
+    """
+    return reverse('search_' + form_type) + '?' + urlencode([('q', state_id), ('page', 1)])
+
+
+def get_search_state_from_request(request, form_type):
+    """
+    Retrieves the search state referred to by the request, either by the q parameter or by the session.
+    :param request: django request object
+    :param form_type: string defining the type of the search, ex: 'observation' or 'processing'
+    :return: hash of the search state and dictionary of the search state
+    """
+    state_id = request.GET.get('q', None) or request.session.get('search_state')
+    state = get_search_state(state_id, form_type)
+
+    if not state:
+        raise KeyError(state_id)
+
+    # the keys of the visited pages belong to the search state in the session
+    if state_id != request.session.get('search_state'):
+        set_session_search_state(request, state_id)
+
+    return state_id, state
+
+
+def get_search_page(request, state, page):
+    """
+    Retrieves a page of the search results for a search state. Pages are retrieved using keyset pagination: the keys
+    (sort field and tie-breaker values) of the first and the last row of every visited page are kept in the session, so
+    that the next page is found by seeking past a known row rather than by skipping all the rows before it.
+    :param request: django request object
+    :param state: dictionary of the search state
+    :param page: number of the page, starting from 1
+    :return: search results of the page, display headers and the paginator
+    """
+    display_headers = state.get('display_headers')
+    limit = state.get('limit')
+    page_keys = request.session.get('page_keys') or dict()
+
+    # forming the conditions depending on the indexes with their current state
+    query, query_count, query_values = compile_search_query(
+        state.get('query'),
+        state.get('query_count'),
+        state.get('query_values'),
+    )
+
+    # the total is counted once for the conditions of the query, not for every page or order
+    total = get_search_total(query_count, query_values, state.get('filter_signature'))
+
+    # finding the cheapest way to reach the page and formulating the query for it
+    page_plan = get_page_plan(page, limit, total=total, page_keys=page_keys)
+    page_query, page_values = get_page_query(
+        query,
+        state.get('order_by'),
+        state.get('tie_breaker'),
+        limit=page_plan.get('limit'),
+        offset=page_plan.get('offset'),
+        key=page_plan.get('key'),
+        reverse=page_plan.get('reverse'),
+    )
+
+    rows = list(get_search_results(page_query, query_values, page_values))[0] if total else []
+
+    # rows of a backward seek come in the reverse order
+    if page_plan.get('reverse'):
+        rows = rows[::-1]
+
+    # each row ends with the sort field value and the tie-breaker value
+    if rows:
+        page_keys.update({
+            str(page): [list(rows[0][-2:]), list(rows[-1][-2:])],
+        })
+
+        request.session['page_keys'] = page_keys
+
+    # only the display columns are rendered, gps times along with their UTC dates
+    search_results = get_display_rows(rows, display_headers)
+
+    # getting the paginator
+    paginator = Paginator(start_index=(page - 1) * limit + 1, total=total, per_page=limit)
+
+    return search_results, display_headers, paginator
+
+
+def get_search_results_response(request, state_id, state, page, form_type):
+    """
+    Renders a page of the results of a search state. The page only depends on the search state, the page number, the
+    GLEAM-X database version and the user shown in the header, so it is not rendered again while the copy held by the
+    browser has the same ETag.
+    :param request: django request object
+    :param state_id: hash of the search state
+    :param state: dictionary of the search state
+    :param page: number of the page, starting from 1
+    :param form_type: string defining the type of the search, ex: 'observation' or 'processing'
+    :return: rendered page of the search results, or a not modified response
+    """
+    etag = quote_etag(
+        hashlib.sha1(
+            '{}:{}:{}:{}'.format(state_id, page, get_database_version(), request.user.pk).encode()
+        ).hexdigest()
+    )
+
+    response = get_conditional_response(request, etag=etag)
+
+    if response is None:
+
+        # retrieving search results for the page using the search state
+        search_results, display_headers, paginator = get_search_page(request, state, page)
+
+        response = render(
+            request,
+            "mwasurveyweb/search/search.html",
+            {
+                'search_forms': None,
+                'search_results': search_results,
+                'display_headers': display_headers,
+                'paginator': paginator,
+                'view_page_link': 'view_' + form_type,
+                'search_state_id': state_id,
+            }
+        )
 
+    # the page shows the user in the header, so it can only be kept by the browser
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=settings.SEARCH_RESULTS_MAX_AGE)
 
-def get_search_attributes_from_session(request):
+    return response
+
+
+def get_export_response(state, export_format, form_type):
     """
-    Retrieve the search attributes from the session and returns them.
-    :param request: django request attributes
-    :return: search attributes stored in the session
+    Streams all the results of a search state in the requested format. The rows are fetched from the database in
+    batches while the response is sent, so that neither the whole result set nor the whole file is held in memory.
+    :param state: dictionary of the search state
+    :param export_format: one of the keys of EXPORT_FORMATS
+    :param form_type: string defining the type of the search, ex: 'observation' or 'processing'
+    :return: streaming response with the content of the export as an attachment
     """
-    query = request.session['query']
-    query_values = pickle.loads(codecs.decode(request.session['query_values'].encode(), "base64"))
-    display_headers = pickle.loads(codecs.decode(request.session['display_headers'].encode(), "base64"))
-    order_by = request.session['order_by']
-    limit = request.session['limit']
+    query, _, query_values = compile_search_query(
+        state.get('query'),
+        state.get('query_count'),
+        state.get('query_values'),
+    )
 
-    return query, query_values, display_headers, order_by, limit
+    response = StreamingHttpResponse(
+        stream_search_results(
+            export_format,
+            query,
+            query_values,
+            state.get('order_by'),
+            state.get('tie_breaker'),
+            state.get('display_headers'),
+            form_type,
+        ),
+        content_type=EXPORT_FORMATS.get(export_format).get('content_type'),
+    )
+    response['Content-Disposition'] = 'attachment; filename="{}_search.{}"'.format(
+        form_type,
+        EXPORT_FORMATS.get(export_format).get('extension'),
+    )
 
+    return response
 
-def build_search_forms(request, form_type):
+
+def build_search_forms(request, form_type, data=None):
     """
     Builds the search forms based on the form type and request data if exists. For input fields, apart from the search
-    parameter form which is statically defined, this method queries the database and then uses dynamic form to build
-    forms.
+    parameter form which is statically defined, this method uses the compiled schema of the search page and then uses
+    dynamic form to build forms.
     :param request: django request object
     :param form_type: string defining the type of the form
+    :param data: submitted search inputs, the POST data of the request if not given, None for unbound forms
     :return: list containing search forms
     """
 
+    # the forms of a post request are bound to the posted inputs
+    if data is None and request.method == 'POST':
+        data = request.POST
+
     # generating search forms
     search_forms = [
         dict({
             'title': 'Search Parameters',
             'description': '',
             'form': SearchParameterForm(
-                request.POST,
+                data,
                 name='search_parameter',
-            ) if request.method == 'POST' else SearchParameterForm(
+            ) if data is not None else SearchParameterForm(
                 name='search_parameter',
             ),
         }),
     ]
 
-    # finding search input groups
-    input_groups = SearchInputGroup.objects.filter(Q(active=True), ) \
-        .order_by('display_order')
+    # finding the input groups of the search page from the compiled schema
+    search_page_schema = get_search_page_schema(form_type)
 
-    for input_group in input_groups:
-        # checking whether active search page input group is there for this input group.
-        if not SearchPageInputGroup.objects.filter(
-                search_page__name=form_type,
-                search_input_group=input_group,
-                active=True,
-        ) \
-                .exists():
-            continue
-
-        # checking whether any search input exists for the search input group
-        if not SearchInput.objects.filter(active=True, search_input_group=input_group).exists():
-            continue
+    for input_group in search_page_schema.get('groups'):
 
         # building up form for the input group and then appending in the search forms list.
         search_forms.append(
             dict({
-                'title': input_group.display_name,
-                'description': input_group.description,
+                'title': input_group.get('title'),
+                'description': input_group.get('description'),
                 'form': SearchForm(
-                    request.POST,
-                    name=input_group.name,
-                ) if request.method == 'POST' else SearchForm(
-                    name=input_group.name,
+                    data,
+                    name=input_group.get('name'),
+                    fieldsets=input_group.get('fieldsets'),
+                    field_properties=input_group.get('field_properties'),
+                ) if data is not None else SearchForm(
+                    name=input_group.get('name'),
+                    fieldsets=input_group.get('fieldsets'),
+                    field_properties=input_group.get('field_properties'),
                 ),
             })
         )
@@ -135,10 +296,11 @@ def build_search_forms(request, form_type):
 @login_required
 def search(request):
     """
-    Render the search view. Arguably the most important view of the project. For post request, it returns the search
-    results and sets the query parts in session so that these can be used later without going through the whole process
-    again. For get request, there must be a query set which then is used to search, otherwise, it just builds the forms
-    and displays those in the UI.
+    Render the search view. Arguably the most important view of the project. The search inputs have a canonical GET
+    encoding, a submitted search is redirected to it so that searches can be bookmarked and cached. For a search, it
+    stores the query parts as a search state, referred to by its hash in the session and in the links of the results
+    (q parameter), so that pagination, sorting and export can use it later without going through the whole process
+    again. Otherwise, it just builds the forms and displays those in the UI.
     :param request: Django request object.
     :return: Rendered template, either the search form or the result form
     """
@@ -146,10 +308,15 @@ def search(request):
     # getting the form type
     form_type = get_page_type(request.path_info)
 
-    # If the request is get, there are 3 possibilities at this moment:
+    # the submitted search inputs, if any
+    search_data = None
+
+    # If the request is get, there are 5 possibilities at this moment:
     # 1. pagination,
-    # 2. sorting, and
-    # 3. new form
+    # 2. sorting,
+    # 3. export,
+    # 4. search, and
+    # 5. new form
     if request.method == 'GET':
 
         # checking for pagination to happen
@@ -158,155 +325,127 @@ def search(request):
 
             # manually typing wrong page number will be barred.
             if page <= 0:
-                return redirect(reverse('search_' + form_type) + '?page=1')
+                return redirect(get_first_page_url(form_type, request.GET.get('q', '')))
         except (TypeError, ValueError):
             page = None
 
         # checking whether the request is for sorting
         sort = request.GET.get('sort', None)
 
-        # handling pagination here
-        if page:
+        # checking whether the request is for exporting the results
+        export_format = request.GET.get('export', None)
+
+        if page or sort or export_format in EXPORT_FORMATS:
 
             try:
+                # retrieving the search state referred to by the request
+                state_id, state = get_search_state_from_request(request, form_type)
 
-                # retrieve the previous query information that was stored in the session
-                query, query_values, display_headers, order_by, limit = get_search_attributes_from_session(request)
-
-                # changing the offset to adjust the query
-                offset = (page - 1) * int(limit)
-                pattern = ' OFFSET \d+'
-                replace_with = ' OFFSET {}'.format(str(offset))
-
-                # formulating new query with new offset
-                query = re.sub(pattern, replace_with, query)
-
-                # retrieving search results with new query
-                search_results = list(get_search_results(query, query_values))[0]
-
-                # extracting total number of results from the results
-                try:
-                    total = search_results[0][-1]
-                except IndexError:
-                    total = 0
-
-                # getting the paginator
-                paginator = Paginator(start_index=offset + 1, total=total, per_page=limit)
-
-                return render(
-                    request,
-                    "mwasurveyweb/search/search.html",
-                    {
-                        'search_forms': None,
-                        'search_results': search_results,
-                        'display_headers': display_headers,
-                        'paginator': paginator,
-                        'view_page_link': 'view_' + form_type,
-                    }
-                )
-            except (KeyError, AttributeError):
-                reset_session_search_attributes(request)
+                # handling sorting here
+                if sort:
 
-        # handling sorting here
-        elif sort:
+                    # new order by clause with default direction to to be ASC
+                    order_by_new = ' ORDER BY {field_name} {order_by_direction}'
+                    direction = 'ASC'
 
-            # new order by clause with default direction to to be ASC
-            order_by_new = ' ORDER BY {field_name} {order_by_direction}'
-            direction = 'ASC'
+                    display_headers = state.get('display_headers')
 
-            # retrieve the previous query information that was stored in the session
-            query, query_values, display_headers, order_by, limit = get_search_attributes_from_session(request)
+                    # only the displayed fields can be sorted
+                    if sort not in [display_header.get('field_name') for display_header in display_headers]:
+                        return redirect(get_first_page_url(form_type, state_id))
 
-            # analysing order by clause
-            order_by_field, order_by_direction = get_order_by_parts(order_by)
+                    # analysing order by clause
+                    order_by_field, order_by_direction = get_order_by_parts(state.get('order_by'))
 
-            # if query is ordered by the same field and same direction, we just need to alter the direction
-            if order_by_field == sort and order_by_direction == direction:
-                direction = 'DESC'
+                    # if query is ordered by the same field and same direction, we just need to alter the direction
+                    if order_by_field == sort and order_by_direction == direction:
+                        direction = 'DESC'
 
-            # formatting the oder by string
-            order_by_new = order_by_new.format(
-                field_name=sort,
-                order_by_direction=direction,
-            )
+                    # formatting the oder by string
+                    order_by_new = order_by_new.format(
+                        field_name=sort,
+                        order_by_direction=direction,
+                    )
 
-            # updating the query and display headers
-            query = query.replace(order_by, order_by_new)
-            update_display_headers_order_by(display_headers, order_by_new)
+                    # updating the display headers
+                    update_display_headers_order_by(display_headers, order_by_new)
 
-            # updating the session
-            set_session_search_attributes(request, query, query_values, display_headers, order_by_new, limit)
+                    # the new order is a new search state, its results have their own address
+                    state.update(order_by=order_by_new, display_headers=display_headers)
+                    state_id = save_search_state(**state)
 
-            search_results = list(get_search_results(query, query_values))[0]
+                    # updating the session
+                    set_session_search_state(request, state_id)
 
-            try:
-                total = search_results[0][-1]
-            except IndexError:
-                total = 0
-
-            paginator = Paginator(start_index=1, total=total, per_page=limit)
-
-            return render(
-                request,
-                "mwasurveyweb/search/search.html",
-                {
-                    'search_forms': None,
-                    'search_results': search_results,
-                    'display_headers': display_headers,
-                    'paginator': paginator,
-                    'view_page_link': 'view_' + form_type,
-                }
-            )
+                    return redirect(get_first_page_url(form_type, state_id))
+
+                # handling export here
+                elif not page:
+                    return get_export_response(state, export_format, form_type)
+
+                # handling pagination here
+                return get_search_results_response(request, state_id, state, page, form_type)
+
+            except (KeyError, AttributeError):
+                reset_session_search_state(request)
+
+        # handling the canonical encoding of a search here
+        elif [name for name in request.GET if name not in RESULTS_PARAMETERS]:
+            search_data = request.GET
 
         else:
-            reset_session_search_attributes(request)
+            reset_session_search_state(request)
 
-    # building the forms
-    search_forms = build_search_forms(request, form_type)
+    else:
+        search_data = request.POST
 
-    # dealing with search results
-    search_results = None
-    paginator = None
-    display_headers = None
+    # building the forms, bound to the submitted search inputs if any
+    search_forms = build_search_forms(request, form_type, data=search_data)
 
-    if request.method == 'POST':
+    if search_data is not None:
 
         try:
             # building up search query
             search_query = SearchQuery(search_forms, form_type)
-            query, query_values, order_by, limit, offset, display_headers = search_query.get_query()
-            update_display_headers_order_by(display_headers, order_by)
-
-            # update the session with the new query
-            set_session_search_attributes(request, query, query_values, display_headers, order_by, limit)
+            query, query_count, query_values, filter_signature, order_by, limit, offset, display_headers, \
+                tie_breaker = search_query.get_query()
         except ValidationError:
-            # if form validation errors, setting everything to None
+            # if form validation errors, the forms are displayed with the errors
             query = None
-            query_values = None
-            limit = None
-            offset = None
 
-        # if there is a query, search result need to fetch, and search forms are voided, this would be checked in the UI
+        # if there is a query, the search is redirected to its canonical encoding unless it is already requested by it
         if query:
-            search_forms = None
-            search_results = list(get_search_results(query, query_values))[0]
+            search_parameters = get_search_parameters(search_forms)
 
-            try:
-                total = search_results[0][-1]
-            except IndexError:
-                total = 0
+            if request.method == 'POST' or request.GET.urlencode() != search_parameters:
+                return redirect(reverse('search_' + form_type) + '?' + search_parameters)
+
+            update_display_headers_order_by(display_headers, order_by)
+
+            # storing the search state and referring to it from the session
+            state_id = save_search_state(
+                form_type=form_type,
+                query=query,
+                query_count=query_count,
+                query_values=query_values,
+                filter_signature=filter_signature,
+                display_headers=display_headers,
+                order_by=order_by,
+                limit=limit,
+                tie_breaker=tie_breaker,
+            )
+            set_session_search_state(request, state_id)
 
-            # paginator class for pagination
-            paginator = Paginator(start_index=offset + 1, total=total, per_page=limit)
+            return get_search_results_response(request, state_id, get_search_state(state_id, form_type), 1, form_type)
 
     return render(
         request,
         "mwasurveyweb/search/search.html",
         {
             'search_forms': search_forms,
-            'search_results': search_results,
-            'display_headers': display_headers,
-            'paginator': paginator,
+            'search_results': None,
+            'display_headers': None,
+            'paginator': None,
             'view_page_link': 'view_' + form_type,
         }
     )
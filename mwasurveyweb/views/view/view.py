@@ -2,12 +2,32 @@
 Distributed under the MIT License. See LICENSE.txt for more info.
 """
 
+import re
+import sqlite3
+
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.urls import reverse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_http_methods
 
-from ...utility.utils import get_page_type
-from ...utility.observation import Observation
-from ...utility.processing import Processing
+from ...utility.database import gleam_cursor
+from ...utility.utils import (
+    dict_factory,
+    get_page_type,
+)
+from ...utility.observation import (
+    PROCESSING_FIELDS,
+    Observation,
+    get_observation_summaries,
+    get_processing_page,
+)
+from ...utility.processing import (
+    Processing,
+    get_processing_logs,
+)
 
 
 @login_required
@@ -44,3 +64,100 @@ def view(request, object_id=None):
                     'processing': processing,
                 }
             )
+
+
+@login_required
+@require_http_methods(['GET', 'POST'])
+@gzip_page
+def observation_summaries(request):
+    """
+    Returns the attributes and the processing jobs of many observations as JSON, to save the clients a page load for
+    each observation. The observation ids are given in the obs_ids parameter, separated by commas or spaces, as a GET
+    parameter or as a POST parameter for long lists.
+    :param request: django request object
+    :return: JSON response of the summaries by observation id and the list of the ids not found
+    """
+    parameters = request.POST if request.method == 'POST' else request.GET
+
+    try:
+        observation_ids = [int(observation_id) for observation_id in re.split(r'[\s,]+', parameters.get('obs_ids', ''))
+                           if observation_id]
+    except ValueError:
+        return JsonResponse({'error': 'The observation ids must be integers'}, status=400)
+
+    if len(observation_ids) > settings.OBSERVATION_SUMMARY_MAX_IDS:
+        return JsonResponse(
+            {'error': 'At most {} observations can be requested at once'.format(settings.OBSERVATION_SUMMARY_MAX_IDS)},
+            status=400,
+        )
+
+    try:
+        summaries = get_observation_summaries(observation_ids)
+    except sqlite3.Error:
+        return JsonResponse({'error': 'The observations are not available'}, status=503)
+
+    return JsonResponse({
+        'observations': summaries,
+        'missing': [observation_id for observation_id in observation_ids if observation_id not in summaries],
+    })
+
+
+@login_required
+@require_GET
+@gzip_page
+def observation_processing(request, observation_id):
+    """
+    Returns a page of the processing jobs of an observation as JSON, for the observation page to load the jobs after
+    the first page when requested. The page number is given in the page parameter.
+    :param request: django request object
+    :param observation_id: observation id
+    :return: JSON response of the fields, the jobs of the page along with the urls of their page and of their logs
+    and whether there are more jobs
+    """
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+
+    if page < 1:
+        return JsonResponse({'error': 'The page must be a positive integer'}, status=400)
+
+    try:
+        with gleam_cursor(row_factory=dict_factory) as cursor:
+            processing_objects, has_next = get_processing_page(cursor, observation_id, page)
+    except sqlite3.Error:
+        return JsonResponse({'error': 'The processing jobs are not available'}, status=503)
+
+    for processing_object in processing_objects:
+        processing_object.update({
+            'view_url': reverse('view_processing', args=[processing_object.get('job_id')]),
+            'logs_url': reverse('processing_logs', args=[processing_object.get('job_id')]),
+        })
+
+    return JsonResponse({
+        'fields': PROCESSING_FIELDS,
+        'jobs': processing_objects,
+        'page': page,
+        'has_next': has_next,
+    })
+
+
+@login_required
+@require_GET
+@gzip_page
+def processing_logs(request, job_id):
+    """
+    Returns the logs of a processing job as JSON, for the observation page to show them when requested.
+    :param request: django request object
+    :param job_id: job id
+    :return: JSON response of the job id, the stderr and the stdout of the job
+    """
+    try:
+        logs = get_processing_logs(job_id)
+    except sqlite3.Error:
+        return JsonResponse({'error': 'The logs are not available'}, status=503)
+
+    if logs is None:
+        return JsonResponse({'error': 'The processing job does not exist'}, status=404)
+
+    return JsonResponse(logs)
@@ -26,12 +26,15 @@ Python 2.6+, Python 3, Jython, Pypy support.
 """
 from __future__ import with_statement
 
+import os
+import threading
+from bisect import bisect_right
 from collections import namedtuple
 from datetime import datetime, timedelta
 from struct import Struct
 from warnings import warn
 
-__all__ = ['leapseconds', 'LeapSecond',
+__all__ = ['leapseconds', 'LeapSecond', 'leapseconds_table',
            'dTAI_UTC_from_utc', 'dTAI_UTC_from_tai',
            'tai_to_utc', 'utc_to_tai',
            'gps_to_utc', 'utc_to_gps',
@@ -74,10 +77,17 @@ dTAI_GPS = timedelta(seconds=19)  # constant offset
 LeapSecond = namedtuple('LeapSecond', 'utc dTAI_UTC')  # tai = utc + dTAI_UTC
 sentinel = LeapSecond(utc=datetime.max, dTAI_UTC=timedelta(0))
 
+TZFILES = ['/usr/share/zoneinfo/right/UTC', '/usr/lib/zoneinfo/right/UTC']
 
-def leapseconds(tzfiles=['/usr/share/zoneinfo/right/UTC',
-                         '/usr/lib/zoneinfo/right/UTC'],
-                use_fallback=False):
+# leap seconds table loaded once per process along with the sorted
+# transition times in UTC and in TAI, see leapseconds_table()
+LeapSecondTable = namedtuple('LeapSecondTable',
+                             'stamp leapseconds utc_times tai_times')
+_table = None
+_table_lock = threading.Lock()
+
+
+def leapseconds(tzfiles=TZFILES, use_fallback=False):
     """Extract leap seconds from *tzfiles*."""
     for filename in tzfiles:
         try:
@@ -171,47 +181,108 @@ def _fallback():
         sentinel]
 
 
+def _get_tzfile_stamp(tzfiles=TZFILES):
+    """Identify the tzfile that leapseconds() reads and its version.
+
+    The stamp changes when the tzfile is updated or replaced, e.g., by
+    a tzdata upgrade. None if there is no tzfile.
+    """
+    for filename in tzfiles:
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            continue
+        return filename, stat.st_ino, stat.st_size, stat.st_mtime_ns
+    return None
+
+
+def leapseconds_table():
+    """Get the leap seconds table, loading it from the tzfile only once.
+
+    The table is reloaded if the tzfile changes.
+    """
+    global _table
+    stamp = _get_tzfile_stamp()
+    table = _table
+    if table is not None and table.stamp == stamp:
+        return table
+    with _table_lock:
+        if _table is None or _table.stamp != stamp:
+            leapseconds_list = leapseconds()
+            _table = LeapSecondTable(
+                stamp=stamp,
+                leapseconds=leapseconds_list,
+                utc_times=[ls.utc for ls in leapseconds_list],
+                tai_times=[ls.utc + ls.dTAI_UTC for ls in leapseconds_list])
+        return _table
+
+
 def dTAI_UTC_from_utc(utc_time):
     """TAI time = utc_time + dTAI_UTC_from_utc(utc_time)."""
-    return _dTAI_UTC(utc_time, lambda ls: ls.utc)
+    return _dTAI_UTC(utc_time, 'utc_times')
 
 
 def dTAI_UTC_from_tai(tai_time):
     """UTC time = tai_time - dTAI_UTC_from_tai(tai_time)."""
-    return _dTAI_UTC(tai_time, lambda ls: ls.utc + ls.dTAI_UTC)
+    return _dTAI_UTC(tai_time, 'tai_times')
 
 
-def _dTAI_UTC(time, leapsecond_to_time, leapseconds=leapseconds):
+def _dTAI_UTC(time, transition_times_name):
     """Get TAI-UTC difference in seconds for a given time.
 
+    *transition_times_name* is 'utc_times' if *time* is UTC and
+    'tai_times' if *time* is TAI.
+
     >>> from datetime import datetime, timedelta
-    >>> _dTAI_UTC(datetime(1972, 1, 1), lambda ls: ls.utc)
-    datetime.timedelta(0, 10)
-    >>> tai = lambda ls: ls.utc + ls.dTAI_UTC
-    >>> _dTAI_UTC(datetime(2015, 7, 1, 0, 0, 34), tai)
-    datetime.timedelta(0, 35)
-    >>> _dTAI_UTC(datetime(2015, 7, 1, 0, 0, 35), tai) # leap second
-    datetime.timedelta(0, 35)
-    >>> _dTAI_UTC(datetime(2015, 7, 1, 0, 0, 36), tai)
-    datetime.timedelta(0, 36)
+    >>> _dTAI_UTC(datetime(1972, 1, 1), 'utc_times')
+    datetime.timedelta(seconds=10)
+    >>> _dTAI_UTC(datetime(2015, 7, 1, 0, 0, 34), 'tai_times')
+    datetime.timedelta(seconds=35)
+    >>> _dTAI_UTC(datetime(2015, 7, 1, 0, 0, 35), 'tai_times') # leap second
+    datetime.timedelta(seconds=35)
+    >>> _dTAI_UTC(datetime(2015, 7, 1, 0, 0, 36), 'tai_times')
+    datetime.timedelta(seconds=36)
 
     Bulletin C 51 says "NO leap second will be introduced at the end
     of June 2016."[4] and therefore UTC-TAI is still 36
     at 27 June 2016:
 
-    >>> _dTAI_UTC(datetime(2016, 6, 27), lambda ls: ls.utc)
-    datetime.timedelta(0, 36)
+    >>> _dTAI_UTC(datetime(2016, 6, 27), 'utc_times')
+    datetime.timedelta(seconds=36)
     """
-    leapseconds_list = leapseconds()
-    transition_times = list(map(leapsecond_to_time, leapseconds_list))
-    if time < transition_times[0]:
+    table = leapseconds_table()
+    transition_times = getattr(table, transition_times_name)
+    # the last transition time at or before *time*, the sentinel
+    # (datetime.max) guarantees that there is a following one
+    i = bisect_right(transition_times, time) - 1
+    if i < 0:
         raise ValueError("Dates before %s are not supported, got %r" % (
             transition_times[0], time))
-    for i, (start, end) in enumerate(zip(transition_times,
-                                         transition_times[1:])):
-        if start <= time < end:
-            return leapseconds_list[i].dTAI_UTC
-    assert 0
+    assert i < len(transition_times) - 1
+    return table.leapseconds[i].dTAI_UTC
+
+
+def _benchmark(number=10000):
+    """Print the cost of a conversion per call.
+
+    It compares reading the tzfile and scanning the leap seconds on
+    every call (as done before the table was kept in memory) with the
+    lookup in the table.
+    """
+    from timeit import timeit
+
+    utc_time = datetime(2018, 6, 13)
+
+    def uncached():
+        leapseconds_list = leapseconds()
+        for start, end in zip(leapseconds_list, leapseconds_list[1:]):
+            if start.utc <= utc_time < end.utc:
+                return start.dTAI_UTC
+
+    for name, function in [('tzfile read per call', uncached),
+                           ('in memory table', lambda: utc_to_gps(utc_time))]:
+        seconds = timeit(function, number=number)
+        print('%-22s %8.2f us per call' % (name, seconds / number * 1e6))
 
 
 def tai_to_utc(tai_time):
@@ -246,6 +317,11 @@ def gps_to_tai(gps_time):
 
 if __name__ == "__main__":
     import doctest
+    import sys
+
+    if '--benchmark' in sys.argv:
+        _benchmark()
+        sys.exit()
 
     doctest.testmod()
 